@@ -1,3 +1,6 @@
 """
 AetherDB - Python-based minimal viable product for a secure, SQL-inspired custom database engine.
 """
+from .dbapi import connect
+
+__all__ = ["connect"]
@@ -0,0 +1,142 @@
+"""
+Hash aggregation for AetherDB: COUNT/SUM/MIN/MAX/AVG, optionally grouped, computed in a
+single pass over a row stream with one accumulator list per group. Partial results over
+separate ranges of rows can be merged (merge_groups) before the final rows are built.
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from .index import Range
+
+AGGREGATES = ("COUNT", "SUM", "MIN", "MAX", "AVG")
+
+
+class Aggregate(NamedTuple):
+    """Aggregate call such as COUNT(*) or SUM(amount); column is '*' only for COUNT."""
+    func: str
+    column: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.func}({self.column})"
+
+
+def plan_slots(aggregates: Sequence[Aggregate]) -> Tuple[List[Tuple[str, str]], List[Tuple[int, ...]]]:
+    """
+    Accumulator slots (func, column) shared by all aggregates, AVG being a SUM and a COUNT slot,
+    plus for each aggregate the slot indexes its result is computed from.
+    """
+    slots: List[Tuple[str, str]] = []
+    refs: List[Tuple[int, ...]] = []
+
+    def slot(func: str, column: str) -> int:
+        if (func, column) not in slots:
+            slots.append((func, column))
+        return slots.index((func, column))
+
+    for agg in aggregates:
+        if agg.func == "AVG":
+            refs.append((slot("SUM", agg.column), slot("COUNT", agg.column)))
+        else:
+            refs.append((slot(agg.func, agg.column),))
+    return slots, refs
+
+
+def initial_state(slots: Sequence[Tuple[str, str]]) -> List[Any]:
+    return [0 if func == "COUNT" else None for func, _ in slots]
+
+
+def accumulate(rows: Iterable[Dict[str, Any]], slots: Sequence[Tuple[str, str]],
+               group_by: Sequence[str] = ()) -> Dict[Tuple[Any, ...], List[Any]]:
+    """Group key -> accumulator state (one value per slot) over rows, groups in first-seen order."""
+    initial = initial_state(slots)
+    groups: Dict[Tuple[Any, ...], List[Any]] = {}
+    if not group_by:
+        groups[()] = list(initial)
+    for row in rows:
+        key = tuple(row[c] for c in group_by)
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = list(initial)
+        for i, (func, col) in enumerate(slots):
+            if col == "*":
+                state[i] += 1
+                continue
+            v = row[col]
+            if v is None:
+                continue
+            cur = state[i]
+            if func == "COUNT":
+                state[i] = cur + 1
+            elif cur is None:
+                state[i] = v
+            elif func == "SUM":
+                state[i] = cur + v
+            elif func == "MIN":
+                if v < cur:
+                    state[i] = v
+            elif v > cur:  # MAX
+                state[i] = v
+    return groups
+
+
+def merge_groups(slots: Sequence[Tuple[str, str]], into: Dict[Tuple[Any, ...], List[Any]],
+                 other: Dict[Tuple[Any, ...], List[Any]]) -> None:
+    """Fold the groups of a partial aggregation (e.g. over another range of rows) into into."""
+    for key, theirs in other.items():
+        mine = into.get(key)
+        if mine is None:
+            into[key] = list(theirs)
+            continue
+        for i, (func, _) in enumerate(slots):
+            v = theirs[i]
+            cur = mine[i]
+            if v is None:
+                continue
+            if cur is None:
+                mine[i] = v
+            elif func in ("COUNT", "SUM"):
+                mine[i] = cur + v
+            elif func == "MIN":
+                if v < cur:
+                    mine[i] = v
+            elif v > cur:  # MAX
+                mine[i] = v
+
+
+def finish(groups: Dict[Tuple[Any, ...], List[Any]], aggregates: Sequence[Aggregate],
+           refs: Sequence[Tuple[int, ...]], group_by: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """Result rows (group columns, then each aggregate under its name) from accumulator states."""
+    out = []
+    for key, state in groups.items():
+        result = dict(zip(group_by, key))
+        for agg, ref in zip(aggregates, refs):
+            if agg.func == "AVG":
+                total, count = state[ref[0]], state[ref[1]]
+                result[agg.name] = total / count if count else None
+            else:
+                result[agg.name] = state[ref[0]]
+        out.append(result)
+    return out
+
+
+def hash_aggregate(rows: Iterable[Dict[str, Any]], aggregates: Sequence[Aggregate],
+                   group_by: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Aggregate rows in one pass. Returns one dict per group holding the group columns and each
+    aggregate under its name; without group_by there is always exactly one result row.
+    NULLs are ignored by every aggregate except COUNT(*).
+    """
+    slots, refs = plan_slots(aggregates)
+    return finish(accumulate(rows, slots, group_by), aggregates, refs, group_by)
+
+
+def having_matches(row: Dict[str, Any], having: Dict[str, Any]) -> bool:
+    for k, v in having.items():
+        value = row.get(k)
+        if isinstance(v, Range):
+            if not v.matches(value):
+                return False
+        elif value != v:
+            return False
+    return True
+
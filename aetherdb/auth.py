@@ -1,13 +1,57 @@
 """
 AetherDB authentication module: user creation, login, and password hashing (bcrypt).
+
+bcrypt runs on a small worker pool (the bcrypt backend releases the GIL), so a login only
+occupies the thread waiting for it and bulk provisioning hashes several passwords at once.
+A successful login can be turned into a signed session token (HMAC-SHA256 over the user, an
+expiry and the user's token generation); presenting it again skips bcrypt entirely. Tokens
+expire after token_ttl seconds and are revoked by a password change or revoke_tokens().
 """
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Iterable, List, Optional, Tuple
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
 from passlib.hash import bcrypt
 
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def _hash_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(HASH_WORKERS, thread_name_prefix="aetherdb-bcrypt")
+    return _pool
+
+
+def hash_password(password: str) -> Future:
+    """bcrypt hash of password, computed on the worker pool."""
+    return _hash_pool().submit(bcrypt.hash, password)
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
 class User:
     def __init__(self, username: str, password_hash: str, role: str = "user"):
         self.username = username
         self.password_hash = password_hash
         self.role = role  # 'user' or 'admin'
+        self.token_generation = 0  # bumped to revoke every session token of the user
 
     def verify_password(self, password: str) -> bool:
         if self.password_hash == "":
@@ -15,20 +59,74 @@ class User:
         return bcrypt.verify(password, self.password_hash)
 
 class AuthManager:
-    def __init__(self):
+    def __init__(self, token_ttl: float = 900.0, token_secret: Optional[bytes] = None):
         self.users = {}  # username -> User
+        self.token_ttl = token_ttl
+        self._token_secret = token_secret or os.urandom(32)
 
     def add_user(self, username: str, password: str, role: str = "user", password_optional: bool = False):
         if username in self.users:
             raise ValueError("User already exists")
-        pw_hash = "" if (password_optional and not password) else bcrypt.hash(password)
+        pw_hash = "" if (password_optional and not password) else hash_password(password).result()
         self.users[username] = User(username, pw_hash, role)
 
+    def add_users(self, users: Iterable[Tuple[str, str, str]]) -> List[str]:
+        """
+        Create users from (username, password, role) triples, hashing the passwords in parallel.
+        Nothing is added if any username is taken or repeated.
+        """
+        users = list(users)
+        names = [u[0] for u in users]
+        taken = [n for n in names if n in self.users] + [n for i, n in enumerate(names) if n in names[:i]]
+        if taken:
+            raise ValueError(f"User already exists: {taken[0]}")
+        hashes = [hash_password(password) for _, password, _ in users]
+        for (username, _, role), pw_hash in zip(users, hashes):
+            self.users[username] = User(username, pw_hash.result(), role)
+        return names
+
     def authenticate(self, username: str, password: str) -> bool:
+        return self.authenticate_async(username, password).result()
+
+    def authenticate_async(self, username: str, password: str) -> Future:
+        """Future resolving to whether password is right, checked on the worker pool."""
+        user = self.users.get(username)
+        if not user or user.password_hash == "":
+            done: Future = Future()
+            done.set_result(bool(user) and user.verify_password(password))
+            return done
+        return _hash_pool().submit(user.verify_password, password)
+
+    def issue_token(self, username: str) -> str:
+        """Session token for username (call only after authenticating)."""
         user = self.users.get(username)
         if not user:
-            return False
-        return user.verify_password(password)
+            raise ValueError("No such user")
+        payload = json.dumps([username, time.time() + self.token_ttl, user.token_generation]).encode()
+        return f"{_b64(payload)}.{_b64(self._sign(payload))}"
+
+    def verify_token(self, token: str) -> Optional[str]:
+        """The username a token was issued to, or None if it is forged, expired or revoked."""
+        try:
+            payload_text, sig_text = token.split(".")
+            payload = _unb64(payload_text)
+            if not hmac.compare_digest(self._sign(payload), _unb64(sig_text)):
+                return None
+            username, expires, generation = json.loads(payload)
+        except (ValueError, TypeError):
+            return None
+        user = self.users.get(username)
+        if not user or time.time() >= expires or generation != user.token_generation:
+            return None
+        return username
+
+    def revoke_tokens(self, username: str) -> None:
+        user = self.get_user(username)
+        if user:
+            user.token_generation += 1
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._token_secret, payload, hashlib.sha256).digest()
 
     def get_user(self, username: str) -> User:
         return self.users.get(username)
@@ -36,7 +134,8 @@ class AuthManager:
     def change_password(self, username: str, new_password: str):
         user = self.get_user(username)
         if user:
-            user.password_hash = bcrypt.hash(new_password)
+            user.password_hash = hash_password(new_password).result()
+            user.token_generation += 1
         else:
             raise ValueError("No such user")
 
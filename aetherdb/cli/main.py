@@ -21,6 +21,44 @@ def shell(profile, command):
     else:
         launch_shell(conn, profile=profile)
 
+@cli.command()
+@click.option('--profile', default=None, help="Listen on this profile's host and port")
+@click.option('--host', default=None, help="Address to listen on (default: the profile's host)")
+@click.option('--port', default=None, type=int, help="TCP port (default: the profile's port)")
+@click.option('--socket', 'unix_path', default=None, help="Also listen on this Unix socket path")
+@click.option('--data', default=None, help="Database directory (snapshot + WAL); in-memory if omitted")
+@click.option('--password', envvar='AETHERDB_PASSWORD', default=None,
+              help="Password of the --data directory (or set AETHERDB_PASSWORD)")
+@click.option('--admin-password', envvar='AETHERDB_ADMIN_PASSWORD', default=None,
+              help="Password for the bootstrap admin 'aether' (or set AETHERDB_ADMIN_PASSWORD)")
+def serve(profile, host, port, unix_path, data, password, admin_password):
+    """Run an AetherDB server hosting one long-lived engine"""
+    from ..db_engine import AetherDB
+    from ..server import serve as run_server
+    prof = get_profile(profile)
+    host = host or prof['host']
+    port = port if port is not None else int(prof['port'])
+    if data:
+        if password is None:
+            password = click.prompt("Database password", hide_input=True)
+        db = AetherDB.open(data, password)
+    else:
+        db = AetherDB()
+    admin = db.auth.get_user("aether")
+    if admin is not None and not admin.password_hash:
+        # Anyone who can reach the port could otherwise log in as admin with an empty password
+        if not admin_password:
+            db.close()
+            raise click.UsageError("The bootstrap admin 'aether' has no password; "
+                                   "pass --admin-password (or set AETHERDB_ADMIN_PASSWORD) to serve.")
+        db.auth.change_password("aether", admin_password)
+    where = f"{host}:{port}" + (f" and {unix_path}" if unix_path else "")
+    click.echo(f"AetherDB serving {data or 'an in-memory database'} on {where} (Ctrl+C to stop)")
+    try:
+        run_server(db, host, port, unix_path)
+    finally:
+        db.close()
+
 @cli.group()
 def apm():
     """Interact with Aether Package Manager (APM) to manage extensions/packages"""
@@ -0,0 +1,70 @@
+"""
+Text rendering of streamed query results, shared by the shell and the standalone client.
+
+Rows arrive in batches so a large SELECT never has to be held in memory. Table output is
+formatted by tabulate batch by batch: later batches keep the column widths reached so far and
+widen a column when a value needs more room, so nothing is ever cut off.
+"""
+import csv
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+from tabulate import tabulate
+
+FORMATS = ["table", "csv", "json", "ndjson", "raw"]
+
+# Rows pulled from a streamed SELECT per rendering batch
+RENDER_BATCH = 500
+
+
+class _TableWriter:
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.widths: Optional[List[int]] = None
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        rows = [[row.get(col) for col in self.columns] for row in batch]
+        if self.widths is None:
+            lines = tabulate(rows, headers=self.columns).splitlines()
+            body = lines
+        else:
+            # Blank headers as wide as the columns so far (tabulate adds two columns of padding)
+            lines = tabulate(rows, headers=[" " * max(w - 2, 0) for w in self.widths]).splitlines()
+            body = lines[2:]
+        # The dashed rule under the headers gives this batch's column widths
+        self.widths = [len(rule) for rule in lines[1].split("  ")]
+        for line in body:
+            print(line)
+
+
+def render_stream(stream, fmt: str = "table", batch_size: Optional[int] = None) -> int:
+    """Print a ResultStream to stdout in one of FORMATS; returns the number of rows printed."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Output format {fmt} not supported (use {', '.join(FORMATS)}).")
+    count = 0
+    writer = None
+    for batch in stream.batches(batch_size or RENDER_BATCH):
+        columns = stream.columns or list(batch[0])
+        if fmt == "table":
+            if writer is None:
+                writer = _TableWriter(columns)
+            writer.write(batch)
+        elif fmt == "json":
+            for i, row in enumerate(batch, count):
+                sys.stdout.write(("[\n  " if not i else ",\n  ") + json.dumps(row, default=str))
+        elif fmt == "ndjson":
+            for row in batch:
+                print(json.dumps(row, default=str))
+        elif fmt == "csv":
+            if writer is None:
+                writer = csv.DictWriter(sys.stdout, fieldnames=columns)
+                writer.writeheader()
+            writer.writerows(batch)
+        else:
+            for row in batch:
+                print(row)
+        count += len(batch)
+    if fmt == "json":
+        print("\n]" if count else "[]")
+    return count
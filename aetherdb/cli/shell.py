@@ -2,15 +2,16 @@ from prompt_toolkit import PromptSession
 from prompt_toolkit.completion import WordCompleter
 from prompt_toolkit.history import FileHistory
 import getpass
-from tabulate import tabulate
 import os
-import json
-import csv
-import sys
-from aetherdb.db_engine import AetherDB
+from aetherdb.db_engine import AetherDB, ResultStream
+from aetherdb.pool import get_pool
+from aetherdb.protocol import DEFAULT_PORT
+from aetherdb.remote import RemoteDB
+from ..cli.render import FORMATS, render_stream
 from ..cli.config import get_profile, save_profiles, load_profiles
 from ..cli.connection import get_connection, list_profiles, get_profile
 from ..cli.apm_integration import apm_install, apm_remove, apm_update, apm_list
+from ..utils import flush_audit_log
 from rich.console import Console
 from rich.text import Text
 from rich.table import Table
@@ -22,17 +23,15 @@ SQL_KEYWORDS = [
 META_COMMANDS = ["\\q", "\\help", "\\profiles", "\\apm", "\\log", "\\login"]
 HIST_FILE = os.path.expanduser("~/.aetherdb_cli_history")
 
-FORMATS = ["table", "csv", "json", "raw"]
-
 console = Console()
 
 META_DOCS = {
     "\\help, \\?": "Show this help legend or help for \\help <command>",
     "\\profiles": "List available connection profiles",
     "\\connect <name>": "Reconnect using the given saved profile",
-    "\\set format <mode>": f"Change output format (modes: table, csv, json, raw)",
+    "\\set format <mode>": f"Change output format (modes: table, csv, json, ndjson, raw)",
     "\\saveprofile <name>": "Save current session state as a connection profile",
-    "\\login": "Re-enter your password and (re)authenticate",
+    "\\login": "(Re)authenticate: reuses your session token while it is valid, else asks for your password",
     "\\format <mode>": "Shortcut to change output format",
     "\\i <file>": "Execute SQL/meta-commands from a file (scripting)",
     "\\apm <cmd>": "Run APM extension commands (install, list, etc)",
@@ -55,26 +54,65 @@ def _render_result(result, fmt):
         console.print("[green]OK[/green]")
         return
     if isinstance(result, list):
-        if not result:
-            console.print("[yellow](no rows)[/yellow]")
-            return
-        if fmt == "table":
-            print(tabulate(result, headers="keys"))
-        elif fmt == "json":
-            console.print_json(json.dumps(result, indent=2))
-        elif fmt == "csv":
-            writer = csv.DictWriter(sys.stdout, fieldnames=result[0].keys())
-            writer.writeheader()
-            writer.writerows(result)
-        elif fmt == "raw":
-            for row in result:
-                print(row)
-        else:
-            console.print("[red][Unknown format, showing as table][/red]")
-            print(tabulate(result, headers="keys"))
+        result = ResultStream(list(result[0].keys()) if result else [], result)
+    if isinstance(result, ResultStream):
+        _render_stream(result, fmt)
     else:
         console.print(f"[cyan]{result}[/cyan]")
 
+def _render_stream(stream, fmt):
+    if fmt not in FORMATS:
+        console.print("[red][Unknown format, showing as table][/red]")
+        fmt = "table"
+    if not render_stream(stream, fmt) and fmt != "json":
+        console.print("[yellow](no rows)[/yellow]")
+
+def _run_script_sql(db, statements, fmt):
+    """Run SQL lines from a \\i script; against a server they are pipelined in one batch."""
+    if not statements:
+        return
+    if isinstance(db, RemoteDB):
+        try:
+            results = db.pipeline(statements, return_exceptions=True)
+        except OSError as e:
+            console.print(Text(f"Error: {e}", style="red"))
+            return
+        for sql, result in zip(statements, results):
+            console.print(f"> {sql}")
+            if isinstance(result, Exception):
+                console.print(Text(f"Error: {result}", style="red"))
+            else:
+                _render_result(result, fmt)
+        return
+    for sql in statements:
+        console.print(f"> {sql}")
+        try:
+            result = db.execute_sql(sql, stream=True)
+            _render_result(result, fmt)
+        except Exception as e:
+            console.print(Text(f"Error: {e}", style="red"))
+
+def _open_engine(profile_conf):
+    """
+    (connection, pool) for the profile's server, or a fresh in-process engine and None if
+    nothing listens there. Pooled connections stay open for the next shell on the same profile.
+    """
+    host = profile_conf.get('host', '127.0.0.1')
+    port = int(profile_conf.get('port', DEFAULT_PORT))
+    pool = get_pool(host, port, user=profile_conf.get('user', 'aether'), connect_timeout=2.0)
+    try:
+        return pool.acquire(), pool
+    except OSError:
+        console.print(f"[yellow]No AetherDB server at {host}:{port}; using an in-process engine "
+                      f"(start one with: aetherdb serve).[/yellow]")
+        return AetherDB(), None
+
+def _close_engine(db, pool):
+    if pool is not None:
+        pool.release(db)
+    else:
+        db.close()
+
 class SessionState:
     def __init__(self, profile_name, profile_conf, user, output_format="table"):
         self.profile_name = profile_name
@@ -89,15 +127,19 @@ class SessionState:
 def launch_shell(connection, sql=None, oneshot=False, profile=None):
     # Try to get user/pass, prompt if needed
     profile_conf = get_profile(profile)
-    db = AetherDB()
+    db, pool = _open_engine(profile_conf)
     user = profile_conf.get('user', 'aether')
     state = SessionState(profile, profile_conf, user, "table")
     # Authentication flow
     auth_ok = False
     password = None
-    for _ in range(3):
+    if pool is not None and db.current_user == user:
+        # The pool logged this connection in with the session of an earlier shell
+        console.print(f"[green]Authenticated as: {user} (session)[/green]")
+        auth_ok = True
+    for _ in range(0 if auth_ok else 3):
         password = getpass.getpass(f"Password for {user}: ")
-        if db.login(user, password):
+        if pool.login(db, user, password) if pool is not None else db.login(user, password):
             console.print(f"[green]Authenticated as: {user}[/green]")
             auth_ok = True
             break
@@ -105,12 +147,14 @@ def launch_shell(connection, sql=None, oneshot=False, profile=None):
             console.print("[red]Authentication failed. Try again.[/red]")
     if not auth_ok:
         console.print("[red]Could not authenticate with AetherDB engine. Exiting shell.[/red]")
+        _close_engine(db, pool)
         return
     console.print(f"[green]Connected to: {connection}[/green]")
     if oneshot and sql:
         console.print(f"SQL> {sql}")
         # TODO: actually execute sql: result = db.execute_sql(sql)
         console.print("[mock] Would execute query and print result")
+        _close_engine(db, pool)
         return
     prompt_str = f"aetherdb[{connection}]> "
 
@@ -164,6 +208,7 @@ def launch_shell(connection, sql=None, oneshot=False, profile=None):
                         newprof = parts[1]
                         if newprof in list_profiles():
                             console.print(f"[yellow]Switching to profile {newprof}. Please re-authenticate...[/yellow]")
+                            _close_engine(db, pool)
                             # Reenter shell with new profile and user/pass
                             launch_shell(get_connection(newprof), profile=newprof)
                             return  # terminate this session, replaced by new one
@@ -181,25 +226,21 @@ def launch_shell(connection, sql=None, oneshot=False, profile=None):
                             console.print(f"[red]File not found: {fname}[/red]")
                         else:
                             console.print(f"[yellow]Running command file: {fname}[/yellow]")
+                            statements = []  # consecutive SQL lines, sent as one pipeline
                             with open(fname) as f:
                                 for line in f:
                                     if not line.strip() or line.strip().startswith("--"):  # skip comments
                                         continue
-                                    if line.strip().startswith("\\"):
-                                        cmd = line.strip()
-                                    else: # SQL
-                                        cmd = line.strip()
+                                    cmd = line.strip()
+                                    if not cmd.startswith("\\"):
+                                        statements.append(cmd)
+                                        continue
+                                    _run_script_sql(db, statements, state.output_format)
+                                    statements = []
                                     console.print(f"> {cmd}")
-                                    # Recursively run meta/sql commands
-                                    if cmd.startswith("\\"):
-                                        # restarts recursion, but ok for now (shell exit on \\q is fine)
-                                        session.default_buffer.insert_text(cmd)
-                                    else:
-                                        try:
-                                            result = db.execute_sql(cmd)
-                                            _render_result(result, state.output_format)
-                                        except Exception as e:
-                                            console.print(Text(f"Error: {e}", style="red"))
+                                    # restarts recursion, but ok for now (shell exit on \\q is fine)
+                                    session.default_buffer.insert_text(cmd)
+                            _run_script_sql(db, statements, state.output_format)
                         continue
                     else:
                         console.print("[yellow]Usage: \\i <filename>[/yellow]")
@@ -260,6 +301,10 @@ def launch_shell(connection, sql=None, oneshot=False, profile=None):
                     continue
                 # ...existing \login and else meta handler...
                 if cmd.strip() == "\\login":
+                    # A still valid session token from the last login skips the password
+                    if db.session_token and db.login_token(db.session_token):
+                        console.print(f"[green]Authenticated as: {db.current_user} (session)[/green]")
+                        continue
                     for _ in range(3):
                         password = getpass.getpass(f"Password for {user}: ")
                         if db.login(user, password):
@@ -272,7 +317,7 @@ def launch_shell(connection, sql=None, oneshot=False, profile=None):
                 console.print(f"[blue][meta] Would run meta-command: {cmd}[/blue]")
             else:
                 try:
-                    result = db.execute_sql(cmd)
+                    result = db.execute_sql(cmd, stream=True)
                     _render_result(result, state.output_format)
                 except PermissionError as e:
                     console.print(Text(str(e), style="yellow"))
@@ -286,3 +331,5 @@ def launch_shell(connection, sql=None, oneshot=False, profile=None):
         except (EOFError, KeyboardInterrupt):
             console.print('[green]Bye.[/green]')
             break
+    _close_engine(db, pool)
+    flush_audit_log()  # don't leave audit entries queued when the shell exits
@@ -5,14 +5,17 @@ import sys
 import readline
 import getpass
 import os
-import json
-from aetherdb.db_engine import AetherDB
+import shlex
+from aetherdb.cli.render import render_stream
+from aetherdb.db_engine import AetherDB, ResultStream
+from aetherdb.encryption import clear_key_cache, rewrap
+from aetherdb.utils import audit_segments, flush_audit_log, read_audit_log
 from tabulate import tabulate
 
 SQL_KEYWORDS = [
     "SELECT", "INSERT", "UPDATE", "DELETE", "FROM", "WHERE", "VALUES", "SET", "CREATE", "TABLE", "INTO", "ALTER", "ADD", "RENAME", "DROP"
 ]
-META_COMMANDS = ["\\dt", "\\d", "\\du", "\\adduser", "\\login", "\\passwd", "\\whoami", "\\help", "\\q", "\\quit", "\\save", "\\load", "\\grant", "\\revoke", "\\role", "\\log"]
+META_COMMANDS = ["\\dt", "\\d", "\\du", "\\adduser", "\\login", "\\passwd", "\\whoami", "\\help", "\\q", "\\quit", "\\save", "\\load", "\\rekey", "\\grant", "\\revoke", "\\role", "\\log", "\\cache"]
 
 class Completer:
     def __init__(self, client):
@@ -36,6 +39,7 @@ class AetherDBClient:
     def __init__(self):
         self.db = AetherDB()
         self.running = True
+        self.sessions = {}  # username -> session token, so switching back skips the password
         self.completer = Completer(self)
         readline.set_completer(self.completer.complete)
         readline.parse_and_bind('tab: complete')
@@ -63,6 +67,8 @@ class AetherDBClient:
             except (KeyboardInterrupt, EOFError):
                 print("\nExiting.")
                 break
+        flush_audit_log()
+        clear_key_cache()  # don't keep derived keys around after the session
 
     def _read_sql_multiline(self):
         lines = []
@@ -108,8 +114,13 @@ class AetherDBClient:
                 print(f"Add user error: {e}")
         elif cmd.startswith("\\login"):
             username = cmd.split(maxsplit=1)[1] if len(cmd.split()) > 1 else input("Username: ")
+            token = self.sessions.get(username)
+            if token and self.db.login_token(token):
+                print("Logged in as", username, "(session)")
+                return
             password = getpass.getpass(f"Password for {username}: ")
             if self.db.login(username, password):
+                self.sessions[username] = self.db.session_token
                 print("Logged in as", username)
             else:
                 print("Login failed.")
@@ -129,12 +140,14 @@ class AetherDBClient:
                     '\\adduser': 'Add a new user and login',
                     '\\save': 'Save encrypted DB',
                     '\\load': 'Load encrypted DB',
+                    '\\rekey': 'Change the password of an encrypted DB file without re-encrypting it',
                     '\\whoami': 'Print current user',
                     '\\q': 'Quit',
                     '\\grant': 'Grant permission on a table to a user',
                     '\\revoke': 'Revoke permission on a table from a user',
                     '\\role': 'Set user role (admin only): \\role <user> <role>',
-                    '\\log': 'Show the audit log: \\log (last 10), \\log N, \\log all',
+                    '\\log': 'Show the audit log: \\log (last 10), \\log N, \\log all; filter with user=, action=, since=, until=',
+                    '\\cache': 'Query result cache: \\cache (stats), \\cache on, \\cache off',
                 }
                 print(helptexts.get(arg, f"Meta-command {arg}: no extra help"))
             elif arg in SQL_KEYWORDS:
@@ -178,6 +191,21 @@ class AetherDBClient:
                 print(f"Encrypted DB loaded from {path.strip()}")
             except Exception as e:
                 print(f"Load error: {e}")
+        elif cmd.startswith("\\rekey "):
+            if not self.db.current_user:
+                print("Error: Please login first.")
+                return
+            _, path = cmd.split(maxsplit=1)
+            old = getpass.getpass("Current encryption password: ")
+            new = getpass.getpass("New encryption password: ")
+            if new != getpass.getpass("Repeat new encryption password: "):
+                print("Passwords do not match.")
+                return
+            try:
+                rewrap(path.strip(), old, new)
+                print(f"Password of {path.strip()} changed")
+            except Exception as e:
+                print(f"Rekey error: {e}")
         elif cmd.startswith("\\d"):
             arg = cmd[2:].strip()
             if not self.db.current_user:
@@ -235,27 +263,42 @@ class AetherDBClient:
                 print(f"Assigned role {role} to user {user}.")
             except Exception as e:
                 print(f"Role assignment error: {e}")
+        elif cmd.startswith("\\cache"):
+            arg = cmd[6:].strip()
+            if arg == "on":
+                self.db.enable_result_cache()
+                print("Result cache enabled.")
+            elif arg == "off":
+                self.db.disable_result_cache()
+                print("Result cache disabled.")
+            elif arg:
+                print("Usage: \\cache [on|off]")
+            else:
+                info = self.db.result_cache_info()
+                print(tabulate(info.items(), headers=["Stat", "Value"]) if info else "Result cache is off.")
         elif cmd.startswith("\\log"):
-            parts = cmd.split()
+            usage = "Usage: \\log [N|all] [user=NAME] [action=NAME] [since=YYYY-MM-DD[ HH:MM:SS]] [until=...]"
             count = 10
-            if len(parts) == 2:
-                if parts[1] == "all":
-                    count = None
-                else:
-                    try:
-                        count = int(parts[1])
-                    except Exception:
-                        print("Usage: \\log [N|all]")
-                        return
-            entries = []
+            filters = {}
             try:
-                with open("aetherdb_audit.log", "r") as f:
-                    entries = [json.loads(line) for line in f]
-            except FileNotFoundError:
+                for part in shlex.split(cmd)[1:]:
+                    key, sep, value = part.partition("=")
+                    if sep and key in ("user", "action", "since", "until"):
+                        filters[key] = value
+                    elif part == "all":
+                        count = None
+                    else:
+                        count = int(part)
+                        if count < 0:
+                            raise ValueError(part)
+            except ValueError:
+                print(usage)
+                return
+            flush_audit_log()  # include entries still queued in the background writer
+            if not audit_segments():
                 print("No audit log found.")
                 return
-            if count:
-                entries = entries[-count:]
+            entries = read_audit_log(count, **filters)
             if not entries:
                 print("(no entries)")
                 return
@@ -265,13 +308,11 @@ class AetherDBClient:
 
     def _handle_sql(self, sql):
         try:
-            result = self.db.execute_sql(sql)
+            result = self.db.execute_sql(sql, stream=True)
             if result is None:
                 print("OK")
-            elif isinstance(result, list):
-                if result:
-                    print(tabulate(result, headers="keys"))
-                else:
+            elif isinstance(result, ResultStream):
+                if not render_stream(result):
                     print("(no rows)")
             else:
                 print(result)
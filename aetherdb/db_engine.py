@@ -1,22 +1,95 @@
 """
 Core engine for AetherDB: in-memory table storage, basic CRUD operations, and type enforcement.
+
+One AetherDB can be shared between threads. The logged-in user is held per thread/task (a
+ContextVar), each table has a reader/writer lock, and streamed results take their tables' read
+locks only while producing each batch of SCAN_BATCH rows.
 """
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import contextvars
 import datetime
+import os
+import threading
+from .aggregate import AGGREGATES, Aggregate, accumulate, finish, having_matches, merge_groups, plan_slots
+from .index import Range, make_index, pick_index
+from .join import hash_join
+from .locks import RWLock, read_all
+from .partition import make_partitioning
+from .result_cache import ResultCache, filters_key
+from .storage import RowStorage, make_storage
+from . import vectorized
+
+SNAPSHOT_FILE = "snapshot.aedb"
+WAL_FILE = "wal.log"
+SCAN_BATCH = 256  # rows produced per read-lock acquisition when streaming results
+_scan_count_lock = threading.Lock()
+
 
 class Table:
     """
     Simple in-memory table supporting rows as dicts, basic data types, and CRUD.
+    Rows live in a storage layout (row dicts or typed columns) chosen at creation time.
+    Deletes only set a tombstone; storage is compacted once enough rows are dead, or on VACUUM.
     """
-    def __init__(self, name: str, schema: Dict[str, str], creator: str = None):
+    compact_ratio = 0.25  # compact when this fraction of stored rows is deleted...
+    compact_min = 1024  # ...and at least this many rows are
+
+    def __init__(self, name: str, schema: Dict[str, str], creator: str = None, storage: str = "row"):
         self.name = name
         self.schema = schema  # e.g. {"id": "int", "name": "str", ...}
-        self.rows: List[Dict[str, Any]] = []
+        self.storage = make_storage(storage, schema)
+        self.deleted = bytearray()  # tombstone per storage position
+        self.deleted_count = 0
+        self.version = 0  # bumped on every data or schema change
+        self.epoch = 0  # bumped when compaction renumbers positions
+        self._active_scans = 0
         self.auto_inc = 1  # for autoincrement primary key if needed
         self.permissions = {}  # username -> set('read', 'write', 'admin')
+        self.indexes: Dict[str, Any] = {}  # index name -> HashIndex/OrderedIndex
+        self.lock = RWLock()  # taken by AetherDB; Table methods themselves do not lock
         if creator:
             self.permissions[creator] = {'read', 'write', 'admin'}
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('_vector_cache', None)  # derived NumPy arrays are rebuilt on demand
+        state.pop('lock', None)
+        return state
+
+    def __setstate__(self, state):
+        # Snapshots written before indexes/storage layouts existed
+        state.setdefault('indexes', {})
+        if 'storage' not in state:
+            storage = RowStorage(state['schema'])
+            storage.rows = state.pop('rows', [])
+            state['storage'] = storage
+        if 'deleted' not in state:
+            state['deleted'] = bytearray(len(state['storage']))
+            state['deleted_count'] = 0
+        state.setdefault('version', 0)
+        state.setdefault('epoch', 0)
+        state['_active_scans'] = 0
+        state['lock'] = RWLock()
+        self.__dict__.update(state)
+
+    def __len__(self) -> int:
+        """Number of live (non-deleted) rows."""
+        return len(self.storage) - self.deleted_count
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        """All live rows as dicts (the row list itself for compacted row storage, a copy otherwise)."""
+        if isinstance(self.storage, RowStorage) and not self.deleted_count:
+            return self.storage.rows
+        return [row for _, row in self._iter_live()]
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the row data (excluding indexes)."""
+        return self.storage.memory_usage()
+
     def has_perm(self, user: str, perm: str) -> bool:
         return user in self.permissions and (perm in self.permissions[user] or 'admin' in self.permissions[user])
 
@@ -30,37 +103,292 @@ class Table:
             del self.permissions[user]
 
     def insert(self, row_data: Dict[str, Any]) -> None:
-        validated = self._validate_row(row_data)
-        self.rows.append(validated)
+        self._append(self._validate_row(row_data))
 
-    def select(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        if not filters:
-            return list(self.rows)
-        result = []
-        for row in self.rows:
-            ok = True
-            for k, v in filters.items():
-                if row.get(k) != v:
-                    ok = False
-                    break
-            if ok:
-                result.append(row)
-        return result
+    def _append(self, validated: Dict[str, Any]) -> None:
+        self.storage.append(validated)
+        self.deleted.append(0)
+        self.version += 1
+        pos = len(self.storage) - 1
+        for idx in self.indexes.values():
+            idx.add(pos, validated)
+
+    def insert_many(self, rows: List[Dict[str, Any]]) -> int:
+        """Validate the whole batch, then append it; a bad row leaves the table untouched."""
+        return self._extend(self._validate_rows(rows))
+
+    def _extend(self, validated: List[Dict[str, Any]]) -> int:
+        start = len(self.storage)
+        self.storage.extend(validated)
+        self.deleted.extend(bytes(len(validated)))
+        self.version += 1
+        for idx in self.indexes.values():
+            for pos, row in enumerate(validated, start):
+                idx.add(pos, row)
+        return len(validated)
+
+    def select(self, filters: Optional[Dict[str, Any]] = None,
+               columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return list(self.scan(filters, columns))
+
+    def scan(self, filters: Optional[Dict[str, Any]] = None,
+             columns: Optional[List[str]] = None, parallel=None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield matching rows. Filters are checked (and an index chosen) up front, and the
+        scan counts as open from then on, so compaction cannot renumber the positions it chose
+        before the rows are read; rows are produced one at a time, so memory stays bounded by
+        what the consumer holds on to.
+        With columns, each output row holds only those columns, read straight from storage.
+        parallel (a ParallelExecutor) may evaluate unindexed filters across processes.
+        """
+        if columns is not None:
+            for col in columns:
+                if col not in self.schema:
+                    raise ValueError(f"Column {col} does not exist in {self.name}.")
+        rows = self._scan_rows(filters, parallel, self.storage.projector(columns))
+        next(rows)  # runs up to the first row: the scan is registered and its positions chosen
+        return rows
+
+    def _begin_scan(self) -> None:
+        with _scan_count_lock:
+            self._active_scans += 1
+
+    def _end_scan(self) -> None:
+        with _scan_count_lock:
+            self._active_scans -= 1
+
+    def _scan_rows(self, filters: Optional[Dict[str, Any]], parallel,
+                   get: Callable[[int], Dict[str, Any]]) -> Iterator[Optional[Dict[str, Any]]]:
+        # Yields None once primed; closing (or dropping) the generator ends the scan
+        self._begin_scan()
+        try:
+            filters = self._normalize_filters(filters) if filters else None
+            epoch, deleted = self.epoch, self.deleted
+            positions = self._iter_positions(filters, parallel)
+            version = self.version
+            yield None
+            for pos in positions:
+                if self.epoch != epoch:
+                    raise RuntimeError(f"Table {self.name} was compacted during a scan")
+                if deleted[pos]:  # skip rows deleted since the scan started
+                    continue
+                # Positions from an index or a mask were chosen up front; a row updated since
+                # then must still match
+                if self.version != version and filters and not self._matches(pos, filters):
+                    continue
+                yield get(pos)
+        finally:
+            self._end_scan()
+
+    def aggregate(self, aggregates: List[Aggregate], group_by: Optional[List[str]] = None,
+                  filters: Optional[Dict[str, Any]] = None, having: Optional[Dict[str, Any]] = None,
+                  columns: Optional[List[str]] = None, parallel=None) -> List[Dict[str, Any]]:
+        """
+        Hash-aggregate the matching rows in one pass over a scan that reads only the referenced
+        columns (and uses an index for the filters when one applies). having filters the groups
+        by group column or aggregate name; columns picks and orders the output (default: group
+        columns, then aggregates). Without a usable index, parallel (a ParallelExecutor) may
+        aggregate ranges of rows in worker processes and merge the results.
+        """
+        group_by = list(group_by or [])
+        aggregates = [Aggregate(*a) for a in aggregates]
+        by_name = {a.name: a for a in aggregates}
+        for col in group_by:
+            if col not in self.schema:
+                raise ValueError(f"Column {col} does not exist in {self.name}.")
+        for agg in aggregates:
+            if agg.func not in AGGREGATES:
+                raise ValueError(f"Aggregate {agg.func} not supported (use {', '.join(AGGREGATES)}).")
+            if agg.column == "*" and agg.func != "COUNT":
+                raise ValueError(f"{agg.func}(*) is not supported; name a column.")
+            if agg.column != "*" and agg.column not in self.schema:
+                raise ValueError(f"Column {agg.column} does not exist in {self.name}.")
+            if agg.func in ("SUM", "AVG") and self.schema[agg.column] != "int":
+                raise ValueError(f"{agg.func} needs an int column, {agg.column} is {self.schema[agg.column]}.")
+        columns = list(columns) if columns is not None else group_by + list(by_name)
+        for col in columns:
+            if col not in by_name and col not in group_by:
+                raise ValueError(f"Column {col} must appear in GROUP BY or inside an aggregate.")
+        having = self._normalize_having(having or {}, group_by, by_name)
+
+        slots, refs = plan_slots(aggregates)
+        rows = finish(self._aggregate_groups(slots, group_by, filters, parallel), aggregates, refs, group_by)
+        return [{c: row[c] for c in columns} for row in rows if having_matches(row, having)]
+
+    def _aggregate_groups(self, slots: List[Tuple[str, str]], group_by: List[str],
+                          filters: Optional[Dict[str, Any]], parallel=None) -> Dict[Tuple[Any, ...], List[Any]]:
+        """Accumulator states per group (see aggregate.accumulate) over the matching rows."""
+        groups = self._count_from_index(slots, group_by, filters)
+        if groups is None and parallel is not None and (
+                not filters or self._pick_index(self._normalize_filters(filters)) is None):
+            groups = parallel.aggregate(self, slots, group_by, filters)
+        if groups is None:
+            needed = list(dict.fromkeys(group_by + [col for _, col in slots if col != "*"]))
+            groups = accumulate(self.scan(filters, needed), slots, group_by)
+        return groups
+
+    def _count_from_index(self, slots: List[Tuple[str, str]], group_by: List[str],
+                          filters: Optional[Dict[str, Any]]) -> Optional[Dict[Tuple[Any, ...], List[Any]]]:
+        # Ungrouped COUNT(*) whose filters one index answers entirely: count its entries, skip the rows
+        if group_by or not filters or slots != [("COUNT", "*")]:
+            return None
+        filters = self._normalize_filters(filters)
+        idx = self._pick_index(filters)
+        if idx is None or set(filters) - set(idx.columns):
+            return None
+        return {(): [len(idx.lookup(filters))]}
+
+    def _normalize_having(self, having: Dict[str, Any], group_by: List[str],
+                          by_name: Dict[str, Aggregate]) -> Dict[str, Any]:
+        out = {}
+        for k, v in having.items():
+            agg = by_name.get(k)
+            if agg is None and k not in group_by:
+                raise ValueError(f"HAVING column {k} must appear in GROUP BY or be an aggregate.")
+            if agg is None or agg.func in ("MIN", "MAX"):
+                cast = self._caster(k if agg is None else agg.column)
+            else:
+                cast = float if agg.func == "AVG" else int
+            if v is None:
+                out[k] = v
+            elif isinstance(v, Range):
+                out[k] = v.map(cast)
+            else:
+                out[k] = cast(v)
+        return out
 
     def update(self, filters: Dict[str, Any], update_data: Dict[str, Any]) -> int:
+        changes = {uk: self._cast(uk, uv) for uk, uv in update_data.items() if uk in self.schema}
+        touched = [idx for idx in self.indexes.values() if any(c in changes for c in idx.columns)]
         count = 0
-        for row in self.rows:
-            if all(row.get(k) == v for k, v in filters.items()):
-                for uk, uv in update_data.items():
-                    if uk in self.schema:
-                        row[uk] = self._cast(uk, uv)
-                count += 1
+        for pos in self._match_positions(filters):
+            old = self.storage.get(pos) if touched else None
+            self.storage.set_values(pos, changes)  # may raise; indexes are only touched after
+            for idx in touched:
+                idx.remove(pos, old)
+                idx.add(pos, self.storage.get(pos))
+            count += 1
+        if count:
+            self.version += 1
         return count
 
     def delete(self, filters: Dict[str, Any]) -> int:
-        initial = len(self.rows)
-        self.rows = [row for row in self.rows if not all(row.get(k) == v for k, v in filters.items())]
-        return initial - len(self.rows)
+        doomed = self._match_positions(filters)
+        for pos in doomed:
+            if self.indexes:
+                row = self.storage.get(pos)
+                for idx in self.indexes.values():
+                    idx.remove(pos, row)
+            self.deleted[pos] = 1
+        self.deleted_count += len(doomed)
+        if doomed:
+            self.version += 1
+        if (self.deleted_count >= self.compact_min and not self._active_scans and
+                self.deleted_count >= self.compact_ratio * len(self.storage)):
+            self.vacuum()
+        return len(doomed)
+
+    def vacuum(self) -> int:
+        """Drop tombstoned rows from storage and renumber indexes; returns the rows reclaimed."""
+        reclaimed = self.deleted_count
+        if reclaimed and self._active_scans:
+            raise ValueError(f"Table {self.name} has open scans; finish or close them before VACUUM.")
+        if reclaimed:
+            deleted = self.deleted
+            self.storage.keep(pos for pos in range(len(self.storage)) if not deleted[pos])
+            self.deleted = bytearray(len(self.storage))
+            self.deleted_count = 0
+            self.version += 1
+            self.epoch += 1
+            self._rebuild_indexes()
+        return reclaimed
+
+    def add_column(self, col: str, typ: str) -> None:
+        if col in self.schema:
+            raise ValueError(f"Column {col} already exists.")
+        # Backfill default value (None)
+        self.storage.add_column(col, typ)
+        self.schema[col] = typ
+        self.version += 1
+
+    def create_index(self, name: str, columns: List[str], kind: str = "hash") -> None:
+        if name in self.indexes:
+            raise ValueError(f"Index {name} already exists on {self.name}.")
+        for col in columns:
+            if col not in self.schema:
+                raise ValueError(f"Column {col} does not exist in {self.name}.")
+        idx = make_index(name, columns, kind)
+        idx.rebuild(self._iter_live())
+        self.indexes[name] = idx
+
+    def drop_index(self, name: str) -> None:
+        if name not in self.indexes:
+            raise ValueError(f"Index {name} does not exist on {self.name}.")
+        del self.indexes[name]
+
+    def _rebuild_indexes(self) -> None:
+        for idx in self.indexes.values():
+            idx.rebuild(self._iter_live())
+
+    def _iter_live(self):
+        deleted = self.deleted
+        return ((pos, row) for pos, row in self.storage.iter_rows() if not deleted[pos])
+
+    def _normalize_filters(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        # Cast filter values to column types so SQL literals compare (and hash) like stored values
+        out = {}
+        for k, v in filters.items():
+            if k not in self.schema or v is None:
+                out[k] = v
+            elif isinstance(v, Range):
+                out[k] = v.map(lambda b, k=k: self._cast(k, b))
+            else:
+                out[k] = self._cast(k, v)
+        return out
+
+    def _pick_index(self, filters: Dict[str, Any]):
+        return pick_index(self.indexes.values(), filters)
+
+    def _matches(self, pos: int, filters: Dict[str, Any]) -> bool:
+        value = self.storage.value
+        for k, v in filters.items():
+            if isinstance(v, Range):
+                if not v.matches(value(pos, k)):
+                    return False
+            elif value(pos, k) != v:
+                return False
+        return True
+
+    def _live_positions(self) -> Iterable[int]:
+        if not self.deleted_count:
+            return range(len(self.storage))
+        deleted = self.deleted
+        return (pos for pos in range(len(self.storage)) if not deleted[pos])
+
+    def _match_positions(self, filters: Optional[Dict[str, Any]]) -> List[int]:
+        return list(self._iter_positions(filters))
+
+    def _iter_positions(self, filters: Optional[Dict[str, Any]], parallel=None) -> Iterable[int]:
+        if not filters:
+            return self._live_positions()
+        filters = self._normalize_filters(filters)
+        idx = self._pick_index(filters)
+        if idx is not None:
+            # Indexes only ever hold live positions
+            candidates = sorted(idx.lookup(filters))
+            rest = {k: v for k, v in filters.items() if k not in idx.columns}
+        else:
+            vector_hit = None if parallel is None else parallel.match_positions(self, filters)
+            if vector_hit is None:
+                vector_hit = vectorized.match_positions(self, filters)
+            if vector_hit is not None:
+                candidates, rest = vector_hit
+            else:
+                candidates = self._live_positions()
+                rest = filters
+        if not rest:
+            return candidates
+        return (pos for pos in candidates if self._matches(pos, rest))
 
     def _validate_row(self, row_data: Dict[str, Any]) -> Dict[str, Any]:
         out = {}
@@ -70,30 +398,324 @@ class Table:
             out[col] = self._cast(col, row_data[col])
         return out
 
+    def _validate_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Single pass over the batch with the per-column casts resolved once
+        casts = [(col, self._caster(col)) for col in self.schema]
+        out = []
+        for row_data in rows:
+            row = {}
+            for col, cast in casts:
+                if col not in row_data:
+                    raise ValueError(f"Column {col} required")
+                row[col] = cast(row_data[col])
+            out.append(row)
+        return out
+
     def _cast(self, col: str, value: Any) -> Any:
+        return self._caster(col)(value)
+
+    def _caster(self, col: str):
         typ = self.schema[col]
         if typ == "int":
-            return int(value)
+            return int
         elif typ == "str":
-            return str(value)
+            return str
         elif typ == "date":
-            if isinstance(value, datetime.date):
-                return value
-            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+            return _cast_date
         else:
             raise ValueError(f"Type {typ} not supported for column {col}")
 
 
+class PartitionedTable(Table):
+    """
+    Table whose rows are split by the value of one column over child Tables, one per partition,
+    each with its own storage, tombstones and indexes (see partition.py for the schemes).
+    Reads, updates and deletes only visit the partitions their filters can match, and dropping
+    a partition discards its child table instead of deleting its rows one by one.
+    Permissions, the lock and the version belong to the partitioned table itself.
+    """
+    def __init__(self, name: str, schema: Dict[str, str], creator: str = None, storage: str = "row",
+                 partition_by: Optional[Dict[str, Any]] = None):
+        super().__init__(name, schema, creator, storage)
+        self.storage_kind = self.storage.kind
+        del self.storage, self.deleted, self.deleted_count  # rows live in the partitions
+        column = (partition_by or {}).get("column")
+        if column not in schema:
+            raise ValueError(f"Partition column {column} does not exist in {name}.")
+        self.partitioning = make_partitioning(partition_by, self._caster(column))
+        self.index_defs: Dict[str, Tuple[List[str], str]] = {}  # created on every partition
+        self.partitions: Dict[str, Table] = {p: self._new_partition(p) for p in self.partitioning.names}
+
+    def __setstate__(self, state):
+        state['_active_scans'] = 0
+        state['lock'] = RWLock()
+        self.__dict__.update(state)
+
+    def _new_partition(self, name: str) -> Table:
+        part = Table(name, dict(self.schema), storage=self.storage_kind)
+        for idx_name, (columns, kind) in self.index_defs.items():
+            part.create_index(idx_name, columns, kind)
+        return part
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self.partitions.values())
+
+    @property
+    def rows(self) -> List[Dict[str, Any]]:
+        return [row for p in self.partitions.values() for row in p.rows]
+
+    def memory_usage(self) -> int:
+        return sum(p.memory_usage() for p in self.partitions.values())
+
+    def _pruned(self, filters: Optional[Dict[str, Any]]) -> List[Table]:
+        """Partitions the filters can match, in partition order."""
+        if not filters:
+            return list(self.partitions.values())
+        return [self.partitions[p] for p in self.partitioning.prune(self._normalize_filters(filters))]
+
+    def _route(self, rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Validated rows grouped by partition; raises before anything is stored if one fits none."""
+        column, route = self.partitioning.column, self.partitioning.route
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            out.setdefault(route(row[column]), []).append(row)
+        return out
+
+    # -- rows
+
+    def _append(self, validated: Dict[str, Any]) -> None:
+        self.partitions[self.partitioning.route(validated[self.partitioning.column])]._append(validated)
+        self.version += 1
+
+    def _extend(self, validated: List[Dict[str, Any]]) -> int:
+        for name, rows in self._route(validated).items():
+            self.partitions[name]._extend(rows)
+        self.version += 1
+        return len(validated)
+
+    def scan(self, filters: Optional[Dict[str, Any]] = None,
+             columns: Optional[List[str]] = None, parallel=None) -> Iterator[Dict[str, Any]]:
+        if columns is not None:
+            for col in columns:
+                if col not in self.schema:
+                    raise ValueError(f"Column {col} does not exist in {self.name}.")
+        return self._scan_partitions(self._pruned(filters), filters, columns, parallel)
+
+    def _scan_partitions(self, parts: List[Table], filters, columns, parallel) -> Iterator[Dict[str, Any]]:
+        # Each partition is planned (index, vectorized or parallel) only once the scan reaches it
+        for part in parts:
+            yield from part.scan(filters, columns, parallel)
+
+    def _aggregate_groups(self, slots, group_by, filters, parallel=None):
+        groups = accumulate((), slots, group_by)
+        for part in self._pruned(filters):
+            merge_groups(slots, groups, part._aggregate_groups(slots, group_by, filters, parallel))
+        return groups
+
+    def update(self, filters: Dict[str, Any], update_data: Dict[str, Any]) -> int:
+        changes = {uk: self._cast(uk, uv) for uk, uv in update_data.items() if uk in self.schema}
+        parts = self._pruned(filters)
+        column = self.partitioning.column
+        if column not in changes:
+            count = sum(part.update(filters, changes) for part in parts)
+        else:
+            # Rows of other partitions move to the one the new value belongs in
+            target = self.partitions[self.partitioning.route(changes[column])]
+            count = target.update(filters, changes) if target in parts else 0
+            for part in parts:
+                if part is not target:
+                    moved = [dict(row, **changes) for row in part.scan(filters)]
+                    if moved:
+                        part.delete(filters)
+                        target._extend(moved)
+                        count += len(moved)
+        if count:
+            self.version += 1
+        return count
+
+    def delete(self, filters: Dict[str, Any]) -> int:
+        count = sum(part.delete(filters) for part in self._pruned(filters))
+        if count:
+            self.version += 1
+        return count
+
+    def vacuum(self) -> int:
+        reclaimed = sum(part.vacuum() for part in self.partitions.values())
+        if reclaimed:
+            self.version += 1
+        return reclaimed
+
+    # -- schema
+
+    def add_column(self, col: str, typ: str) -> None:
+        if col in self.schema:
+            raise ValueError(f"Column {col} already exists.")
+        for part in self.partitions.values():
+            part.add_column(col, typ)
+        self.schema[col] = typ
+        self.version += 1
+
+    def create_index(self, name: str, columns: List[str], kind: str = "hash") -> None:
+        if name in self.index_defs:
+            raise ValueError(f"Index {name} already exists on {self.name}.")
+        for col in columns:
+            if col not in self.schema:
+                raise ValueError(f"Column {col} does not exist in {self.name}.")
+        make_index(name, columns, kind)  # rejects an unknown kind even with no partitions
+        for part in self.partitions.values():
+            part.create_index(name, columns, kind)
+        self.index_defs[name] = (list(columns), kind)
+
+    def drop_index(self, name: str) -> None:
+        if name not in self.index_defs:
+            raise ValueError(f"Index {name} does not exist on {self.name}.")
+        for part in self.partitions.values():
+            part.drop_index(name)
+        del self.index_defs[name]
+
+    def add_partition(self, name: str, bound: Any) -> None:
+        """New RANGE partition for values below bound (None: MAXVALUE), after the existing ones."""
+        self.partitioning.add(name, None if bound is None else self._cast(self.partitioning.column, bound))
+        self.partitions[name] = self._new_partition(name)
+        self.version += 1
+
+    def drop_partition(self, name: str) -> Table:
+        """Discard a partition and every row in it; returns the dropped child table."""
+        if name not in self.partitions:
+            raise ValueError(f"Partition {name} does not exist on {self.name}.")
+        self.partitioning.drop(name)
+        part = self.partitions.pop(name)
+        self.version += 1
+        return part
+
+
+def _cast_date(value: Any) -> datetime.date:
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class PreparedQuery:
+    """
+    Handle returned by AetherDB.prepare: execute(*args, **kwargs) binds ?/:name parameters.
+    """
+    def __init__(self, db: "AetherDB", sql: str):
+        from .query_parser import prepare_sql
+        self.db = db
+        self.statement = prepare_sql(sql)
+
+    def execute(self, *args, stream: bool = False, **kwargs):
+        action, data = self.statement.bind(*args, **kwargs)
+        return self.db._dispatch(action, data, stream)
+
+
+class ResultStream:
+    """
+    Lazily produced SELECT result: column names are known up front, row dicts are yielded
+    as the stream is iterated (once).
+    """
+    def __init__(self, columns: List[str], rows: Iterable[Dict[str, Any]]):
+        self.columns = columns
+        self._rows = iter(rows)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self._rows
+
+    def __next__(self) -> Dict[str, Any]:
+        return next(self._rows)
+
+    def batches(self, size: int) -> Iterator[List[Dict[str, Any]]]:
+        """Yield lists of at most size rows until the stream is exhausted."""
+        while True:
+            batch = list(islice(self._rows, size))
+            if not batch:
+                return
+            yield batch
+
+    def close(self) -> None:
+        """Stop early: the underlying scan ends and releases its table."""
+        close = getattr(self._rows, "close", None)
+        if close is not None:
+            close()
+
+
+def _write_snapshot(path: str, tables, meta: Optional[Dict[str, Any]] = None,
+                    compression: Optional[str] = "zlib", **options) -> None:
+    """
+    Write tables in the binary snapshot format (see snapshot.py) straight into an encrypted file
+    (EncryptedWriter options), via a temporary file that replaces path only once complete.
+    """
+    from .encryption import EncryptedWriter
+    from .snapshot import write_snapshot
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            # Column blocks are compressed (or not) by the snapshot itself
+            with EncryptedWriter(f, compress=False, **options) as enc:
+                write_snapshot(enc, tables, meta, compression)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _read_snapshot(path: str, password: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """
+    (meta, tables) for a binary snapshot, whose tables are decoded lazily; (None, object) for
+    files written before it, which hold a pickle.
+    """
+    import pickle
+    from .encryption import open_decrypted
+    from .snapshot import SNAPSHOT_MAGIC, is_snapshot, read_snapshot
+    with open(path, "rb") as f, open_decrypted(f, password) as plain:
+        if is_snapshot(plain.peek(len(SNAPSHOT_MAGIC))):
+            return read_snapshot(plain.read())
+        return None, pickle.load(plain)
+
+
+def _locked_rows(tables: List[Table], rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows, holding the tables' read locks only while each batch is produced. Batches
+    start at one row and double up to SCAN_BATCH, so a consumer reading only the first few
+    rows does not pay for a full batch. Writes may land between batches: later batches see
+    them, and Table.scan re-checks its filters on rows changed since it began.
+    """
+    rows = iter(rows)
+    size = 1
+    while True:
+        with read_all(tables):
+            batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield from batch
+        size = min(size * 2, SCAN_BATCH)
+
+
 class AetherDB:
     """
     Main database engine. Manages tables and provides CRUD API.
     """
+    sql_workers = min(32, (os.cpu_count() or 1) + 4)  # threads behind submit_sql
+
     def __init__(self):
         self.tables: Dict[str, Table] = {}
+        self.result_cache: Optional[ResultCache] = None  # opt in with enable_result_cache()
+        self.parallel = None  # ParallelExecutor, opt in with enable_parallel()
+        self.wal = None  # WriteAheadLog when opened with AetherDB.open()
+        self.wal_dir = None
+        self.checkpoint_bytes = 0
+        self._wal_lock = threading.RLock()
+        self._catalog_lock = threading.Lock()  # creating and renaming tables
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Per thread/task session state; new threads start logged out (see session())
+        self._user: contextvars.ContextVar = contextvars.ContextVar("aetherdb_user", default=None)
+        self._token: contextvars.ContextVar = contextvars.ContextVar("aetherdb_token", default=None)
         from .auth import AuthManager
         from .utils import audit_log
         self.auth = AuthManager()
-        self.current_user = None
         self.audit_log = audit_log
         # Bootstrap: create default 'aether' user if no users
         if not self.auth.users:
@@ -104,6 +726,50 @@ class AetherDB:
         else:
             self.bootstrapped_user = False
 
+    @property
+    def current_user(self) -> Optional[str]:
+        """User logged in in the current thread or task."""
+        return self._user.get()
+
+    @current_user.setter
+    def current_user(self, user: Optional[str]) -> None:
+        self._user.set(user)
+
+    @property
+    def session_token(self) -> Optional[str]:
+        """Token issued by the last login() in this thread or task; reuse it with login_token()."""
+        return self._token.get()
+
+    @session_token.setter
+    def session_token(self, token: Optional[str]) -> None:
+        self._token.set(token)
+
+    @contextmanager
+    def session(self, user: Optional[str]):
+        """
+        Act as user (already authenticated by the caller) for the duration of the block, in this
+        thread or task only.
+        """
+        if user is not None and self.auth.get_user(user) is None:
+            raise ValueError(f"No such user {user}")
+        token = self._user.set(user)
+        try:
+            yield self
+        finally:
+            self._user.reset(token)
+
+    def submit_sql(self, sql: str, params=None) -> Future:
+        """
+        Run execute_sql on the engine's thread pool as the current user; the Future resolves to
+        the result (SELECT rows as a list). Statements on different tables, and reads of the same
+        table, run in parallel.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.sql_workers, thread_name_prefix="aetherdb-sql")
+        return self._executor.submit(contextvars.copy_context().run, self.execute_sql, sql, params)
+
     def add_user(self, username: str, password: str, role: str = "user"):
         self.auth.add_user(username, password, role)
         if self.current_user is None:
@@ -112,15 +778,35 @@ class AetherDB:
         else:
             self.audit_log(self.current_user, "add_user", f"Added user {username} (role={role})")
 
+    def add_users(self, users: List[Tuple[str, str, str]]) -> List[str]:
+        """Create many (username, password, role) users, hashing passwords in parallel."""
+        self.require_login()
+        self.require_priv('admin')
+        names = self.auth.add_users(users)
+        self.audit_log(self.current_user, "add_users", lambda: f"Added users {', '.join(names)}")
+        return names
+
     def login(self, username: str, password: str) -> bool:
         res = self.auth.authenticate(username, password)
         if res:
             self.audit_log(username, "login", "Login successful")
             self.current_user = username
+            self.session_token = self.auth.issue_token(username)
         else:
             self.audit_log(username, "login_fail", f"Login failed")
         return res
 
+    def login_token(self, token: str) -> bool:
+        """Log in with a session token from an earlier login(), without checking the password again."""
+        username = self.auth.verify_token(token)
+        if username is None:
+            self.audit_log(None, "login_fail", "Invalid or expired session token")
+            return False
+        self.audit_log(username, "login", "Session token accepted")
+        self.current_user = username
+        self.session_token = token
+        return True
+
     def require_login(self):
         if not self.current_user:
             raise PermissionError("Must login first.")
@@ -148,15 +834,19 @@ class AetherDB:
         self.audit_log(user, "passwd", "Changed user password.")
 
     # PATCH CRUD to require login and check role
-    def create_table(self, table_name: str, schema: Dict[str, str]) -> None:
+    def create_table(self, table_name: str, schema: Dict[str, str], storage: str = "row",
+                     partition_by: Optional[Dict[str, Any]] = None) -> None:
+        """
+        partition_by splits the table by one column, e.g. {"kind": "range", "column": "day",
+        "partitions": [("p2024", "2025-01-01"), ("pmax", None)]} (None: MAXVALUE) or
+        {"kind": "hash", "column": "id", "partitions": 4}.
+        """
         self.require_login()
         u = self.auth.get_user(self.current_user)
         if u.role == 'readonly':
             raise PermissionError("Read-only user: cannot create tables.")
-        if table_name in self.tables:
-            raise ValueError(f"Table {table_name} already exists.")
-        t = Table(table_name, schema, creator=self.current_user)
-        self.tables[table_name] = t
+        extra = (partition_by,) if partition_by else ()
+        self._write("create_table", table_name, schema, storage, self.current_user, *extra)
         self.audit_log(self.current_user, "create_table", f"{table_name}")
 
     def check_perm(self, table_name, perm):
@@ -169,47 +859,157 @@ class AetherDB:
     def insert(self, table_name: str, row_data: Dict[str, Any]) -> None:
         self.require_login()
         self.check_perm(table_name, 'write')
-        self.audit_log(self.current_user, "insert", f"into {table_name}: {row_data}")
-        return type(self).insert.__func__(self, table_name, row_data)
+        self.audit_log(self.current_user, "insert", lambda: f"into {table_name}: {row_data}")
+        return self._write("insert", table_name, row_data)
+
+    def insert_many(self, table_name: str, rows: List[Dict[str, Any]]) -> int:
+        """Insert a batch of rows with one permission check and one audit entry."""
+        self.require_login()
+        self.check_perm(table_name, 'write')
+        count = self._write("insert_many", table_name, rows)
+        self.audit_log(self.current_user, "insert_many", f"into {table_name}: {count} rows")
+        return count
 
-    def select(self, table_name: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    def select(self, table_name: str, filters: Optional[Dict[str, Any]] = None,
+               columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return list(self.iter_select(table_name, filters, columns))
+
+    def iter_select(self, table_name: str, filters: Optional[Dict[str, Any]] = None,
+                    columns: Optional[List[str]] = None) -> "ResultStream":
+        """Like select, but rows are produced lazily as the result is iterated."""
+        self.require_login()
+        self.check_perm(table_name, 'read')
+        self.audit_log(self.current_user, "select", lambda: f"{columns or '*'} from {table_name} ({filters})")
+        t = self.tables[table_name]
+        key = ("select", filters_key(t._normalize_filters(filters or {})), None if columns is None else tuple(columns))
+
+        def compute() -> ResultStream:
+            with t.lock.read():
+                rows = t.scan(filters, columns, self.parallel)
+                names = list(t.schema) if columns is None else list(columns)
+            return ResultStream(names, _locked_rows([t], rows))
+        return self._cached((table_name,), key, compute)
+
+    def aggregate(self, table_name: str, aggregates: List[Any], group_by: Optional[List[str]] = None,
+                  filters: Optional[Dict[str, Any]] = None, having: Optional[Dict[str, Any]] = None,
+                  columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Aggregates given as (func, column) pairs, e.g. [("COUNT", "*"), ("SUM", "amount")]."""
         self.require_login()
         self.check_perm(table_name, 'read')
-        self.audit_log(self.current_user, "select", f"from {table_name} ({filters})")
-        return type(self).select.__func__(self, table_name, filters)
+        self.audit_log(self.current_user, "aggregate",
+                       lambda: f"{aggregates} from {table_name} ({filters}) group by {group_by}")
+        t = self.tables[table_name]
+        key = ("aggregate", tuple(tuple(a) for a in aggregates), tuple(group_by or ()),
+               filters_key(t._normalize_filters(filters or {})), filters_key(having),
+               None if columns is None else tuple(columns))
+
+        def compute() -> ResultStream:
+            with t.lock.read():
+                rows = t.aggregate(aggregates, group_by, filters, having, columns, self.parallel)
+            return ResultStream(list(rows[0]) if rows else list(columns or []), rows)
+        return list(self._cached((table_name,), key, compute))
+
+    def _cached(self, tables: Tuple[str, ...], key: Tuple, compute) -> "ResultStream":
+        """
+        Serve a read query from the result cache when enabled and still valid (every table at
+        the version the result was computed at); otherwise run compute() and cache the result
+        as it is consumed. Callers check permissions before getting here.
+        """
+        cache = self.result_cache
+        if cache is None:
+            return compute()
+        versions = tuple(self.tables[t].version for t in tables)
+        key = (tables,) + key
+        try:
+            hit = cache.get(key, versions)
+        except TypeError:  # unhashable filter values; just run the query
+            return compute()
+        if hit is not None:
+            return ResultStream(*hit)
+        result = compute()
+        return ResultStream(result.columns, cache.recording(key, versions, result.columns, result))
+
+    def enable_result_cache(self, max_entries: int = 256, max_rows: int = 100_000) -> None:
+        """Cache SELECT/aggregate/join results (LRU, bounded by entries and total rows)."""
+        self.result_cache = ResultCache(max_entries, max_rows)
+
+    def disable_result_cache(self) -> None:
+        self.result_cache = None
+
+    def result_cache_info(self) -> Optional[Dict[str, int]]:
+        """Hit/miss/eviction counters and size of the result cache, or None when disabled."""
+        return None if self.result_cache is None else self.result_cache.info()
+
+    def enable_parallel(self, workers: Optional[int] = None, min_rows: Optional[int] = None) -> None:
+        """
+        Run unindexed filtered scans and aggregations on tables of at least min_rows rows across
+        a pool of worker processes (see parallel.py); smaller tables stay single-threaded.
+        """
+        from .parallel import PARALLEL_MIN_ROWS, ParallelExecutor
+        self.disable_parallel()
+        self.parallel = ParallelExecutor(workers, PARALLEL_MIN_ROWS if min_rows is None else min_rows)
+
+    def disable_parallel(self) -> None:
+        """Stop the worker processes and free the tables' shared memory copies."""
+        parallel, self.parallel = self.parallel, None
+        if parallel is not None:
+            parallel.shutdown()
+
+    def parallel_info(self) -> Optional[Dict[str, Any]]:
+        return None if self.parallel is None else self.parallel.info()
+
+    def _invalidate_cached(self, table: Optional[str] = None) -> None:
+        if self.result_cache is not None:
+            self.result_cache.invalidate(table)
+
+    def join(self, left: str, right: str, on: List[str], filters: Optional[Dict[str, Any]] = None,
+             columns: Optional[List[str]] = None) -> "ResultStream":
+        """
+        Inner equi-join streamed as a ResultStream. on is a pair of column references (col or
+        table.col), e.g. ["orders.customer", "customers.id"]; filters and columns use the same names.
+        """
+        self.require_login()
+        self.check_perm(left, 'read')
+        self.check_perm(right, 'read')
+        self.audit_log(self.current_user, "join", lambda: f"{left} with {right} on {on} ({filters})")
+        key = ("join", tuple(on), filters_key(filters), None if columns is None else tuple(columns))
+
+        def compute() -> ResultStream:
+            tables = [self.tables[left], self.tables[right]]
+            with read_all(tables):
+                names, rows = hash_join(tables[0], tables[1], tuple(on), filters, columns)
+            return ResultStream(names, _locked_rows(tables, rows))
+        return self._cached((left, right), key, compute)
 
     def update(self, table_name: str, filters: Dict[str, Any], update_data: Dict[str, Any]) -> int:
         self.require_login()
         self.check_perm(table_name, 'write')
-        self.audit_log(self.current_user, "update", f"table {table_name}, set={update_data}, where={filters}")
-        return type(self).update.__func__(self, table_name, filters, update_data)
+        self.audit_log(self.current_user, "update", lambda: f"table {table_name}, set={update_data}, where={filters}")
+        return self._write("update", table_name, filters, update_data)
 
     def delete(self, table_name: str, filters: Dict[str, Any]) -> int:
         self.require_login()
         self.check_perm(table_name, 'write')
-        self.audit_log(self.current_user, "delete", f"from {table_name} where {filters}")
-        return type(self).delete.__func__(self, table_name, filters)
+        self.audit_log(self.current_user, "delete", lambda: f"from {table_name} where {filters}")
+        return self._write("delete", table_name, filters)
 
     def grant(self, table: str, user: str, perm: str):
         self.require_login()
         self.check_perm(table, 'admin')
-        self.tables[table].grant(user, perm)
+        self._write("grant", table, user, perm)
         self.audit_log(self.current_user, "grant", f"{perm} on {table} to {user}")
 
     def revoke(self, table: str, user: str, perm: str):
         self.require_login()
         self.check_perm(table, 'admin')
-        self.tables[table].revoke(user, perm)
+        self._write("revoke", table, user, perm)
         self.audit_log(self.current_user, "revoke", f"{perm} on {table} from {user}")
 
     def alter_table_rename(self, table, newname):
         self.require_login()
         self.require_priv('write')
         self.check_perm(table, 'admin')
-        if newname in self.tables:
-            raise ValueError(f"Table {newname} already exists.")
-        self.tables[newname] = self.tables.pop(table)
-        self.tables[newname].name = newname
+        self._write("rename_table", table, newname)
         self.audit_log(self.current_user, "rename_table", f"{table} -> {newname}")
         return f"Table {table} renamed to {newname}."
 
@@ -217,28 +1017,227 @@ class AetherDB:
         self.require_login()
         self.require_priv('write')
         self.check_perm(table, 'admin')
-        t = self.tables[table]
-        if col in t.schema:
-            raise ValueError(f"Column {col} already exists.")
-        t.schema[col] = typ
-        # Backfill default value (None)
-        for row in t.rows:
-            row[col] = None
+        self._write("add_column", table, col, typ)
         self.audit_log(self.current_user, "add_column", f"to {table}: {col} {typ}")
         return f"Column {col} added to table {table}."
 
-    def execute_sql(self, sql: str):
-        """Accept an SQL string, parse it, and dispatch to engine handlers."""
-        from .query_parser import parse_sql, sql_to_engine_args
-        parsed = parse_sql(sql)
-        action, args = sql_to_engine_args(parsed)
+    def alter_table_add_partition(self, table, name, bound):
+        self.require_login()
+        self.require_priv('write')
+        self.check_perm(table, 'admin')
+        self._partitioned(table)
+        self._write("add_partition", table, name, bound)
+        self.audit_log(self.current_user, "add_partition", f"to {table}: {name} below {bound}")
+        return f"Partition {name} added to table {table}."
+
+    def alter_table_drop_partition(self, table, name):
+        self.require_login()
+        self.require_priv('write')
+        self.check_perm(table, 'admin')
+        self._partitioned(table)
+        part = self._write("drop_partition", table, name)
+        if self.parallel is not None:
+            self.parallel.forget(part)
+        self.audit_log(self.current_user, "drop_partition", f"{name} of {table}: {len(part)} rows")
+        return f"Partition {name} dropped from table {table}: {len(part)} rows removed."
+
+    def _partitioned(self, table: str) -> "PartitionedTable":
+        t = self.tables[table]
+        if not isinstance(t, PartitionedTable):
+            raise ValueError(f"Table {table} is not partitioned.")
+        return t
+
+    def create_index(self, table, name, columns, kind="hash"):
+        self.require_login()
+        self.require_priv('write')
+        self.check_perm(table, 'admin')
+        self._write("create_index", table, name, columns, kind)
+        self.audit_log(self.current_user, "create_index", f"{name} on {table} using {kind} ({', '.join(columns)})")
+        return f"Index {name} created on table {table}."
+
+    def drop_index(self, table, name):
+        self.require_login()
+        self.require_priv('write')
+        self.check_perm(table, 'admin')
+        self._write("drop_index", table, name)
+        self.audit_log(self.current_user, "drop_index", f"{name} on {table}")
+        return f"Index {name} dropped from table {table}."
+
+    def vacuum(self, table):
+        self.require_login()
+        self.require_priv('write')
+        self.check_perm(table, 'admin')
+        t = self.tables[table]
+        with self._wal_lock, t.lock.write():  # not logged, but must not interleave with a checkpoint
+            reclaimed = t.vacuum()
+        self.audit_log(self.current_user, "vacuum", f"{table}: {reclaimed} rows reclaimed")
+        return f"Table {table} vacuumed: {reclaimed} rows reclaimed."
+
+    def _write(self, op: str, *args):
+        """
+        Apply a change and, when a write-ahead log is attached, log it: the record is appended
+        under the WAL lock (so checkpoints see changes and records in the same order) and
+        committed outside it, letting concurrent writers share one fsync.
+        """
+        wal = self.wal
+        with ExitStack() as locks:
+            if wal is not None:
+                locks.enter_context(self._wal_lock)
+            self._lock_for_write(locks, op, args)
+            result = self._apply(op, args)
+            if wal is None:
+                return result
+            lsn = wal.append(op, args)
+        wal.commit(lsn)
+        if self.checkpoint_bytes and wal.size >= self.checkpoint_bytes:
+            self.checkpoint()
+        return result
+
+    def _lock_for_write(self, locks: ExitStack, op: str, args: tuple) -> None:
+        """Enter the locks a change needs: the catalog lock for create/rename, the table's write lock."""
+        if op in ("create_table", "rename_table"):
+            locks.enter_context(self._catalog_lock)
+        if op == "create_table":
+            return
+        t = self.tables.get(args[0])
+        if t is None:
+            raise ValueError(f"Table {args[0]} does not exist.")
+        locks.enter_context(t.lock.write())
+        if self.tables.get(args[0]) is not t:  # renamed while we waited
+            raise ValueError(f"Table {args[0]} does not exist.")
+
+    def _apply(self, op: str, args: tuple):
+        """Change the tables without permission checks or auditing (also used for WAL replay)."""
+        if op == "create_table":
+            name, schema, storage, creator = args[:4]
+            if name in self.tables:
+                raise ValueError(f"Table {name} already exists.")
+            if len(args) > 4:
+                self.tables[name] = PartitionedTable(name, schema, creator, storage, partition_by=args[4])
+            else:
+                self.tables[name] = Table(name, schema, creator=creator, storage=storage)
+            self._invalidate_cached(name)  # results of an earlier table by that name
+            return None
+        elif op == "rename_table":
+            table, newname = args
+            if newname in self.tables:
+                raise ValueError(f"Table {newname} already exists.")
+            t = self.tables[newname] = self.tables.pop(table)
+            t.name = newname
+            t.version += 1
+            self._invalidate_cached(table)
+            self._invalidate_cached(newname)
+            return None
+        t = self.tables[args[0]]
+        if op == "insert":
+            return t.insert(args[1])
+        elif op == "insert_many":
+            return t.insert_many(args[1])
+        elif op == "update":
+            return t.update(args[1], args[2])
+        elif op == "delete":
+            return t.delete(args[1])
+        elif op == "grant":
+            return t.grant(args[1], args[2])
+        elif op == "revoke":
+            return t.revoke(args[1], args[2])
+        elif op == "add_column":
+            return t.add_column(args[1], args[2])
+        elif op == "create_index":
+            return t.create_index(args[1], args[2], args[3])
+        elif op == "drop_index":
+            return t.drop_index(args[1])
+        elif op == "add_partition":
+            return t.add_partition(args[1], args[2])
+        elif op == "drop_partition":
+            return t.drop_partition(args[1])
+        raise ValueError(f"Unknown change {op}")
+
+    @classmethod
+    def open(cls, directory: str, password: str, checkpoint_bytes: int = 64 * 1024 * 1024,
+             fsync: bool = True, commit_delay: float = 0.0) -> "AetherDB":
+        """
+        Open (or create) a durable database in directory: load the last checkpoint snapshot,
+        replay the write-ahead log past it, and log every further change. A checkpoint is taken
+        whenever the log grows past checkpoint_bytes (0 disables automatic checkpoints).
+        """
+        from .wal import WriteAheadLog
+        os.makedirs(directory, exist_ok=True)
+        db = cls()
+        snapshot_lsn = 0
+        snapshot = os.path.join(directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot):
+            meta, state = _read_snapshot(snapshot, password)
+            if meta is None:
+                state, meta = state["tables"], state
+            db.tables, snapshot_lsn = state, meta["lsn"]
+        wal = WriteAheadLog(os.path.join(directory, WAL_FILE), password, fsync=fsync, commit_delay=commit_delay)
+        for lsn, op, args in wal.replay():
+            if lsn > snapshot_lsn:
+                db._apply(op, args)
+        wal.last_lsn = max(wal.last_lsn, snapshot_lsn)
+        db.wal, db.wal_dir, db.checkpoint_bytes = wal, directory, checkpoint_bytes
+        return db
+
+    def checkpoint(self) -> int:
+        """
+        Write a snapshot of all tables (encrypted with the log's key) and start an empty log.
+        Returns the LSN the snapshot covers.
+        """
+        wal = self.wal
+        if wal is None:
+            raise ValueError("No write-ahead log attached; open the database with AetherDB.open().")
+        with self._wal_lock:
+            lsn = wal.last_lsn
+            # Same salt as the log, so open() derives the password key only once per file
+            _write_snapshot(os.path.join(self.wal_dir, SNAPSHOT_FILE), self.tables, {"lsn": lsn},
+                            key=wal.key, salt=wal.salt)
+            wal.reset(lsn)
+        self.audit_log(self.current_user, "checkpoint", f"{self.wal_dir} at lsn {lsn}")
+        return lsn
+
+    def close(self) -> None:
+        """Stop the submit_sql pool and parallel workers, and flush and close the write-ahead log."""
+        self.disable_parallel()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+
+    def execute_sql(self, sql: str, params=None, stream: bool = False):
+        """
+        Accept an SQL string, parse it (through the statement cache), and dispatch to engine
+        handlers. params binds ?/:name placeholders: a sequence for ?, a mapping for :name.
+        With stream=True a SELECT returns a lazy ResultStream instead of a list.
+        """
+        from .query_parser import sql_to_engine_args
+        action, args = sql_to_engine_args(sql, params)
+        return self._dispatch(action, args, stream)
+
+    def prepare(self, sql: str) -> "PreparedQuery":
+        """Parse a statement once for repeated execution with different parameters."""
+        return PreparedQuery(self, sql)
+
+    def _dispatch(self, action: str, args: dict, stream: bool = False):
         if action == 'create_table':
-            return self.create_table(args['table'], args['schema'])
+            return self.create_table(args['table'], args['schema'], args.get('storage', 'row'),
+                                     args.get('partition_by'))
         elif action == 'insert':
             return self.insert(args['table'], args['row'])
+        elif action == 'insert_many':
+            return self.insert_many(args['table'], args['rows'])
         elif action == 'select':
-            # select fields, but for MVP just returns all columns
-            return self.select(args['table'], args.get('where'))
+            result = self.iter_select(args['table'], args.get('where'), args.get('columns'))
+            return result if stream else list(result)
+        elif action == 'join':
+            result = self.join(args['table'], args['join_table'], args['on'], args.get('where'), args.get('columns'))
+            return result if stream else list(result)
+        elif action == 'aggregate':
+            rows = self.aggregate(args['table'], args['aggregates'], args['group_by'], args.get('where'),
+                                  args.get('having'), args['columns'])
+            return ResultStream(args['columns'], rows) if stream else rows
         elif action == 'update':
             return self.update(args['table'], args['where'], args['update'])
         elif action == 'delete':
@@ -247,26 +1246,36 @@ class AetherDB:
             return self.alter_table_rename(args['table'], args['newname'])
         elif action == 'alter_addcol':
             return self.alter_table_add_column(args['table'], args['col'], args['type'])
+        elif action == 'alter_addpart':
+            return self.alter_table_add_partition(args['table'], args['name'], args['bound'])
+        elif action == 'alter_droppart':
+            return self.alter_table_drop_partition(args['table'], args['name'])
+        elif action == 'vacuum':
+            return self.vacuum(args['table'])
+        elif action == 'create_index':
+            return self.create_index(args['table'], args['name'], args['columns'], args.get('kind', 'hash'))
         else:
             raise ValueError(f"Unknown SQL action {action}")
 
-    def save_encrypted(self, file_path: str, password: str):
-        """Serialize and encrypt the DB to a file."""
-        import pickle
-        from .encryption import encrypt
-        data = pickle.dumps(self.tables)
-        enc = encrypt(data, password)
-        with open(file_path, "wb") as f:
-            f.write(enc)
+    def save_encrypted(self, file_path: str, password: str, compression: Optional[str] = "zlib"):
+        """
+        Write the DB to a file as an encrypted binary snapshot (compression: zlib, lzma or None
+        per column block). Saving over a file the password opens keeps its salt and data key, so
+        repeated saves skip Scrypt.
+        """
+        from .encryption import read_envelope
+        envelope = read_envelope(file_path, password)
+        salt, data_key = envelope if envelope is not None else (None, None)
+        _write_snapshot(file_path, self.tables, compression=compression, password=password, salt=salt,
+                        data_key=data_key)
 
     @classmethod
     def load_encrypted(cls, file_path: str, password: str):
-        """Load and decrypt DB from a file."""
-        import pickle
-        from .encryption import decrypt
-        with open(file_path, "rb") as f:
-            enc = f.read()
-        data = decrypt(enc, password)
+        """
+        Load a DB saved by save_encrypted (or an older pickled file). Tables of a binary snapshot
+        are decoded when first accessed through db.tables.
+        """
+        _, tables = _read_snapshot(file_path, password)
         obj = cls()
-        obj.tables = pickle.loads(data)
+        obj.tables = tables
         return obj
@@ -0,0 +1,168 @@
+"""
+DB-API 2.0 (PEP 249) style interface to an embedded AetherDB engine.
+
+SELECT results are streamed: a cursor pulls rows from a lazy table scan as they are fetched,
+so memory stays bounded by the fetch size rather than the size of the result.
+"""
+from itertools import islice
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from .db_engine import AetherDB, ResultStream
+
+apilevel = "2.0"
+threadsafety = 1  # connections must not be shared between threads
+paramstyle = "qmark"  # :name placeholders work as well
+
+
+class Error(Exception):
+    pass
+
+
+class InterfaceError(Error):
+    pass
+
+
+class DatabaseError(Error):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    pass
+
+
+class NotSupportedError(DatabaseError):
+    pass
+
+
+def connect(db: Optional[AetherDB] = None, user: Optional[str] = None, password: str = "") -> "Connection":
+    """
+    Open a connection to an embedded engine (a new empty one unless db is given),
+    optionally logging in as user.
+    """
+    db = db if db is not None else AetherDB()
+    if user is not None and not db.login(user, password):
+        raise OperationalError(f"Login failed for {user}")
+    return Connection(db)
+
+
+class Connection:
+    def __init__(self, db: AetherDB):
+        self.db = db
+        self.closed = False
+
+    def cursor(self) -> "Cursor":
+        self._check_open()
+        return Cursor(self)
+
+    def commit(self) -> None:
+        self._check_open()  # statements apply immediately; there is nothing to commit
+
+    def rollback(self) -> None:
+        raise NotSupportedError("AetherDB has no transactions to roll back")
+
+    def close(self) -> None:
+        self.closed = True
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise InterfaceError("Connection is closed")
+
+    def __enter__(self) -> "Connection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Cursor:
+    arraysize = 100
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.description: Optional[List[Tuple]] = None
+        self.rowcount = -1
+        self._stream: Optional[ResultStream] = None
+        self._columns: List[str] = []
+        self.closed = False
+
+    def execute(self, sql: str, params: Any = None) -> "Cursor":
+        self._check_open()
+        self._reset()
+        try:
+            result = self.connection.db.execute_sql(sql, params, stream=True)
+        except PermissionError as e:
+            raise OperationalError(str(e)) from e
+        except ValueError as e:
+            raise ProgrammingError(str(e)) from e
+        if isinstance(result, ResultStream):
+            self._stream = result
+            self._columns = result.columns
+            self.description = [(c, None, None, None, None, None, None) for c in result.columns]
+        elif isinstance(result, int):
+            self.rowcount = result
+        return self
+
+    def executemany(self, sql: str, seq_of_params: Sequence[Any]) -> "Cursor":
+        self._check_open()
+        self._reset()
+        stmt = self.connection.db.prepare(sql)
+        total = 0
+        for params in seq_of_params:
+            try:
+                result = stmt.execute(**params) if isinstance(params, dict) else stmt.execute(*params)
+            except PermissionError as e:
+                raise OperationalError(str(e)) from e
+            except ValueError as e:
+                raise ProgrammingError(str(e)) from e
+            total += result if isinstance(result, int) else 1
+        self.rowcount = total
+        return self
+
+    def fetchone(self) -> Optional[Tuple]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Tuple]:
+        stream = self._require_result()
+        cols = self._columns
+        return [tuple(row.get(c) for c in cols) for row in islice(stream, size or self.arraysize)]
+
+    def fetchall(self) -> List[Tuple]:
+        stream = self._require_result()
+        cols = self._columns
+        return [tuple(row.get(c) for c in cols) for row in stream]
+
+    def __iter__(self) -> Iterator[Tuple]:
+        stream = self._require_result()
+        cols = self._columns
+        return (tuple(row.get(c) for c in cols) for row in stream)
+
+    def setinputsizes(self, sizes) -> None:
+        pass
+
+    def setoutputsize(self, size, column=None) -> None:
+        pass
+
+    def close(self) -> None:
+        self._reset()
+        self.closed = True
+
+    def _reset(self) -> None:
+        self._stream = None
+        self._columns = []
+        self.description = None
+        self.rowcount = -1
+
+    def _require_result(self) -> ResultStream:
+        self._check_open()
+        if self._stream is None:
+            raise ProgrammingError("No result set: execute a SELECT first")
+        return self._stream
+
+    def _check_open(self) -> None:
+        if self.closed or self.connection.closed:
+            raise InterfaceError("Cursor is closed")
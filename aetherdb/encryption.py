@@ -1,9 +1,39 @@
 """
 AetherDB encryption utilities: AES-256 GCM with password-based key derivation.
+
+Besides the single-blob format (salt||nonce||ciphertext) there is a chunked stream format for
+large snapshots:
+
+    ENVELOPE_MAGIC | salt (16) | wrapped data key (60) | stream id (16) | flags (1) | frames...
+    frame: word (4 bytes: high bit = final, rest = length) | nonce || ciphertext
+
+Frames are encrypted with a random data key, which the header stores wrapped (AES-GCM) under the
+key derived from the password and salt. Saving the same file again can reuse the data key, and
+changing the password (rewrap) only rewrites the header. Each frame holds one (optionally
+zlib-compressed) chunk under its own random nonce. The stream id, the chunk index and the final
+flag are authenticated as AAD, so frames cannot be reordered, dropped, moved between files or
+truncated away undetected. Chunks are compressed and encrypted on a thread pool (zlib and
+cryptography release the GIL), with a bounded number in flight. Files with the earlier
+STREAM_MAGIC header (salt and flags only, frames under the password key) still load.
+
+Password-derived keys are cached per process (KeyCache) so Scrypt runs once per password and salt
+rather than on every load or save.
 """
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from threading import Lock
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Tuple
+import atexit
+import hashlib
+import hmac
+import io
 import os
+import shutil
+import struct
+import time
+import zlib
 
 # Constants for security
 SALT_SIZE = 16
@@ -17,6 +47,88 @@ def derive_key(password: str, salt: bytes) -> bytes:
     return kdf.derive(password.encode())
 
 
+class KeyCache:
+    """
+    Derived keys by (password fingerprint, salt), least recently used first out. Passwords are
+    never stored: the fingerprint is an HMAC under a random per-cache secret. Entries expire ttl
+    seconds after derivation (None: never; 0: caching disabled) and are overwritten with zeros when
+    they expire, are evicted or the cache is cleared. This is best effort: keys handed out are
+    copies the cache cannot wipe.
+    """
+    def __init__(self, ttl: Optional[float] = 600.0, max_entries: int = 32):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._secret = os.urandom(32)
+        self._entries: "OrderedDict[Tuple[bytes, bytes], Tuple[bytearray, Optional[float]]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, password: str, salt: bytes) -> bytes:
+        """The key for password and salt, running Scrypt only on a miss."""
+        entry_key = (hmac.new(self._secret, password.encode(), hashlib.sha256).digest(), bytes(salt))
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return bytes(entry[0])
+            self.misses += 1
+        key = derive_key(password, salt)  # outside the lock: Scrypt takes a while
+        if self.ttl != 0:
+            with self._lock:
+                if entry_key in self._entries:
+                    self._drop(entry_key)
+                expires = None if self.ttl is None else time.monotonic() + self.ttl
+                self._entries[entry_key] = (bytearray(key), expires)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+        return key
+
+    def _expire(self, now: float) -> None:
+        for k in [k for k, (_, expires) in self._entries.items() if expires is not None and expires <= now]:
+            self._drop(k)
+
+    def _drop(self, entry_key: Tuple[bytes, bytes]) -> None:
+        buf = self._entries.pop(entry_key)[0]
+        buf[:] = bytes(len(buf))
+
+    def clear(self) -> None:
+        with self._lock:
+            for k in list(self._entries):
+                self._drop(k)
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries),
+                "ttl": self.ttl, "max_entries": self.max_entries}
+
+
+_key_cache = KeyCache()
+
+
+def cached_key(password: str, salt: bytes) -> bytes:
+    """derive_key through the process-wide KeyCache."""
+    return _key_cache.get(password, salt)
+
+
+def configure_key_cache(ttl: Optional[float] = 600.0, max_entries: int = 32) -> KeyCache:
+    """Replace the process-wide key cache (the old one is wiped), e.g. configure_key_cache(ttl=0)."""
+    global _key_cache
+    old, _key_cache = _key_cache, KeyCache(ttl, max_entries)
+    old.clear()
+    return _key_cache
+
+
+@atexit.register
+def clear_key_cache() -> None:
+    """Wipe every cached key, e.g. when a session ends."""
+    _key_cache.clear()
+
+
 def encrypt(plaintext: bytes, password: str) -> bytes:
     """Encrypt data with a password. Returns: salt||nonce||ciphertext."""
     salt = os.urandom(SALT_SIZE)
@@ -32,6 +144,268 @@ def decrypt(ciphertext: bytes, password: str) -> bytes:
     salt = ciphertext[:SALT_SIZE]
     nonce = ciphertext[SALT_SIZE:SALT_SIZE + NONCE_SIZE]
     ct = ciphertext[SALT_SIZE + NONCE_SIZE:]
-    key = derive_key(password, salt)
+    key = cached_key(password, salt)
     aesgcm = AESGCM(key)
     return aesgcm.decrypt(nonce, ct, None)
+
+
+def encrypt_with_key(key: bytes, plaintext: bytes, aad: bytes = None) -> bytes:
+    """Encrypt with an already derived key (no per-call KDF). Returns: nonce||ciphertext."""
+    nonce = os.urandom(NONCE_SIZE)
+    return nonce + AESGCM(key).encrypt(nonce, plaintext, aad)
+
+
+def decrypt_with_key(key: bytes, data: bytes, aad: bytes = None) -> bytes:
+    """Decrypt nonce||ciphertext produced by encrypt_with_key; aad must match."""
+    return AESGCM(key).decrypt(data[:NONCE_SIZE], data[NONCE_SIZE:], aad)
+
+
+STREAM_MAGIC = b"AETHERENC2\n"  # chunked, frames under the password key (read only)
+ENVELOPE_MAGIC = b"AETHERENC3\n"
+CHUNK_SIZE = 1024 * 1024
+_COMPRESSED = 0x01
+_FINAL = 0x80000000
+_FRAME = struct.Struct(">I")
+_CHUNK_AAD = struct.Struct(">Q?")
+_WRAP_AAD = b"aetherdb-data-key"
+_WRAPPED_SIZE = NONCE_SIZE + KEY_SIZE + 16
+_STREAM_ID_SIZE = 16
+
+
+def _workers(workers: Optional[int]) -> int:
+    return workers or min(4, os.cpu_count() or 1)
+
+
+def wrap_key(kek: bytes, data_key: bytes) -> bytes:
+    return encrypt_with_key(kek, data_key, _WRAP_AAD)
+
+
+def unwrap_key(kek: bytes, wrapped: bytes) -> bytes:
+    return decrypt_with_key(kek, wrapped, _WRAP_AAD)
+
+
+class StreamHeader(NamedTuple):
+    salt: bytes
+    data_key: bytes  # the key the frames are encrypted with
+    aad: bytes  # prefix of every frame's AAD
+    compressed: bool
+    size: int  # bytes of header before the first frame
+
+
+def read_header(fileobj: BinaryIO, password: Optional[str] = None, key: Optional[bytes] = None) -> StreamHeader:
+    """
+    Parse the header of a chunked file and recover its data key, from password (through the key
+    cache) or from key, the already derived password key. Raises InvalidTag for a wrong password.
+    """
+    magic = fileobj.read(len(ENVELOPE_MAGIC))
+    if magic == ENVELOPE_MAGIC:
+        rest = fileobj.read(SALT_SIZE + _WRAPPED_SIZE + _STREAM_ID_SIZE + 1)
+        if len(rest) == SALT_SIZE + _WRAPPED_SIZE + _STREAM_ID_SIZE + 1:
+            salt, wrapped = rest[:SALT_SIZE], rest[SALT_SIZE:SALT_SIZE + _WRAPPED_SIZE]
+            data_key = unwrap_key(key or cached_key(password, salt), wrapped)
+            return StreamHeader(salt, data_key, magic + rest[SALT_SIZE + _WRAPPED_SIZE:],
+                                bool(rest[-1] & _COMPRESSED), len(magic) + len(rest))
+    elif magic == STREAM_MAGIC:
+        rest = fileobj.read(SALT_SIZE + 1)
+        if len(rest) == SALT_SIZE + 1:
+            salt = rest[:SALT_SIZE]
+            return StreamHeader(salt, key or cached_key(password, salt), magic + rest,
+                                bool(rest[-1] & _COMPRESSED), len(magic) + len(rest))
+    raise ValueError("Not a chunked AetherDB encrypted file")
+
+
+def read_envelope(path: str, password: str) -> Optional[Tuple[bytes, bytes]]:
+    """
+    (salt, data key) of an existing envelope file at path if password opens it, else None.
+    Passing them to EncryptedWriter when saving over the file skips both Scrypt (the key cache
+    already holds the password key) and generating a new data key.
+    """
+    from cryptography.exceptions import InvalidTag
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(ENVELOPE_MAGIC)) != ENVELOPE_MAGIC:
+                return None
+            f.seek(0)
+            header = read_header(f, password)
+    except (OSError, ValueError, InvalidTag):
+        return None
+    return header.salt, header.data_key
+
+
+def rewrap(path: str, old_password: str, new_password: str) -> None:
+    """
+    Change the password of an envelope file: the data key is re-wrapped under the new password
+    and the frames are copied unchanged (not re-encrypted). The file is replaced atomically.
+    """
+    with open(path, "rb") as src:
+        if src.read(len(ENVELOPE_MAGIC)) != ENVELOPE_MAGIC:
+            raise ValueError(f"{path} predates password envelopes; load it and save it again first")
+        src.seek(0)
+        header = read_header(src, old_password)
+        salt = os.urandom(SALT_SIZE)
+        tmp = path + ".tmp"
+        try:
+            with open(tmp, "wb") as dst:
+                dst.write(ENVELOPE_MAGIC + salt + wrap_key(cached_key(new_password, salt), header.data_key)
+                          + header.aad[len(ENVELOPE_MAGIC):])
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+class EncryptedWriter(io.RawIOBase):
+    """
+    Writable stream that encrypts everything written to it into fileobj in the chunked format,
+    e.g. pickle.dump(obj, writer). Pass either password (and optionally the salt to derive with)
+    or an already derived key with its salt. data_key defaults to a new random key; see
+    read_envelope for reusing one. Closing writes the final frame; leaving a with block on an
+    exception does not.
+    """
+    def __init__(self, fileobj: BinaryIO, password: Optional[str] = None, key: Optional[bytes] = None,
+                 salt: Optional[bytes] = None, data_key: Optional[bytes] = None, chunk_size: int = CHUNK_SIZE,
+                 compress: bool = True, workers: Optional[int] = None):
+        super().__init__()
+        if key is None:
+            salt = salt or os.urandom(SALT_SIZE)
+            key = cached_key(password, salt)
+        data_key = data_key or os.urandom(KEY_SIZE)
+        self._out = fileobj
+        self._aes = AESGCM(data_key)
+        self._aad = ENVELOPE_MAGIC + os.urandom(_STREAM_ID_SIZE) + bytes([_COMPRESSED if compress else 0])
+        self._compress = compress
+        self.chunk_size = chunk_size
+        self._buf = bytearray()
+        self._index = 0
+        self._pool = ThreadPoolExecutor(_workers(workers))
+        self._window = 2 * _workers(workers)
+        self._pending: deque = deque()
+        fileobj.write(ENVELOPE_MAGIC + salt + wrap_key(key, data_key) + self._aad[len(ENVELOPE_MAGIC):])
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        size = self.chunk_size
+        if len(self._buf) >= size:
+            whole = len(self._buf) - len(self._buf) % size
+            data = bytes(self._buf[:whole])
+            del self._buf[:whole]
+            for i in range(0, whole, size):
+                self._submit(data[i:i + size], False)
+        return len(b)
+
+    def _submit(self, chunk: bytes, final: bool) -> None:
+        self._pending.append(self._pool.submit(self._seal, self._index, chunk, final))
+        self._index += 1
+        while len(self._pending) > self._window:
+            self._out.write(self._pending.popleft().result())
+
+    def _seal(self, index: int, chunk: bytes, final: bool) -> bytes:
+        if self._compress:
+            chunk = zlib.compress(chunk, 1)
+        nonce = os.urandom(NONCE_SIZE)
+        ct = self._aes.encrypt(nonce, chunk, self._aad + _CHUNK_AAD.pack(index, final))
+        length = NONCE_SIZE + len(ct)
+        return _FRAME.pack(length | _FINAL if final else length) + nonce + ct
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._submit(bytes(self._buf), True)
+            self._buf = bytearray()
+            while self._pending:
+                self._out.write(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown()
+            super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.shutdown()
+            io.RawIOBase.close(self)
+
+
+class EncryptedReader(io.RawIOBase):
+    """Readable stream of the plaintext in a chunked file; frames are decrypted ahead on a thread pool."""
+    def __init__(self, fileobj: BinaryIO, password: Optional[str] = None, key: Optional[bytes] = None,
+                 workers: Optional[int] = None):
+        super().__init__()
+        header = read_header(fileobj, password, key)
+        self._in = fileobj
+        self._aes = AESGCM(header.data_key)
+        self._aad = header.aad
+        self._compressed = header.compressed
+        self._pool = ThreadPoolExecutor(_workers(workers))
+        self._window = 2 * _workers(workers)
+        self._chunks = self._decrypted()
+        self._chunk = memoryview(b"")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while self._pos >= len(self._chunk):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._chunk, self._pos = memoryview(chunk), 0
+        n = min(len(b), len(self._chunk) - self._pos)
+        b[:n] = self._chunk[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def _decrypted(self) -> Iterator[bytes]:
+        f = self._in
+        pending: deque = deque()
+        index = 0
+        done = False
+        while True:
+            while not done and len(pending) < self._window:
+                word = f.read(_FRAME.size)
+                if len(word) < _FRAME.size:
+                    raise ValueError("Encrypted file is truncated")
+                (word,) = _FRAME.unpack(word)
+                final, length = bool(word & _FINAL), word & ~_FINAL
+                frame = f.read(length)
+                if len(frame) < length:
+                    raise ValueError("Encrypted file is truncated")
+                pending.append(self._pool.submit(self._open, index, frame, final))
+                index += 1
+                if final:
+                    done = True
+                    if f.read(1):
+                        raise ValueError("Unexpected data after the final encrypted chunk")
+            if not pending:
+                return
+            yield pending.popleft().result()
+
+    def _open(self, index: int, frame: bytes, final: bool) -> bytes:
+        data = self._aes.decrypt(frame[:NONCE_SIZE], frame[NONCE_SIZE:],
+                                 self._aad + _CHUNK_AAD.pack(index, final))
+        return zlib.decompress(data) if self._compressed else data
+
+    def close(self) -> None:
+        if not self.closed:
+            self._pool.shutdown()
+        super().close()
+
+
+def open_decrypted(fileobj: BinaryIO, password: str, workers: Optional[int] = None) -> BinaryIO:
+    """
+    Readable plaintext stream of an encrypted file in either format: chunked files are
+    decrypted incrementally, single-blob (legacy) files in one piece.
+    """
+    head = fileobj.read(len(STREAM_MAGIC))
+    fileobj.seek(-len(head), io.SEEK_CUR)
+    if head in (ENVELOPE_MAGIC, STREAM_MAGIC):
+        return io.BufferedReader(EncryptedReader(fileobj, password, workers=workers), CHUNK_SIZE)
+    return io.BufferedReader(io.BytesIO(decrypt(fileobj.read(), password)))
@@ -0,0 +1,362 @@
+"""
+Hand-written tokenizer and recursive-descent parser for the AetherDB SQL subset.
+
+parse() returns a ParsedStatement that exposes the same names as the pyparsing results of
+sql_grammar (table, columns, where, ...), so query_parser.sql_to_engine_args turns either one
+into identical (action, data) tuples.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+
+class Param(str):
+    """Name of a bound parameter placeholder in a parsed statement."""
+
+
+class SQLSyntaxError(ValueError):
+    pass
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | "(?P<dq>[^"\n]*)"
+  | '(?P<sq>[^'\n]*)'
+  | (?P<num>\d+)
+  | :(?P<param>[A-Za-z0-9_]+)
+  | (?P<word>[A-Za-z][A-Za-z0-9_]*)
+  | (?P<op><=|>=|[<>=(),*.])
+""", re.VERBOSE)
+
+# Token kinds: 'word', 'op', 'value' (literal text or Param)
+Token = Tuple[str, Any, int]
+
+
+def tokenize(sql: str) -> List[Token]:
+    tokens: List[Token] = []
+    pos = 0
+    match = _TOKEN_RE.match
+    while pos < len(sql):
+        m = match(sql, pos)
+        if m is None:
+            raise SQLSyntaxError(f"Unexpected character {sql[pos]!r} at char {pos}")
+        kind = m.lastgroup
+        if kind == "word":
+            tokens.append(("word", m.group("word"), pos))
+        elif kind == "op":
+            tokens.append(("op", m.group("op"), pos))
+        elif kind == "param":
+            tokens.append(("value", Param(m.group("param")), pos))
+        elif kind != "ws":
+            tokens.append(("value", m.group(kind), pos))
+        pos = m.end()
+    return tokens
+
+
+class ParsedStatement:
+    """
+    Parse result with a ParseResults-like interface: iterating yields the top-level keyword and
+    identifier tokens, named parts are attributes (empty string when absent) or items.
+    """
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.fields: Dict[str, Any] = {}
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name in ("tokens", "fields"):
+            raise AttributeError(name)
+        return self.fields.get(name, "")
+
+    def __getitem__(self, name: str) -> Any:
+        return self.fields[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.fields
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.fields.get(name, default)
+
+    def __repr__(self) -> str:
+        return f"ParsedStatement({self.tokens!r}, {self.fields!r})"
+
+
+_COMPARISONS = ("<=", ">=", "<", ">", "=")
+_TYPES = ("INT", "STR", "DATE")
+_AGGREGATES = ("COUNT", "SUM", "MIN", "MAX", "AVG")
+
+
+class _Parser:
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.toks = tokenize(sql)
+        self.i = 0
+        self.out = ParsedStatement()
+
+    # -- token helpers
+    def _peek(self, offset: int = 0) -> Optional[Token]:
+        j = self.i + offset
+        return self.toks[j] if j < len(self.toks) else None
+
+    def _error(self, expected: str):
+        tok = self._peek()
+        found = "end of statement" if tok is None else repr(tok[1])
+        at = len(self.sql) if tok is None else tok[2]
+        raise SQLSyntaxError(f"Expected {expected}, found {found} (at char {at})")
+
+    def _at_kw(self, kw: str, offset: int = 0) -> bool:
+        tok = self._peek(offset)
+        return tok is not None and tok[0] == "word" and tok[1] == kw
+
+    def _accept_kw(self, *kws: str) -> Optional[str]:
+        tok = self._peek()
+        if tok is not None and tok[0] == "word" and tok[1] in kws:
+            self.i += 1
+            return tok[1]
+        return None
+
+    def _expect_kw(self, *kws: str) -> str:
+        kw = self._accept_kw(*kws)
+        if kw is None:
+            self._error(" or ".join(kws))
+        return kw
+
+    def _keyword(self, *kws: str) -> str:
+        kw = self._expect_kw(*kws)
+        self.out.tokens.append(kw)
+        return kw
+
+    def _accept_op(self, op: str) -> bool:
+        tok = self._peek()
+        if tok is not None and tok[0] == "op" and tok[1] == op:
+            self.i += 1
+            return True
+        return False
+
+    def _expect_op(self, op: str) -> None:
+        if not self._accept_op(op):
+            self._error(repr(op))
+
+    def _ident(self, name: Optional[str] = None) -> str:
+        tok = self._peek()
+        if tok is None or tok[0] != "word":
+            self._error("identifier")
+        self.i += 1
+        if name is not None:
+            self.out.tokens.append(tok[1])
+            self.out.fields[name] = tok[1]
+        return tok[1]
+
+    def _value(self) -> Any:
+        tok = self._peek()
+        if tok is None or tok[0] != "value":
+            self._error("value")
+        self.i += 1
+        return tok[1]
+
+    def _list(self, item) -> List[Any]:
+        items = [item()]
+        while self._accept_op(","):
+            items.append(item())
+        return items
+
+    def _paren_list(self, item) -> List[Any]:
+        self._expect_op("(")
+        items = self._list(item)
+        self._expect_op(")")
+        return items
+
+    # -- statements
+    def parse(self) -> ParsedStatement:
+        tok = self._peek()
+        head = tok[1] if tok is not None and tok[0] == "word" else None
+        if head == "CREATE" and self._at_kw("INDEX", 1):
+            self._create_index()
+        elif head == "CREATE":
+            self._create_table()
+        elif head == "INSERT":
+            self._insert()
+        elif head == "SELECT":
+            self._select()
+        elif head == "UPDATE":
+            self._update()
+        elif head == "DELETE":
+            self._delete()
+        elif head == "ALTER":
+            self._alter()
+        elif head == "VACUUM":
+            self._keyword("VACUUM")
+            self._ident("table")
+        else:
+            self._error("statement keyword")
+        if self._peek() is not None:
+            self._error("end of statement")
+        return self.out
+
+    def _create_table(self):
+        self._keyword("CREATE")
+        self._keyword("TABLE")
+        self._ident("table")
+        self.out.fields["columns"] = self._paren_list(lambda: [self._ident(), self._expect_kw(*_TYPES)])
+        if self._at_kw("USING"):
+            self._keyword("USING")
+            self.out.fields["storage"] = self._keyword("ROW", "COLUMNAR")
+        if self._at_kw("PARTITION"):
+            self._keyword("PARTITION")
+            self._keyword("BY")
+            kind = self.out.fields["partition_kind"] = self._keyword("RANGE", "HASH")
+            self._expect_op("(")
+            self.out.fields["partition_column"] = self._ident()
+            self._expect_op(")")
+            if kind == "RANGE":
+                self.out.fields["partitions"] = self._paren_list(self._partition_def)
+            else:
+                self._keyword("PARTITIONS")
+                self.out.fields["partition_count"] = self._value()
+
+    def _partition_def(self) -> List[Any]:
+        """PARTITION name VALUES LESS THAN (value | MAXVALUE)"""
+        self._expect_kw("PARTITION")
+        name = self._ident()
+        self._expect_kw("VALUES")
+        self._expect_kw("LESS")
+        self._expect_kw("THAN")
+        self._expect_op("(")
+        bound = self._expect_kw("MAXVALUE") if self._at_kw("MAXVALUE") else self._value()
+        self._expect_op(")")
+        return [name, bound]
+
+    def _create_index(self):
+        self._keyword("CREATE")
+        self._keyword("INDEX")
+        self._ident("name")
+        self._keyword("ON")
+        self._ident("table")
+        if self._at_kw("USING"):
+            self._keyword("USING")
+            self.out.fields["kind"] = self._keyword("HASH", "BTREE")
+        self.out.fields["columns"] = self._paren_list(self._ident)
+
+    def _insert(self):
+        self._keyword("INSERT")
+        self._keyword("INTO")
+        self._ident("table")
+        self.out.fields["columns"] = self._paren_list(self._ident)
+        self._keyword("VALUES")
+        self.out.fields["values"] = self._list(lambda: self._paren_list(self._value))
+
+    def _select(self):
+        self._keyword("SELECT")
+        self.out.fields["columns"] = ["*"] if self._accept_op("*") else self._list(self._select_item)
+        self._keyword("FROM")
+        self._ident("table")
+        if self._at_kw("INNER") or self._at_kw("JOIN"):
+            if self._at_kw("INNER"):
+                self._keyword("INNER")
+            self._keyword("JOIN")
+            self._ident("join_table")
+            self._keyword("ON")
+            left = self._column_ref()
+            self._expect_op("=")
+            self.out.fields["join_on"] = [left, self._column_ref()]
+        self._where()
+        if self._at_kw("GROUP"):
+            self._keyword("GROUP")
+            self._keyword("BY")
+            self.out.fields["group_by"] = self._list(self._ident)
+        if self._at_kw("HAVING"):
+            self._keyword("HAVING")
+            self.out.fields["having"] = self._conditions(self._select_item)
+
+    def _select_item(self) -> Any:
+        tok, nxt = self._peek(), self._peek(1)
+        if (tok is not None and tok[0] == "word" and tok[1] in _AGGREGATES and
+                nxt is not None and nxt[0] == "op" and nxt[1] == "("):
+            self.i += 2
+            arg = "*" if self._accept_op("*") else self._ident()
+            self._expect_op(")")
+            return [tok[1], arg]
+        return self._column_ref()
+
+    def _column_ref(self) -> str:
+        """col or table.col"""
+        name = self._ident()
+        if self._accept_op("."):
+            name = f"{name}.{self._ident()}"
+        return name
+
+    def _update(self):
+        self._keyword("UPDATE")
+        self._ident("table")
+        self._keyword("SET")
+        self.out.fields["set"] = self._list(self._assignment)
+        self._where()
+
+    def _assignment(self) -> List[Any]:
+        col = self._ident()
+        self._expect_op("=")
+        return [col, self._value()]
+
+    def _delete(self):
+        self._keyword("DELETE")
+        self._keyword("FROM")
+        self._ident("table")
+        self._where()
+
+    def _alter(self):
+        self._keyword("ALTER")
+        self._keyword("TABLE")
+        self._ident("table")
+        if self._at_kw("RENAME"):
+            self._keyword("RENAME")
+            self._keyword("TO")
+            self._ident("newname")
+        elif self._at_kw("DROP"):
+            self._keyword("DROP")
+            self._keyword("PARTITION")
+            self._ident("partition")
+        elif self._at_kw("PARTITION", 1):
+            self._keyword("ADD")
+            self._keyword("PARTITION")
+            self._ident("partition")
+            self._keyword("VALUES")
+            self._keyword("LESS")
+            self._keyword("THAN")
+            self._expect_op("(")
+            self.out.fields["bound"] = self._expect_kw("MAXVALUE") if self._at_kw("MAXVALUE") else self._value()
+            self._expect_op(")")
+        else:
+            self._keyword("ADD")
+            self._keyword("COLUMN")
+            self._ident("col")
+            self.out.fields["type"] = self._keyword(*_TYPES)
+
+    def _where(self):
+        if self._peek() is None or self._at_kw("GROUP") or self._at_kw("HAVING"):
+            return
+        self._keyword("WHERE")
+        self.out.fields["where"] = self._conditions(self._column_ref)
+
+    def _conditions(self, target) -> List[List[Any]]:
+        conditions = [self._condition(target)]
+        while self._accept_op(",") or self._accept_kw("AND"):
+            conditions.append(self._condition(target))
+        return conditions
+
+    def _condition(self, target) -> List[Any]:
+        col = target()
+        if self._accept_kw("BETWEEN"):
+            low = self._value()
+            self._expect_kw("AND")
+            return [col, "BETWEEN", low, self._value()]
+        tok = self._peek()
+        if tok is None or tok[0] != "op" or tok[1] not in _COMPARISONS:
+            self._error("comparison operator")
+        self.i += 1
+        return [col, tok[1], self._value()]
+
+
+def parse(sql: str) -> ParsedStatement:
+    """Parse one statement; raises SQLSyntaxError if it is not in the supported subset."""
+    return _Parser(sql).parse()
@@ -0,0 +1,178 @@
+"""
+Secondary indexes for AetherDB tables: hash indexes over one or more columns and
+ordered (sorted-array) indexes answering range predicates.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+class Range(NamedTuple):
+    """
+    Range predicate used as a filter value: low/high of None mean unbounded.
+    """
+    low: Any = None
+    high: Any = None
+    low_inclusive: bool = True
+    high_inclusive: bool = True
+
+    def matches(self, value: Any) -> bool:
+        if value is None:
+            return False
+        if self.low is not None:
+            if value < self.low or (value == self.low and not self.low_inclusive):
+                return False
+        if self.high is not None:
+            if value > self.high or (value == self.high and not self.high_inclusive):
+                return False
+        return True
+
+    def intersect(self, other: "Range") -> "Range":
+        low, low_inc = self.low, self.low_inclusive
+        if other.low is not None:
+            if low is None or other.low > low:
+                low, low_inc = other.low, other.low_inclusive
+            elif other.low == low:
+                low_inc = low_inc and other.low_inclusive
+        high, high_inc = self.high, self.high_inclusive
+        if other.high is not None:
+            if high is None or other.high < high:
+                high, high_inc = other.high, other.high_inclusive
+            elif other.high == high:
+                high_inc = high_inc and other.high_inclusive
+        return Range(low, high, low_inc, high_inc)
+
+    def map(self, fn) -> "Range":
+        return self._replace(low=None if self.low is None else fn(self.low),
+                             high=None if self.high is None else fn(self.high))
+
+
+class HashIndex:
+    """
+    Equality index mapping a tuple of column values to the set of row positions holding them.
+    """
+    kind = "hash"
+
+    def __init__(self, name: str, columns: List[str]):
+        self.name = name
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.entries: Dict[Tuple[Any, ...], Set[int]] = {}
+
+    def key(self, row: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(row.get(c) for c in self.columns)
+
+    def add(self, pos: int, row: Dict[str, Any]) -> None:
+        self.entries.setdefault(self.key(row), set()).add(pos)
+
+    def remove(self, pos: int, row: Dict[str, Any]) -> None:
+        k = self.key(row)
+        bucket = self.entries.get(k)
+        if bucket is None:
+            return
+        bucket.discard(pos)
+        if not bucket:
+            del self.entries[k]
+
+    def lookup(self, filters: Dict[str, Any]) -> Set[int]:
+        return self.entries.get(tuple(filters[c] for c in self.columns), set())
+
+    def covers(self, filters: Dict[str, Any]) -> bool:
+        return all(c in filters and not isinstance(filters[c], Range) for c in self.columns)
+
+    def rebuild(self, rows: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+        entries: Dict[Tuple[Any, ...], Set[int]] = {}
+        columns = self.columns
+        if len(columns) == 1:
+            (col,) = columns
+            keyed = (((row.get(col),), pos) for pos, row in rows)
+        else:
+            keyed = ((tuple(row.get(c) for c in columns), pos) for pos, row in rows)
+        for k, pos in keyed:
+            bucket = entries.get(k)
+            if bucket is None:
+                entries[k] = {pos}
+            else:
+                bucket.add(pos)
+        self.entries = entries
+
+
+class OrderedIndex:
+    """
+    Single-column index over a sorted array of distinct keys (searched with bisect), so equality
+    and range lookups cost O(log n + k). NULL keys are tracked but never match a range.
+    """
+    kind = "btree"
+
+    def __init__(self, name: str, columns: List[str]):
+        if len(columns) != 1:
+            raise ValueError("Ordered indexes cover exactly one column.")
+        self.name = name
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.keys: List[Any] = []  # sorted, distinct, non-NULL
+        self.entries: Dict[Any, Set[int]] = {}
+
+    def add(self, pos: int, row: Dict[str, Any]) -> None:
+        k = row.get(self.columns[0])
+        bucket = self.entries.get(k)
+        if bucket is None:
+            bucket = self.entries[k] = set()
+            if k is not None:
+                insort(self.keys, k)
+        bucket.add(pos)
+
+    def remove(self, pos: int, row: Dict[str, Any]) -> None:
+        k = row.get(self.columns[0])
+        bucket = self.entries.get(k)
+        if bucket is None:
+            return
+        bucket.discard(pos)
+        if not bucket:
+            del self.entries[k]
+            if k is not None:
+                del self.keys[bisect_left(self.keys, k)]
+
+    def covers(self, filters: Dict[str, Any]) -> bool:
+        return self.columns[0] in filters
+
+    def lookup(self, filters: Dict[str, Any]) -> Set[int]:
+        value = filters[self.columns[0]]
+        if not isinstance(value, Range):
+            return self.entries.get(value, set())
+        lo = 0
+        if value.low is not None:
+            lo = (bisect_left if value.low_inclusive else bisect_right)(self.keys, value.low)
+        hi = len(self.keys)
+        if value.high is not None:
+            hi = (bisect_right if value.high_inclusive else bisect_left)(self.keys, value.high)
+        out: Set[int] = set()
+        for k in self.keys[lo:hi]:
+            out |= self.entries[k]
+        return out
+
+    def rebuild(self, rows: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+        self.entries = {}
+        for pos, row in rows:
+            self.entries.setdefault(row.get(self.columns[0]), set()).add(pos)
+        self.keys = sorted(k for k in self.entries if k is not None)
+
+
+INDEX_KINDS = {"hash": HashIndex, "btree": OrderedIndex}
+
+
+def make_index(name: str, columns: List[str], kind: str = "hash"):
+    cls = INDEX_KINDS.get(kind.lower())
+    if cls is None:
+        raise ValueError(f"Index type {kind} not supported (use {', '.join(INDEX_KINDS)}).")
+    return cls(name, columns)
+
+
+def pick_index(indexes: Iterable[Any], filters: Dict[str, Any]) -> Optional[Any]:
+    """Choose the index answering the filters most selectively: equality beats range, wider beats narrower."""
+    best, best_score = None, None
+    for idx in indexes:
+        if not idx.covers(filters):
+            continue
+        ranged = any(isinstance(filters[c], Range) for c in idx.columns)
+        score = (not ranged, len(idx.columns), idx.kind == "hash")
+        if best_score is None or score > best_score:
+            best, best_score = idx, score
+    return best
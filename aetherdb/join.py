@@ -0,0 +1,151 @@
+"""
+Equi-join of two AetherDB tables.
+
+The hash join builds a dict on the smaller input and probes it while streaming the larger one.
+When the table on one side already has an index on its join key, that index is the hash
+table: the other side is streamed and matching positions are looked up directly.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .index import Range
+
+Ref = Tuple[str, str]  # (table name, column)
+
+
+def resolve(ref: str, left, right) -> Ref:
+    """Resolve col or table.col against the two joined tables."""
+    if "." in ref:
+        table, col = ref.split(".", 1)
+        if table not in (left.name, right.name):
+            raise ValueError(f"Unknown table {table} in {ref}")
+        schema = left.schema if table == left.name else right.schema
+        if col not in schema:
+            raise ValueError(f"Column {col} does not exist in {table}.")
+        return table, col
+    owners = [t.name for t in (left, right) if ref in t.schema]
+    if not owners:
+        raise ValueError(f"Column {ref} does not exist in {left.name} or {right.name}.")
+    if len(owners) > 1:
+        raise ValueError(f"Column {ref} is ambiguous; qualify it as table.{ref}")
+    return owners[0], ref
+
+
+def key_index(table, col: str) -> Optional[Any]:
+    """A single-column index on col, if the table has one."""
+    for idx in table.indexes.values():
+        if idx.columns == (col,):
+            return idx
+    return None
+
+
+class HashJoin:
+    """
+    Inner join of left and right on left_key = right_key. filters are keyed by (table, column);
+    output is a list of ((table, column), output name) pairs.
+    """
+    def __init__(self, left, right, left_key: str, right_key: str,
+                 filters: Dict[Ref, Any], output: List[Tuple[Ref, str]]):
+        if left.schema[left_key] != right.schema[right_key]:
+            raise ValueError(f"Cannot join {left.name}.{left_key} ({left.schema[left_key]}) with "
+                             f"{right.name}.{right_key} ({right.schema[right_key]})")
+        self.sides = {left.name: (left, left_key), right.name: (right, right_key)}
+        self.filters = {name: {col: v for (t, col), v in filters.items() if t == name} for name in self.sides}
+        self.output = output
+
+    def _needed(self, name: str) -> List[str]:
+        key = self.sides[name][1]
+        return list(dict.fromkeys([key] + [col for (t, col), _ in self.output if t == name]))
+
+    def _plan(self) -> Tuple[str, str, Optional[Any]]:
+        """(streamed side, lookup side, index on the lookup side's key or None)."""
+        (a, (ta, _)), (b, (tb, _)) = self.sides.items()
+        # Prefer looking up through an index (on the larger side if both have one)
+        indexed = [(len(t), name) for name, (t, k) in self.sides.items() if key_index(t, k) is not None]
+        if indexed:
+            lookup = max(indexed)[1]
+            stream = b if lookup == a else a
+            table, key = self.sides[lookup]
+            return stream, lookup, key_index(table, key)
+        # Otherwise build on the smaller side and stream the larger one
+        build, stream = (a, b) if len(ta) <= len(tb) else (b, a)
+        return stream, build, None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        stream_name, lookup_name, idx = self._plan()
+        stream_table, stream_key = self.sides[stream_name]
+        if idx is None:
+            probe = self._build(lookup_name)
+        else:
+            probe = self._index_probe(lookup_name, idx)
+        out = self.output
+        for srow in stream_table.scan(self.filters[stream_name] or None, self._needed(stream_name)):
+            k = srow[stream_key]
+            if k is None:
+                continue
+            for lrow in probe(k):
+                rows = {stream_name: srow, lookup_name: lrow}
+                yield {name: rows[t][col] for (t, col), name in out}
+
+    def _build(self, name: str):
+        table, key = self.sides[name]
+        buckets: Dict[Any, List[Dict[str, Any]]] = {}
+        for row in table.scan(self.filters[name] or None, self._needed(name)):
+            k = row[key]
+            if k is not None:
+                buckets.setdefault(k, []).append(row)
+        empty: List[Dict[str, Any]] = []
+        return lambda k: buckets.get(k, empty)
+
+    def _index_probe(self, name: str, idx):
+        table, key = self.sides[name]
+        filters = table._normalize_filters(self.filters[name])
+        matches, deleted = table._matches, table.deleted
+        project = table.storage.projector(self._needed(name))
+        epoch = table.epoch
+
+        def probe(k):
+            if table.epoch != epoch:
+                raise RuntimeError(f"Table {table.name} was compacted during a join")
+            return [project(pos) for pos in idx.lookup({key: k})
+                    if not deleted[pos] and (not filters or matches(pos, filters))]
+        return probe
+
+
+def hash_join(left, right, on: Tuple[str, str], filters: Optional[Dict[str, Any]] = None,
+              columns: Optional[List[str]] = None) -> Tuple[List[str], Iterator[Dict[str, Any]]]:
+    """
+    Join left and right on the column pair on (each col or table.col). filters are keyed the
+    same way; columns default to every column of both tables, named table.col.
+    Returns the output column names and a lazy row iterator.
+    """
+    if left.name == right.name:
+        raise ValueError("Joining a table with itself is not supported")
+    a, b = resolve(on[0], left, right), resolve(on[1], left, right)
+    if a[0] == b[0]:
+        raise ValueError(f"Join condition must compare {left.name} with {right.name}")
+    left_key, right_key = (a[1], b[1]) if a[0] == left.name else (b[1], a[1])
+    resolved: Dict[Ref, Any] = {}
+    for ref, v in (filters or {}).items():
+        key = resolve(ref, left, right)
+        if key in resolved:  # the same column named both col and table.col
+            if not (isinstance(v, Range) and isinstance(resolved[key], Range)):
+                raise ValueError(f"Conflicting conditions on {key[0]}.{key[1]}")
+            v = resolved[key].intersect(v)
+        resolved[key] = v
+    if columns is None:
+        output = [((t.name, col), f"{t.name}.{col}") for t in (left, right) for col in t.schema]
+    else:
+        output = [(resolve(c, left, right), c) for c in columns]
+    join = HashJoin(left, right, left_key, right_key, resolved, output)
+    return [name for _, name in output], _run(join, left, right)
+
+
+def _run(join: HashJoin, left, right) -> Iterator[Dict[str, Any]]:
+    # Hold off automatic compaction on both tables while the join is being consumed
+    left._begin_scan()
+    right._begin_scan()
+    try:
+        yield from join
+    finally:
+        left._end_scan()
+        right._end_scan()
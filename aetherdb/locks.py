@@ -0,0 +1,71 @@
+"""
+Reader/writer lock used to guard each AetherDB table.
+"""
+from contextlib import ExitStack, contextmanager
+from threading import Condition, Lock
+from typing import Iterable, Iterator
+
+
+class RWLock:
+    """
+    Any number of readers or a single writer. A waiting writer keeps new readers out, so a
+    steady stream of reads cannot starve writes. Not reentrant: a thread must not take the
+    lock again (in either mode) while holding it.
+    """
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self) -> None:
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+@contextmanager
+def read_all(tables: Iterable) -> Iterator[None]:
+    """Read-lock several tables, always in name order so two multi-table readers cannot deadlock."""
+    with ExitStack() as stack:
+        for t in sorted(set(tables), key=lambda t: t.name):
+            stack.enter_context(t.lock.read())
+        yield
@@ -0,0 +1,503 @@
+"""
+Opt-in multi-process execution of filtered scans and aggregations (AetherDB.enable_parallel).
+
+A table is exported once per version into a multiprocessing.shared_memory block: every column
+as its typed array ('q' values, date ordinals, or 'i' ids into a string pool) plus its NULL
+mask, and the tombstone mask. Queries split the rows into position ranges and send each range
+to a persistent process pool; workers map the block, evaluate the filters, and return either the
+matching positions (scans) or per-group accumulator states (aggregates), which are merged here.
+Rows themselves are still built in this process, from the positions.
+
+Anything the workers cannot evaluate returns None so the caller runs its usual single-threaded
+plan: tables under min_rows, filters on string ranges or unknown columns, MIN/MAX of strings,
+row tables holding ints beyond 64 bits. An export holds a copy of the table, so memory for a
+table roughly doubles while it is cached (at most max_exports tables).
+"""
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import ge, gt, le, lt
+from threading import Lock
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import datetime
+import multiprocessing
+import os
+import weakref
+
+from .aggregate import accumulate, initial_state, merge_groups
+from .index import Range
+from .storage import COLUMN_TYPES, ColumnStorage, StrColumn
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+try:
+    import numpy as np
+except ImportError:  # optional: workers then filter in pure Python
+    np = None
+
+# Below this many stored rows the fan-out costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+CHUNKS_PER_WORKER = 4  # ranges per worker, so a slow range does not leave the others idle
+MIN_CHUNK = 16_384
+
+_NO_MATCH = "no match"
+_DTYPES = {"q": "int64", "i": "int32"}
+
+
+def available() -> bool:
+    return shared_memory is not None
+
+
+class _Export:
+    """A table's columns copied into one shared memory block; valid for one table version."""
+    def __init__(self, table):
+        storage = table.storage
+        n = len(storage)
+        self.version = table.version
+        self.length = n
+        self.types = dict(table.schema)
+        self.pools: Dict[str, Tuple[List[str], Dict[str, int]]] = {}  # str column -> (pool, ids)
+        self.any_deleted = bool(table.deleted_count)
+        self.users = 0
+        self.retired = False
+        columns = []
+        for col, typ in table.schema.items():
+            if isinstance(storage, ColumnStorage):
+                column = storage.columns[col]
+            else:
+                column = COLUMN_TYPES[typ]()
+                for row in storage.rows:
+                    v = row.get(col)
+                    column.append_raw(None if v is None else column.encode(v))
+            if isinstance(column, StrColumn):
+                self.pools[col] = (column.pool, column.pool_ids)
+            columns.append((col, column))
+        # Typed arrays first at 8-byte aligned offsets, then the one-byte masks
+        offset = 0
+        placed = []
+        for col, column in columns:
+            placed.append((col, column.typecode, offset))
+            offset += _aligned(len(column.data) * column.data.itemsize)
+        layout: Dict[str, Tuple[str, int, int]] = {}
+        for col, typecode, data_offset in placed:
+            layout[col] = (typecode, data_offset, offset)
+            offset += n
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset + n, 1))
+        buf = self.shm.buf
+        for col, column in columns:
+            typecode, data_offset, nulls_offset = layout[col]
+            raw = memoryview(column.data).cast("B")
+            buf[data_offset:data_offset + len(raw)] = raw
+            buf[nulls_offset:nulls_offset + n] = column.nulls
+        buf[offset:offset + n] = table.deleted
+        self.layout = (self.shm.name, n, layout, offset)
+
+    def free(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _encode(typ: str, value: Any) -> Any:
+    return value.toordinal() if typ == "date" else value
+
+
+def _decode(typ: str, pool: Optional[List[str]], raw: Any) -> Any:
+    if raw is None:
+        return None
+    if typ == "date":
+        return datetime.date.fromordinal(raw)
+    if typ == "str":
+        return pool[raw]
+    return raw
+
+
+def _compile_filters(export: _Export, filters: Dict[str, Any]):
+    """Filters as (column, kind, argument) on raw stored values; _NO_MATCH or None if unusable."""
+    specs = []
+    for col, value in filters.items():
+        typ = export.types.get(col)
+        if typ is None:
+            return None
+        if value is None:
+            specs.append((col, "null", None))
+        elif typ == "str":
+            if isinstance(value, Range):
+                return None
+            sid = export.pools[col][1].get(value)
+            if sid is None:
+                return _NO_MATCH
+            specs.append((col, "eq", sid))
+        elif isinstance(value, Range):
+            low = None if value.low is None else _encode(typ, value.low)
+            high = None if value.high is None else _encode(typ, value.high)
+            specs.append((col, "range", (low, value.low_inclusive, high, value.high_inclusive)))
+        else:
+            specs.append((col, "eq", _encode(typ, value)))
+    return specs
+
+
+# -- worker side (module level so the pool can pickle references to them)
+
+def _attach(layout):
+    name, n, columns, deleted_offset = layout
+    shm = shared_memory.SharedMemory(name=name)
+    buf = shm.buf
+    views = {col: (buf[data_offset:data_offset + n * array(typecode).itemsize].cast(typecode),
+                   buf[nulls_offset:nulls_offset + n])
+             for col, (typecode, data_offset, nulls_offset) in columns.items()}
+    return shm, views, buf[deleted_offset:deleted_offset + n]
+
+
+def _detach(shm, views, deleted) -> None:
+    # Views must go before the mapping can be closed
+    for data, nulls in views.values():
+        data.release()
+        nulls.release()
+    deleted.release()
+    shm.close()
+
+
+def _positions(views, deleted, start: int, end: int, specs, any_deleted: bool) -> Sequence[int]:
+    """Matching positions in [start, end): a NumPy array when NumPy is installed, else a list."""
+    if np is not None:
+        try:
+            return _positions_np(views, deleted, start, end, specs, any_deleted)
+        except OverflowError:
+            pass  # a filter bound beyond 64 bits; compare as Python ints
+    positions = range(start, end)
+    if any_deleted:
+        positions = [p for p in positions if not deleted[p]]
+    for col, kind, arg in specs:
+        data, nulls = views[col]
+        if kind == "null":
+            positions = [p for p in positions if nulls[p]]
+        elif kind == "eq":
+            positions = [p for p in positions if data[p] == arg and not nulls[p]]
+        else:
+            low, low_inclusive, high, high_inclusive = arg
+            if low is not None:
+                above = ge if low_inclusive else gt
+                positions = [p for p in positions if above(data[p], low) and not nulls[p]]
+            if high is not None:
+                below = le if high_inclusive else lt
+                positions = [p for p in positions if below(data[p], high) and not nulls[p]]
+    return list(positions)
+
+
+def _positions_np(views, deleted, start: int, end: int, specs, any_deleted: bool):
+    mask = np.frombuffer(deleted[start:end], dtype=np.uint8) == 0 if any_deleted else None
+    for col, kind, arg in specs:
+        data, nulls = views[col]
+        valid = np.frombuffer(nulls[start:end], dtype=np.uint8) == 0
+        if kind == "null":
+            m = ~valid
+        else:
+            values = np.frombuffer(data[start:end], dtype=_DTYPES[data.format])
+            if kind == "eq":
+                m = valid & (values == arg)
+            else:
+                low, low_inclusive, high, high_inclusive = arg
+                m = valid
+                if low is not None:
+                    m &= (values >= low) if low_inclusive else (values > low)
+                if high is not None:
+                    m &= (values <= high) if high_inclusive else (values < high)
+        mask = m if mask is None else mask & m
+    if mask is None:
+        return np.arange(start, end)
+    return np.flatnonzero(mask) + start
+
+
+def _scan_task(layout, start: int, end: int, specs, any_deleted: bool) -> bytes:
+    """Matching positions of one range as native int64 bytes (far cheaper to send than a list)."""
+    shm, views, deleted = _attach(layout)
+    try:
+        positions = _positions(views, deleted, start, end, specs, any_deleted)
+        if np is not None and isinstance(positions, np.ndarray):
+            return positions.astype(np.int64).tobytes()
+        return array("q", positions).tobytes()
+    finally:
+        _detach(shm, views, deleted)
+
+
+def _aggregate_task(layout, start: int, end: int, specs, any_deleted: bool, slots, group_by):
+    """Accumulator states by raw group key over one range of rows."""
+    shm, views, deleted = _attach(layout)
+    try:
+        positions = _positions(views, deleted, start, end, specs, any_deleted)
+        if group_by:
+            if np is not None and isinstance(positions, np.ndarray):
+                groups = _group_np(views, positions, slots, group_by)
+                if groups is not None:
+                    return groups
+            needed = list(dict.fromkeys(list(group_by) + [c for _, c in slots if c != "*"]))
+            cols = [(c,) + views[c] for c in needed]
+            rows = ({c: None if nulls[p] else data[p] for c, data, nulls in cols} for p in positions)
+            return accumulate(rows, slots, group_by)
+        # Ungrouped: one pass per column over the matching positions
+        state = initial_state(slots)
+        values: Dict[str, Any] = {}
+        for i, (func, col) in enumerate(slots):
+            if col == "*":
+                state[i] = len(positions)
+                continue
+            vals = values.get(col)
+            if vals is None:
+                vals = values[col] = _column_values(views[col], positions)
+            if func == "COUNT":
+                state[i] = len(vals)
+            elif len(vals):
+                state[i] = _reduce(func, vals)
+        return {(): state}
+    finally:
+        _detach(shm, views, deleted)
+
+
+def _column_values(view, positions):
+    """Non-NULL raw values of a column at positions."""
+    data, nulls = view
+    if np is not None and isinstance(positions, np.ndarray):
+        values = np.frombuffer(data, dtype=_DTYPES[data.format])[positions]
+        return values[np.frombuffer(nulls, dtype=np.uint8)[positions] == 0]
+    return [data[p] for p in positions if not nulls[p]]
+
+
+def _group_np(views, positions, slots, group_by) -> Optional[Dict[Tuple[Any, ...], List[Any]]]:
+    """
+    accumulate() with NumPy: rows are numbered by group (each key column factorized, NULL as one
+    more code, and the codes combined), then each slot is one bincount or ufunc.at pass. None if
+    a SUM could overflow int64.
+    """
+    def column(col):
+        data, nulls = views[col]
+        values = np.frombuffer(data, dtype=_DTYPES[data.format])[positions].astype(np.int64)
+        return values, np.frombuffer(nulls, dtype=np.uint8)[positions] == 0
+
+    keys = [column(col) for col in group_by]
+    combined = np.zeros(len(positions), dtype=np.int64)
+    for values, valid in keys:
+        distinct, codes = np.unique(values, return_inverse=True)
+        codes = np.where(valid, codes.reshape(-1), len(distinct))
+        # Re-factorize so the combined code stays below the row count
+        combined = np.unique(combined * (len(distinct) + 1) + codes, return_inverse=True)[1].reshape(-1)
+    _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(first)  # groups in first-seen order, like accumulate()
+    count = len(first)
+    states = [[0 if func == "COUNT" else None for func, _ in slots] for _ in range(count)]
+    for i, (func, col) in enumerate(slots):
+        if col == "*":
+            result = np.bincount(inverse, minlength=count).tolist()
+            for g in range(count):
+                states[g][i] = result[g]
+            continue
+        values, valid = column(col)
+        ids = inverse[valid]
+        values = values[valid]
+        present = np.bincount(ids, minlength=count)
+        if func == "COUNT":
+            result = present
+        elif func == "SUM":
+            if len(values) and max(abs(int(values.min())), abs(int(values.max()))) * len(values) >= 2**63:
+                return None
+            result = np.zeros(count, dtype=np.int64)
+            np.add.at(result, ids, values)
+        else:
+            info = np.iinfo(np.int64)
+            result = np.full(count, info.max if func == "MIN" else info.min, dtype=np.int64)
+            (np.minimum if func == "MIN" else np.maximum).at(result, ids, values)
+        result, present = result.tolist(), present.tolist()
+        for g in range(count):
+            if func == "COUNT" or present[g]:
+                states[g][i] = result[g]
+    key_columns = [(values[first].tolist(), valid[first].tolist()) for values, valid in keys]
+    out = {}
+    for g in order.tolist():
+        out[tuple(values[g] if valid[g] else None for values, valid in key_columns)] = states[g]
+    return out
+
+
+def _reduce(func: str, vals) -> int:
+    if np is not None and isinstance(vals, np.ndarray):
+        if func == "SUM":
+            bound = max(abs(int(vals.min())), abs(int(vals.max())))
+            # int64 sums wrap silently; add as Python ints when they could
+            return int(vals.sum()) if bound * len(vals) < 2**63 else sum(vals.tolist())
+        return int(vals.min() if func == "MIN" else vals.max())
+    return {"SUM": sum, "MIN": min, "MAX": max}[func](vals)
+
+
+# -- coordinator
+
+class ParallelExecutor:
+    def __init__(self, workers: Optional[int] = None, min_rows: int = PARALLEL_MIN_ROWS,
+                 max_exports: int = 8, start_method: str = "spawn"):
+        if not available():
+            raise RuntimeError("Parallel execution needs multiprocessing.shared_memory (Python 3.8+)")
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self.max_exports = max_exports
+        # spawn (not fork): the engine runs threads, and forking a threaded process is unsafe
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._exports: "OrderedDict[int, Tuple[Any, _Export]]" = OrderedDict()  # id(table) -> (ref, export)
+        self._unexportable: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+        self._lock = Lock()
+        self.stats = {"parallel": 0, "serial": 0, "exports": 0}
+
+    # -- planning
+
+    def match_positions(self, table, filters: Dict[str, Any]) -> Optional[Tuple[List[int], Dict[str, Any]]]:
+        """
+        (matching live positions, {}) for already normalized filters, or None to scan serially.
+        Same contract as vectorized.match_positions.
+        """
+        export = self._checkout(table) if filters else None
+        if export is None:
+            return None
+        try:
+            specs = _compile_filters(export, filters)
+            if specs is None:
+                return self._serial()
+            if specs == _NO_MATCH:
+                return [], {}
+            parts = self._map(_scan_task, export, specs)
+            if parts is None:
+                return self._serial()
+            positions = array("q")
+            for part in parts:
+                positions.frombytes(part)
+            return positions.tolist(), {}
+        finally:
+            self._checkin(export)
+
+    def aggregate(self, table, slots: Sequence[Tuple[str, str]], group_by: Sequence[str],
+                  filters: Optional[Dict[str, Any]]) -> Optional[Dict[Tuple[Any, ...], List[Any]]]:
+        """Accumulator states per group for aggregate.plan_slots slots, or None to run serially."""
+        if any(func in ("MIN", "MAX") and table.schema.get(col) == "str" for func, col in slots):
+            return None  # string ids do not sort like the strings
+        export = self._checkout(table)
+        if export is None:
+            return None
+        try:
+            specs = _compile_filters(export, table._normalize_filters(filters) if filters else {})
+            if specs is None:
+                return self._serial()
+            if specs == _NO_MATCH:
+                groups = accumulate((), slots, group_by)
+            else:
+                parts = self._map(_aggregate_task, export, specs, slots, tuple(group_by))
+                if parts is None:
+                    return self._serial()
+                groups = {}
+                for part in parts:  # in range order, so groups keep first-seen order
+                    merge_groups(slots, groups, part)
+            return self._decode_groups(export, groups, slots, group_by)
+        finally:
+            self._checkin(export)
+
+    def _decode_groups(self, export: _Export, groups, slots, group_by):
+        key_types = [(export.types[c], export.pools.get(c, (None,))[0]) for c in group_by]
+        decoded = [i for i, (func, col) in enumerate(slots)
+                   if func in ("MIN", "MAX") and export.types.get(col) == "date"]
+        out = {}
+        for key, state in groups.items():
+            if decoded:
+                state = list(state)
+                for i in decoded:
+                    state[i] = _decode("date", None, state[i])
+            out[tuple(_decode(typ, pool, raw) for (typ, pool), raw in zip(key_types, key))] = state
+        return out
+
+    def _serial(self) -> None:
+        self.stats["serial"] += 1
+        return None
+
+    def _map(self, task, export: _Export, specs, *args) -> Optional[List[Any]]:
+        n = export.length
+        chunk = max(MIN_CHUNK, -(-n // (self.workers * CHUNKS_PER_WORKER)))
+        try:
+            pool = self._get_pool()
+            futures = [pool.submit(task, export.layout, start, min(start + chunk, n), specs, export.any_deleted, *args)
+                       for start in range(0, n, chunk)]
+            parts = [f.result() for f in futures]
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None  # a worker died; start a fresh pool next time
+            return None
+        self.stats["parallel"] += 1
+        return parts
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers,
+                                                 mp_context=multiprocessing.get_context(self.start_method))
+            return self._pool
+
+    # -- exports
+
+    def _checkout(self, table) -> Optional[_Export]:
+        """The table's current export (created if needed), marked in use; None if not worth it."""
+        if len(table.storage) < self.min_rows:
+            return self._serial()
+        with self._lock:
+            if self._unexportable.get(table) == table.version:
+                return self._serial()
+            entry = self._exports.get(id(table))
+            export = entry[1] if entry is not None and entry[0]() is table else None
+            if export is None or export.version != table.version:
+                if entry is not None:
+                    self._retire(self._exports.pop(id(table))[1])
+                try:
+                    export = _Export(table)
+                except (ValueError, OverflowError):
+                    self._unexportable[table] = table.version  # e.g. an int beyond 64 bits
+                    return self._serial()
+                self.stats["exports"] += 1
+                self._exports[id(table)] = (weakref.ref(table), export)
+                while len(self._exports) > self.max_exports:
+                    self._retire(self._exports.popitem(last=False)[1][1])
+            self._exports.move_to_end(id(table))
+            export.users += 1
+            return export
+
+    def _checkin(self, export: _Export) -> None:
+        with self._lock:
+            export.users -= 1
+            if export.retired and not export.users:
+                export.free()
+
+    def _retire(self, export: _Export) -> None:
+        # Caller holds _lock. Queries still reading it free it when they finish.
+        export.retired = True
+        if not export.users:
+            export.free()
+
+    def forget(self, table) -> None:
+        """Release the export of a table that is going away (e.g. a dropped partition)."""
+        with self._lock:
+            entry = self._exports.get(id(table))
+            if entry is not None and entry[0]() is table:
+                self._retire(self._exports.pop(id(table))[1])
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, workers=self.workers, min_rows=self.min_rows, cached=len(self._exports))
+
+    def shutdown(self) -> None:
+        """Stop the worker processes and release every shared memory block."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            for _, export in self._exports.values():
+                self._retire(export)
+            self._exports.clear()
+        if pool is not None:
+            pool.shutdown()
@@ -0,0 +1,143 @@
+"""
+Partitioning schemes for AetherDB tables.
+
+A partitioned table keeps each partition's rows in a child Table of its own, chosen by the value
+of one column. RANGE partitions each hold the values below their upper bound (and at or above
+the previous partition's bound; MAXVALUE has none). HASH partitions spread values over a fixed
+number of partitions by a hash that is stable across processes, so a snapshot loads back into
+the same partitions. prune() narrows normalized filters to the partitions that can match them.
+"""
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import datetime
+import zlib
+
+from .index import Range
+
+
+class RangePartitioning:
+    kind = "range"
+
+    def __init__(self, column: str, partitions: Sequence[Tuple[str, Any]] = ()):
+        self.column = column
+        self.names: List[str] = []
+        self.bounds: List[Any] = []  # upper bound (exclusive) of names[i]; none for a MAXVALUE partition
+        self.maxvalue = False
+        for name, bound in partitions:
+            self.add(name, bound)
+
+    def add(self, name: str, bound: Any) -> None:
+        """Append a partition for values below bound (None: MAXVALUE); bounds must increase."""
+        if name in self.names:
+            raise ValueError(f"Partition {name} already exists.")
+        if self.maxvalue:
+            raise ValueError(f"Partition {self.names[-1]} already holds every value up to MAXVALUE.")
+        if bound is None:
+            self.maxvalue = True
+        elif self.bounds and bound <= self.bounds[-1]:
+            raise ValueError(f"Partition {name} must end above {self.bounds[-1]} (the end of {self.names[-1]}).")
+        else:
+            self.bounds.append(bound)
+        self.names.append(name)
+
+    def drop(self, name: str) -> None:
+        """Forget a partition; values it held would now go to the next partition up."""
+        i = self.names.index(name)
+        del self.names[i]
+        if i < len(self.bounds):
+            del self.bounds[i]
+        else:
+            self.maxvalue = False
+
+    def route(self, value: Any) -> str:
+        if value is None:  # NULLs sort first
+            i = 0
+        else:
+            i = bisect_right(self.bounds, value)
+        if i >= len(self.names):
+            raise ValueError(f"No partition for {self.column} = {value}")
+        return self.names[i]
+
+    def prune(self, filters: Dict[str, Any]) -> List[str]:
+        if self.column not in filters:
+            return list(self.names)
+        v = filters[self.column]
+        if not isinstance(v, Range):
+            i = 0 if v is None else bisect_right(self.bounds, v)
+            return self.names[i:i + 1]
+        first = 0 if v.low is None else bisect_right(self.bounds, v.low)
+        last = len(self.names) - 1
+        if v.high is not None:
+            last = min(last, bisect_right(self.bounds, v.high))
+            if not v.high_inclusive and last and self.bounds[last - 1] == v.high:
+                last -= 1  # that partition starts at the excluded high end
+        return self.names[first:last + 1]
+
+    def spec(self) -> Dict[str, Any]:
+        """JSON-friendly description, read back by make_partitioning."""
+        bounds = [b.isoformat() if isinstance(b, datetime.date) else b for b in self.bounds]
+        if self.maxvalue:
+            bounds.append(None)
+        return {"kind": self.kind, "column": self.column, "partitions": [list(p) for p in zip(self.names, bounds)]}
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any], cast: Callable[[Any], Any]) -> "RangePartitioning":
+        return cls(spec["column"], [(name, None if bound is None else cast(bound)) for name, bound in spec["partitions"]])
+
+
+def stable_hash(value: Any) -> int:
+    """Hash of a column value that does not change between processes (unlike hash() of a str)."""
+    if value is None:
+        return 0
+    if isinstance(value, datetime.date):
+        return value.toordinal()
+    if isinstance(value, str):
+        return zlib.crc32(value.encode())
+    return value
+
+
+class HashPartitioning:
+    kind = "hash"
+
+    def __init__(self, column: str, count: int):
+        if count < 1:
+            raise ValueError("HASH partitioning needs at least one partition.")
+        self.column = column
+        self.names = [f"p{i}" for i in range(count)]
+
+    def add(self, name: str, bound: Any) -> None:
+        raise ValueError("Partitions of a HASH partitioned table are fixed when it is created.")
+
+    def drop(self, name: str) -> None:
+        raise ValueError("Cannot drop a partition of a HASH partitioned table; its rows belong to no range.")
+
+    def route(self, value: Any) -> str:
+        return self.names[stable_hash(value) % len(self.names)]
+
+    def prune(self, filters: Dict[str, Any]) -> List[str]:
+        v = filters.get(self.column, Range())
+        if isinstance(v, Range):
+            return list(self.names)
+        return [self.route(v)]
+
+    def spec(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "column": self.column, "partitions": len(self.names)}
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, Any], cast: Callable[[Any], Any]) -> "HashPartitioning":
+        return cls(spec["column"], int(spec["partitions"]))
+
+
+PARTITION_KINDS = {"range": RangePartitioning, "hash": HashPartitioning}
+
+
+def make_partitioning(spec: Dict[str, Any], cast: Optional[Callable[[Any], Any]] = None):
+    """
+    Scheme from a spec: {"kind": "range", "column": c, "partitions": [(name, upper bound or
+    None for MAXVALUE), ...]} or {"kind": "hash", "column": c, "partitions": count}. cast turns
+    range bounds into column values.
+    """
+    cls = PARTITION_KINDS.get(str(spec.get("kind", "")).lower())
+    if cls is None:
+        raise ValueError(f"Partitioning {spec.get('kind')} not supported (use {', '.join(PARTITION_KINDS)}).")
+    return cls.from_spec(spec, cast or (lambda v: v))
@@ -0,0 +1,227 @@
+"""
+Client-side pool of authenticated RemoteDB connections to one server.
+
+Only the first connection logs in with the password (a bcrypt check on the server); it keeps
+the session token the server issues, and later connections log in with that token instead.
+Idle connections are reused most recently used first, closed once idle for idle_timeout
+seconds, and pinged before reuse when idle longer than health_check_interval; a connection that
+fails its ping, was closed, or was switched to another user is dropped rather than returned.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .protocol import DEFAULT_PORT
+from .remote import RemoteDB
+
+
+class ConnectionPool:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                 user: Optional[str] = None, password: Optional[str] = None, max_size: int = 8,
+                 idle_timeout: Optional[float] = 300.0, health_check_interval: Optional[float] = 30.0,
+                 connect_timeout: Optional[float] = 5.0, **options):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.user = user
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.options = options  # passed on to RemoteDB (timeout, batch_size)
+        self._password = password
+        self._token: Optional[str] = None
+        self._idle: Deque[Tuple[RemoteDB, float]] = deque()  # (connection, released at), oldest first
+        self._size = 0  # open connections, idle or handed out
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "expired": 0, "failed_checks": 0,
+                      "password_logins": 0, "token_logins": 0}
+
+    @classmethod
+    def from_profile(cls, profile: Optional[str] = None, password: Optional[str] = None,
+                     **options) -> "ConnectionPool":
+        """Pool for a saved connection profile (see cli/config.py)."""
+        from .cli.config import get_profile
+        prof = get_profile(profile)
+        return cls(prof["host"], int(prof["port"]), user=prof["user"], password=password, **options)
+
+    # -- handing out connections
+
+    def acquire(self, timeout: Optional[float] = None) -> RemoteDB:
+        """
+        An open connection, logged in as the pool's user when it has credentials. Blocks while
+        max_size connections are in use; raises TimeoutError after timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise ValueError("Connection pool is closed")
+                expired = self._expire()
+                if self._idle:
+                    conn, released = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    conn = released = None
+                else:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"No connection free within {timeout}s (max_size={self.max_size})")
+                    self._cond.wait(remaining)
+                    continue
+            _close_all(expired)
+            if conn is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    self._discard(None)
+                    raise
+            check = self.health_check_interval
+            if check is not None and time.monotonic() - released >= check and not conn.ping():
+                self._count("failed_checks")
+                self._discard(conn)
+                continue
+            self._count("reused")
+            return conn
+
+    def release(self, conn: RemoteDB) -> None:
+        """Give a connection back; it is closed instead if it is broken or another user's now."""
+        if conn.closed or self._closed or (self.user is not None and conn.current_user != self.user):
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[RemoteDB]:
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def login(self, conn: RemoteDB, user: str, password: str) -> bool:
+        """
+        Log conn in with a password (e.g. one typed at a prompt); on success the pool adopts user
+        and reuses the session for its next connections.
+        """
+        if not conn.login(user, password):
+            return False
+        stale: List[RemoteDB] = []
+        with self._cond:
+            self.stats["password_logins"] += 1
+            if user != self.user:
+                self.user = user
+                self._password = None  # was another user's
+                stale = [idle for idle, _ in self._idle]
+                self._size -= len(stale)
+                self._idle.clear()
+            self._token = conn.session_token
+        _close_all(stale)
+        return True
+
+    # -- internals
+
+    def _connect(self) -> RemoteDB:
+        conn = RemoteDB(self.host, self.port, self.unix_path, connect_timeout=self.connect_timeout, **self.options)
+        self._count("created")
+        try:
+            self._authenticate(conn)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _authenticate(self, conn: RemoteDB) -> None:
+        if self.user is None:
+            return
+        token = self._token
+        if token is not None and conn.login_token(token):
+            self._count("token_logins")
+            return
+        if self._password is None:
+            return  # handed out logged out; the caller logs in (see login())
+        if not conn.login(self.user, self._password):
+            raise PermissionError(f"Login failed for {self.user}")
+        self._count("password_logins")
+        self._token = conn.session_token
+
+    def _count(self, stat: str) -> None:
+        with self._cond:
+            self.stats[stat] += 1
+
+    def _expire(self) -> List[RemoteDB]:
+        """
+        Take connections idle past idle_timeout out of the pool (caller holds _cond); the caller
+        closes the returned connections once it has released the lock.
+        """
+        expired: List[RemoteDB] = []
+        if self.idle_timeout is None:
+            return expired
+        limit = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][1] < limit:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+            self.stats["expired"] += 1
+        return expired
+
+    def _discard(self, conn: Optional[RemoteDB]) -> None:
+        if conn is not None:
+            conn.close()
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def info(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self.stats, open=self._size, idle=len(self._idle), max_size=self.max_size)
+
+    def close(self) -> None:
+        """Close idle connections; connections still handed out are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        _close_all(idle)
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _close_all(conns: List[RemoteDB]) -> None:
+    # Called after releasing _cond, so slow socket shutdowns never block other threads
+    for conn in conns:
+        conn.close()
+
+
+_pools: Dict[Tuple[Any, ...], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host: str = "127.0.0.1", port: int = DEFAULT_PORT, user: Optional[str] = None,
+             unix_path: Optional[str] = None, **options) -> ConnectionPool:
+    """The process-wide pool for (host, port, unix_path, user), created on first use."""
+    key = (host, int(port), unix_path, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = _pools[key] = ConnectionPool(host, int(port), unix_path, user=user, **options)
+        return pool
+
+
+@atexit.register
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,121 @@
+"""
+Wire protocol between the AetherDB server and its clients.
+
+Every message is a frame: a 4-byte big-endian payload length, then a UTF-8 JSON object. Dates
+travel as {"$date": "YYYY-MM-DD"}. A client sends one request frame and reads frames back
+until the response is complete; requests on one connection are answered in order.
+
+    {"op": "login", "user": u, "password": p}  -> {"ok": bool, "token": str|null}
+    {"op": "token", "token": t}                -> {"ok": bool, "user": str|null}
+    {"op": "sql", "sql": s, "params": [...]|{...}|null, "batch": n}
+        SELECT -> {"columns": [...]}, then {"rows": [[...], ...]} frames of at most n rows,
+                  then {"done": true, "count": rows sent}
+        other  -> {"result": value}
+    {"op": "tables"}                           -> {"tables": {name: {col: type}}}
+    {"op": "ping"}                             -> {"ok": true}
+
+Requests may be pipelined: a client can write several before reading any reply.
+
+Any request may instead be answered by {"error": message, "type": exception class name}; a
+failing SELECT can also end with an error frame after some rows frames.
+"""
+import datetime
+import json
+import socket
+import struct
+from typing import Any, Dict, Optional
+
+_LENGTH = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+DEFAULT_PORT = 5432
+
+# Exceptions re-raised as themselves on the client side; anything else becomes RemoteError
+_ERRORS = {cls.__name__: cls for cls in (PermissionError, ValueError, KeyError, TypeError)}
+
+
+class ProtocolError(ConnectionError):
+    pass
+
+
+class RemoteError(Exception):
+    """A server-side failure with no matching local exception type."""
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime.date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot send {type(value).__name__} values")
+
+
+def _object_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.date.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, default=_default, separators=(",", ":")).encode()
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode(payload: bytes) -> Dict[str, Any]:
+    return json.loads(payload.decode(), object_hook=_object_hook)
+
+
+def frame_length(header: bytes) -> int:
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_FRAME:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_FRAME} byte limit")
+    return length
+
+
+def error_message(exc: BaseException) -> Dict[str, Any]:
+    return {"error": str(exc.args[0]) if isinstance(exc, KeyError) and exc.args else str(exc),
+            "type": type(exc).__name__}
+
+
+def raise_error(message: Dict[str, Any]) -> None:
+    """Raise the exception an {"error": ...} frame describes."""
+    raise _ERRORS.get(message.get("type"), RemoteError)(message["error"])
+
+
+# -- blocking socket helpers (clients)
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ProtocolError("Connection closed by the server")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_message(sock: socket.socket) -> Dict[str, Any]:
+    return decode(_recv_exact(sock, frame_length(_recv_exact(sock, _LENGTH.size))))
+
+
+def open_socket(host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                connect_timeout: Optional[float] = 5.0, timeout: Optional[float] = None) -> socket.socket:
+    """Connected socket to a server; timeout applies to reads and writes afterwards (None: wait)."""
+    if unix_path:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(connect_timeout)
+        try:
+            sock.connect(unix_path)
+        except OSError:
+            sock.close()
+            raise
+    else:
+        sock = socket.create_connection((host, port), timeout=connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(timeout)
+    return sock
+
+
+# -- asyncio helpers (server)
+
+async def read_message(reader) -> Dict[str, Any]:
+    """Next frame from an asyncio StreamReader (IncompleteReadError at a clean EOF)."""
+    length = frame_length(await reader.readexactly(_LENGTH.size))
+    return decode(await reader.readexactly(length))
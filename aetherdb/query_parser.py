@@ -1,118 +1,314 @@
 """
 A minimal SQL parser for AetherDB supporting a subset of SQL CRUD queries.
+
+Statements are normalized (literals lifted out into parameters) and parsed by the hand-written
+parser in fast_parser; parsed statement shapes are kept in an LRU cache, so repeated queries skip
+parsing entirely. The pyparsing grammar (sql_grammar) is only loaded to report syntax errors.
 """
-from typing import Any, Dict, List, Tuple
-from pyparsing import (Word, alphas, alphanums, delimitedList, Group, Keyword,
-                       Suppress, Literal, Optional, Forward, OneOrMore, QuotedString, nums, ParseException)
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 import re
+from .fast_parser import Param, SQLSyntaxError, parse as fast_parse
+from .index import Range
 
-# Supported keywords
-CREATE, TABLE, INSERT, INTO, VALUES, SELECT, FROM, WHERE, UPDATE, SET, DELETE, ALTER, RENAME, TO, ADD, COLUMN = map(
-    Keyword, "CREATE TABLE INSERT INTO VALUES SELECT FROM WHERE UPDATE SET DELETE ALTER RENAME TO ADD COLUMN".split())
-INT, STR, DATE = map(Keyword, "INT STR DATE".split())
 
-ident = Word(alphas, alphanums + "_" )
-columnName = ident
-columnType = INT | STR | DATE
+def __getattr__(name: str) -> Any:
+    # Grammar elements (sql_parser, select_stmt, ...) used to live here; load them on demand
+    if name.startswith("__"):
+        raise AttributeError(name)
+    from . import sql_grammar
+    try:
+        return getattr(sql_grammar, name)
+    except AttributeError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
 
-integer = Word(nums)
-string_literal = QuotedString('"') | QuotedString("'")
-date_literal = QuotedString('"') | QuotedString("'")  # expects YYYY-MM-DD in quotes
-value = integer | string_literal | date_literal
+def parse_sql(sql: str) -> Any:
+    """Parses a minimal SQL string with the pyparsing grammar and returns a parsed structure."""
+    from pyparsing import ParseException
+    from .sql_grammar import sql_parser
+    try:
+        return sql_parser.parseString(sql, parseAll=True)
+    except ParseException as pe:
+        raise ValueError(f"SQL Parse error: {pe}")
 
-# CREATE TABLE mytable (id INT, name STR, birth DATE)
-create_stmt = (CREATE + TABLE + ident('table') +
-               Suppress('(') +
-               Group(delimitedList(Group(columnName('col') + columnType('type'))))('columns') +
-               Suppress(')'))
+# Literal lifting: quoted strings, bare integers, ? and :name placeholders (in that order)
+_SLOT_RE = re.compile(r'"([^"]*)"|\'([^\']*)\'|(?<![\w:])(\d+)(?!\w)|(\?)|:(\w+)')
 
-# INSERT INTO mytable (id, name) VALUES (1, "Alice")
-insert_stmt = (INSERT + INTO + ident('table') +
-               Suppress('(') + Group(delimitedList(columnName))('columns') + Suppress(')') +
-               VALUES + Suppress('(') + Group(delimitedList(value))('values') + Suppress(')'))
+STATEMENT_CACHE_SIZE = 512
 
-# SELECT id, name FROM mytable WHERE name = 'Alice'
-select_stmt = (SELECT + Group(delimitedList(columnName))('columns') +
-               FROM + ident('table') +
-               Optional(WHERE + Group(delimitedList(Group(columnName + Literal('=').suppress() + value)))('where')))
 
-# UPDATE mytable SET name = 'Bob' WHERE id = 2
-update_stmt = (UPDATE + ident('table') + SET +
-               Group(delimitedList(Group(columnName + Literal('=').suppress() + value)))('set') +
-               Optional(WHERE + Group(delimitedList(Group(columnName + Literal('=').suppress() + value)))('where')))
+def normalize_sql(sql: str) -> Tuple[str, Dict[str, Any], int, List[str]]:
+    """
+    Lift literals out of a statement. Returns (template, literal params, number of '?'
+    placeholders, :name placeholders); statements differing only in literals share a template.
+    """
+    literals: Dict[str, Any] = {}
+    names: List[str] = []
+    positional = 0
+    out = []
+    last = 0
+    for m in _SLOT_RE.finditer(sql):
+        out.append(sql[last:m.start()])
+        last = m.end()
+        dq, sq, num, qmark, name = m.groups()
+        if qmark:
+            key = f"_p{positional}"
+            positional += 1
+        elif name is not None:
+            key = name
+            names.append(name)
+        else:
+            key = f"_l{len(literals)}"
+            literals[key] = num if num is not None else (dq if dq is not None else sq)
+        out.append(":" + key)
+    out.append(sql[last:])
+    template = re.sub(r"\s+", " ", "".join(out)).strip()
+    return template, literals, positional, names
 
-# DELETE FROM mytable WHERE name = 'Bob'
-delete_stmt = (DELETE + FROM + ident('table') +
-               Optional(WHERE + Group(delimitedList(Group(columnName + Literal('=').suppress() + value)))('where')))
 
-# ALTER TABLE t RENAME TO newname
-alter_rename_stmt = (ALTER + TABLE + ident('table') +
-    RENAME + TO + ident('newname'))
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _parse_template(template: str) -> Any:
+    try:
+        return fast_parse(template)
+    except SQLSyntaxError:
+        # Let the full grammar have the final word (and produce the error message)
+        return parse_sql(template)
 
-# ALTER TABLE t ADD COLUMN col type
-alter_addcol_stmt = (ALTER + TABLE + ident('table') +
-    ADD + COLUMN + columnName('col') + columnType('type'))
 
-sql_parser = create_stmt | insert_stmt | select_stmt | update_stmt | delete_stmt | alter_rename_stmt | alter_addcol_stmt
+class PreparedStatement:
+    """
+    A statement parsed once; bind() fills its ?/:name parameters and returns (action, data).
+    """
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.template, self.literals, self.positional, self.names = normalize_sql(sql)
+        try:
+            self.parsed = _parse_template(self.template)
+        except ValueError:
+            # Report the error against the statement as written, not the template
+            parse_sql(sql)
+            raise
+
+    def bind(self, *args, **kwargs) -> Tuple[str, dict]:
+        if len(args) != self.positional:
+            raise ValueError(f"Statement takes {self.positional} positional parameters, got {len(args)}")
+        params = dict(self.literals)
+        for i, v in enumerate(args):
+            params[f"_p{i}"] = v
+        for name in self.names:
+            if name not in kwargs:
+                raise ValueError(f"No value bound for parameter :{name}")
+            params[name] = kwargs[name]
+        return sql_to_engine_args(self.parsed, params)
+
+
+def prepare_sql(sql: str) -> PreparedStatement:
+    return PreparedStatement(sql)
 
-def parse_sql(sql: str) -> Any:
-    """Parses a minimal SQL string and returns a parsed structure."""
-    try:
-        return sql_parser.parseString(sql, parseAll=True)
-    except ParseException as pe:
-        raise ValueError(f"SQL Parse error: {pe}")
+
+def statement_cache_info():
+    """Hit/miss counters of the parsed-statement cache."""
+    return _parse_template.cache_info()
+
+
+# Keys normalize_sql gives the literals it lifts; every other key is a caller's parameter
+_LITERAL_KEY = re.compile(r"_l\d+$")
+
+def _bind(v: Any, params: Mapping[str, Any], convert: Optional[Callable[[Any], Any]] = None) -> Any:
+    """
+    Value of a parsed token. Literal text (from the parse tree or lifted by normalize_sql) goes
+    through convert; a value bound to a ?/:name parameter is returned exactly as given.
+    """
+    if isinstance(v, Param):
+        if params is None or v not in params:
+            raise ValueError(f"No value bound for parameter :{v}")
+        if not _LITERAL_KEY.match(v):
+            return params[v]
+        v = params[v]
+    return v if convert is None else convert(v)
+
+def _strip(v: Any) -> Any:
+    return v.strip('"\'') if isinstance(v, str) else v
+
+def _typed_literal(v: Any) -> Any:
+    if not isinstance(v, str):
+        return v
+    v = v.strip('"\'')
+    return int(v) if re.match(r"^-?\d+$", v) else v
+
+def _insert_literal(v: Any) -> Any:
+    if isinstance(v, str) and re.match(r"^-?\d+$", v):
+        return int(v)
+    return _strip(v)
+
+def _partition_bound(v: Any, params: Mapping[str, Any]) -> Any:
+    """Upper bound of a RANGE partition; None for MAXVALUE."""
+    if v == "MAXVALUE" and not isinstance(v, Param):
+        return None
+    return _bind(v, params, _insert_literal)
+
+def _as_range(v: Any) -> Range:
+    return v if isinstance(v, Range) else Range(v, v)
+
+def _select_item(item: Any) -> Any:
+    """Column name, or (func, column) for an aggregate call such as COUNT(*)."""
+    return item if isinstance(item, str) else (item[0], item[1])
+
+def _column_name(item: Any) -> str:
+    return f"{item[0]}({item[1]})" if isinstance(item, tuple) else item
+
+def _local(name: Any, table: str) -> Any:
+    """Strip the table qualifier from table.col in a single-table statement."""
+    if not isinstance(name, str) or '.' not in name:
+        return name
+    qualifier, col = name.split('.', 1)
+    if qualifier != table:
+        raise ValueError(f"Unknown table {qualifier} in {name}")
+    return col
+
+def _where_filters(where, params=None, table: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Turn parsed WHERE conditions into engine filters: plain values for '=', Range for comparisons.
+    With table, columns written as table.col are resolved against it.
+    """
+    filters: Dict[str, Any] = {}
+    typed: Dict[str, Any] = {}  # '=' values as range bounds, for merging with other conditions
+    for cond in where:
+        col, op = cond[0], cond[1]
+        if table is not None:
+            col = _local(col, table)
+        eq = None
+        if op == 'BETWEEN':
+            val = Range(_bind(cond[2], params, _typed_literal), _bind(cond[3], params, _typed_literal))
+        elif op == '=':
+            val = _bind(cond[2], params, _strip)
+            eq = _bind(cond[2], params, _typed_literal)
+        elif op in ('<', '<='):
+            val = Range(high=_bind(cond[2], params, _typed_literal), high_inclusive=(op == '<='))
+        else:
+            val = Range(low=_bind(cond[2], params, _typed_literal), low_inclusive=(op == '>='))
+        if col in filters:
+            # Several conditions on one column narrow to a single range
+            try:
+                val = _as_range(typed.pop(col, filters[col])).intersect(_as_range(val if eq is None else eq))
+            except TypeError:
+                raise ValueError(f"Incompatible conditions on column {col}")
+        elif eq is not None:
+            typed[col] = eq
+        filters[col] = val
+    return filters
 
 # Helper to convert parsed results to Python data structures for the engine.
-def sql_to_engine_args(parsed) -> Tuple[str, dict]:
-    """Convert parsed SQL result to (action, data) for engine call."""
+def sql_to_engine_args(parsed, params: Union[Sequence[Any], Mapping[str, Any], None] = None) -> Tuple[str, dict]:
+    """
+    Convert parsed SQL result to (action, data) for engine call. Also accepts the SQL text itself,
+    which goes through the parsed-statement cache; params then bind its ?/:name placeholders.
+    """
+    if isinstance(parsed, str):
+        stmt = prepare_sql(parsed)
+        if isinstance(params, Mapping):
+            return stmt.bind(**params)
+        return stmt.bind(*(params or ()))
     action = None
     data = {}
-    if 'CREATE' in parsed:
+    # Top-level string tokens are the statement keywords (and identifiers)
+    keywords = {t for t in parsed if isinstance(t, str)}
+    if 'CREATE' in keywords and 'INDEX' in keywords:
+        action = 'create_index'
+        data = {'table': parsed.table, 'name': parsed.get('name'), 'columns': list(parsed.columns),
+                'kind': parsed.get('kind', 'HASH').lower()}
+    elif 'VACUUM' in keywords:
+        action = 'vacuum'
+        data = {'table': parsed.table}
+    elif 'CREATE' in keywords:
         action = 'create_table'
         cols = {col[0]: col[1].lower() for col in parsed.columns}
-        data = {'table': parsed.table, 'schema': cols}
-    elif 'INSERT' in parsed:
-        action = 'insert'
-        values = []
-        for v in parsed.values:
-            if re.match(r"^-?\d+$", v):
-                values.append(int(v))
-            elif re.match(r"^\d{4}-\d{2}-\d{2}$", v.strip("'\"")):
-                values.append(v.strip('"\''))
-            else:
-                values.append(v.strip('"\''))
-        data = {
-            'table': parsed.table,
-            'row': dict(zip(parsed.columns, values))
-        }
-    elif 'SELECT' in parsed:
+        data = {'table': parsed.table, 'schema': cols, 'storage': parsed.get('storage', 'ROW').lower()}
+        kind = parsed.get('partition_kind')
+        if kind == 'RANGE':
+            data['partition_by'] = {'kind': 'range', 'column': parsed.partition_column,
+                                    'partitions': [(p[0], _partition_bound(p[1], params)) for p in parsed.partitions]}
+        elif kind == 'HASH':
+            data['partition_by'] = {'kind': 'hash', 'column': parsed.partition_column,
+                                    'partitions': int(_bind(parsed.partition_count, params))}
+    elif 'INSERT' in keywords:
+        rows = []
+        for group in parsed['values']:
+            if len(group) != len(parsed.columns):
+                raise ValueError(f"INSERT has {len(parsed.columns)} columns but {len(group)} values")
+            values = []
+            for v in group:
+                values.append(_bind(v, params, _insert_literal))
+            rows.append(dict(zip(parsed.columns, values)))
+        if len(rows) == 1:
+            action = 'insert'
+            data = {'table': parsed.table, 'row': rows[0]}
+        else:
+            action = 'insert_many'
+            data = {'table': parsed.table, 'rows': rows}
+    elif 'SELECT' in keywords:
         action = 'select'
-        where = None
-        if parsed.get('where'):
-            where = {k: v.strip('"\'') for k, v in parsed.where}
-        data = {
-            'table': parsed.table,
-            'columns': list(parsed.columns),
-            'where': where
-        }
-    elif 'UPDATE' in parsed:
+        where = parsed.get('where')
+        columns = [_select_item(c) for c in parsed.columns]
+        group_by = list(parsed.get('group_by') or [])
+        having = parsed.get('having')
+        aggregates = [c for c in columns if isinstance(c, tuple)]
+        if parsed.get('join_table'):
+            if aggregates or group_by or having:
+                raise ValueError("Aggregates and GROUP BY are not supported on joins")
+            action = 'join'
+            data = {
+                'table': parsed.table,
+                'join_table': parsed.join_table,
+                'on': list(parsed.join_on),
+                'columns': None if columns == ['*'] else columns,
+                'where': _where_filters(where, params) if where else None
+            }
+        elif aggregates or group_by or having:
+            action = 'aggregate'
+            if columns == ['*']:
+                raise ValueError("SELECT * cannot be combined with aggregates or GROUP BY")
+            columns = [_local(c, parsed.table) for c in columns]
+            having_conds = [[_local(_select_item(c[0]), parsed.table)] + list(c[1:]) for c in having] if having else []
+            for cond in having_conds:
+                if isinstance(cond[0], tuple) and cond[0] not in aggregates:
+                    aggregates.append(cond[0])  # aggregates only used by HAVING are computed too
+            data = {
+                'table': parsed.table,
+                'columns': [_column_name(c) for c in columns],
+                'aggregates': aggregates,
+                'group_by': group_by,
+                'where': _where_filters(where, params, parsed.table) if where else None,
+                'having': _where_filters([[_column_name(c[0])] + c[1:] for c in having_conds], params) or None,
+            }
+        else:
+            data = {
+                'table': parsed.table,
+                # None selects every column
+                'columns': None if columns == ['*'] else [_local(c, parsed.table) for c in columns],
+                'where': _where_filters(where, params, parsed.table) if where else None
+            }
+    elif 'UPDATE' in keywords:
         action = 'update'
-        update_data = {k: v.strip('"\'') for k, v in parsed.set}
-        where = None
-        if parsed.get('where'):
-            where = {k: v.strip('"\'') for k, v in parsed.where}
-        data = {'table': parsed.table, 'update': update_data, 'where': where}
-    elif 'DELETE' in parsed:
+        update_data = {k: _bind(v, params, _strip) for k, v in parsed.set}
+        where = parsed.get('where')
+        data = {'table': parsed.table, 'update': update_data,
+                'where': _where_filters(where, params, parsed.table) if where else None}
+    elif 'DELETE' in keywords:
         action = 'delete'
-        where = None
-        if parsed.get('where'):
-            where = {k: v.strip('"\'') for k, v in parsed.where}
-        data = {'table': parsed.table, 'where': where}
-    elif 'ALTER' in parsed:
-        if 'RENAME' in parsed:
+        where = parsed.get('where')
+        data = {'table': parsed.table, 'where': _where_filters(where, params, parsed.table) if where else None}
+    elif 'ALTER' in keywords:
+        if 'RENAME' in keywords:
             action = 'alter_rename'
             data = {'table': parsed.table, 'newname': parsed.newname}
-        elif 'ADD' in parsed and 'COLUMN' in parsed:
+        elif 'PARTITION' in keywords and 'DROP' in keywords:
+            action = 'alter_droppart'
+            data = {'table': parsed.table, 'name': parsed.partition}
+        elif 'PARTITION' in keywords and 'ADD' in keywords:
+            action = 'alter_addpart'
+            data = {'table': parsed.table, 'name': parsed.partition, 'bound': _partition_bound(parsed.bound, params)}
+        elif 'ADD' in keywords and 'COLUMN' in keywords:
             action = 'alter_addcol'
             data = {'table': parsed.table, 'col': parsed.col, 'type': parsed.type.lower()}
         else:
@@ -0,0 +1,210 @@
+"""
+Client for an AetherDB server (see server.py). RemoteDB mirrors the parts of AetherDB the shells
+use (login, login_token, execute_sql, tables), so a shell can run against either.
+
+SELECT results stream: execute_sql(..., stream=True) returns a ResultStream that reads row
+batches off the socket as it is iterated. Sending the next request first reads whatever is left
+of an unfinished stream. pipeline() sends a whole batch of statements before reading the replies.
+Connections are not thread-safe; share them through a ConnectionPool (pool.py).
+"""
+import socket
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .db_engine import ResultStream
+from .protocol import (DEFAULT_PORT, ProtocolError, RemoteError, encode, open_socket, raise_error,
+                       recv_message)
+
+PIPELINE_INLINE = 64 * 1024  # request bytes small enough to send before reading any reply
+
+
+class TableInfo(NamedTuple):
+    name: str
+    schema: Dict[str, str]
+
+
+class RemoteDB:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, unix_path: Optional[str] = None,
+                 connect_timeout: Optional[float] = 5.0, timeout: Optional[float] = None,
+                 batch_size: Optional[int] = None):
+        self.address = unix_path or f"{host}:{port}"
+        self.batch_size = batch_size  # rows per frame; None lets the server choose
+        self._sock: Optional[socket.socket] = open_socket(host, port, unix_path, connect_timeout, timeout)
+        self._pending: Optional[Iterator[Dict[str, Any]]] = None  # unfinished result stream
+        self.current_user: Optional[str] = None
+        self.session_token: Optional[str] = None
+
+    # -- requests
+
+    def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and return its first reply frame (raising if it is an error)."""
+        if self._sock is None:
+            raise ProtocolError("Connection is closed")
+        self._finish_pending()
+        self._send(encode(message))
+        reply = self._recv()
+        if "error" in reply:
+            raise_error(reply)
+        return reply
+
+    def _finish_pending(self) -> None:
+        if self._pending is not None:
+            try:
+                for _ in self._pending:
+                    pass
+            except Exception:
+                if self._sock is None:
+                    raise  # the connection broke; an error in the abandoned result itself is dropped
+
+    def login(self, username: str, password: str) -> bool:
+        reply = self._request({"op": "login", "user": username, "password": password})
+        if reply["ok"]:
+            self.current_user = username
+            self.session_token = reply["token"]
+        return reply["ok"]
+
+    def login_token(self, token: str) -> bool:
+        reply = self._request({"op": "token", "token": token})
+        if reply["ok"]:
+            self.current_user = reply["user"]
+            self.session_token = token
+        return reply["ok"]
+
+    def execute_sql(self, sql: str, params=None, stream: bool = False):
+        """Same contract as AetherDB.execute_sql: SELECTs give a list, or a ResultStream if stream."""
+        reply = self._request(self._sql_message(sql, params))
+        if "columns" not in reply:
+            return reply["result"]
+        result = ResultStream(reply["columns"], self._rows(reply["columns"]))
+        return result if stream else list(result)
+
+    def _sql_message(self, sql: str, params=None) -> Dict[str, Any]:
+        if params is not None and not isinstance(params, dict):
+            params = list(params)
+        return {"op": "sql", "sql": sql, "params": params, "batch": self.batch_size}
+
+    def pipeline(self, statements: Iterable[Union[str, Tuple[str, Any]]],
+                 return_exceptions: bool = False) -> List[Any]:
+        """
+        Run statements (SQL strings or (sql, params) pairs) without waiting a round trip for
+        each: every request is written before the replies are read back, in order. Returns one
+        result per statement as execute_sql would (SELECTs as lists). A failing statement does
+        not stop the others; its exception is raised once all replies are in, or put in its
+        place in the list if return_exceptions.
+        """
+        messages = [self._sql_message(*((s,) if isinstance(s, str) else s)) for s in statements]
+        if self._sock is None:
+            raise ProtocolError("Connection is closed")
+        self._finish_pending()
+        frames = b"".join(encode(m) for m in messages)
+        sender = None
+        failed: List[BaseException] = []
+        if len(frames) <= PIPELINE_INLINE:
+            self._send(frames)
+        else:
+            # Replies are read while the requests go out, or a server blocked on writing
+            # replies we have not read yet would stop reading and stall our send
+            def send() -> None:
+                try:
+                    self._sock.sendall(frames)
+                except (OSError, AttributeError) as e:
+                    failed.append(e)
+            sender = threading.Thread(target=send, name="aetherdb-pipeline", daemon=True)
+            sender.start()
+        results: List[Any] = []
+        try:
+            for _ in messages:
+                results.append(self._read_result())
+        finally:
+            if sender is not None:
+                sender.join()
+        if failed:
+            self.close()
+            raise failed[0]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def _read_result(self) -> Any:
+        """One statement's complete reply: its result, a list of rows, or the exception it raised."""
+        reply = self._recv()
+        try:
+            if "error" in reply:
+                raise_error(reply)
+            if "columns" not in reply:
+                return reply["result"]
+            return list(self._read_rows(reply["columns"]))
+        except (PermissionError, ValueError, KeyError, TypeError, RemoteError) as e:
+            if self._sock is None:
+                raise
+            return e
+
+    def ping(self) -> bool:
+        """True if the server answers on this connection."""
+        try:
+            return self._request({"op": "ping"})["ok"]
+        except (OSError, ValueError):
+            return False
+
+    def _rows(self, columns) -> Iterator[Dict[str, Any]]:
+        gen = self._read_rows(columns)
+        self._pending = gen
+        return gen
+
+    def _read_rows(self, columns) -> Iterator[Dict[str, Any]]:
+        done = False
+        try:
+            while True:
+                message = self._recv()
+                if "rows" not in message:
+                    done = True
+                    if "error" in message:
+                        raise_error(message)
+                    return  # {"done": ...}
+                for values in message["rows"]:
+                    yield dict(zip(columns, values))
+        finally:
+            self._pending = None
+            if not done and self._sock is not None:
+                # Closed early: skip the rest of the result so the next reply lines up
+                while "rows" in self._recv():
+                    pass
+
+    def _send(self, data: bytes) -> None:
+        try:
+            self._sock.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def _recv(self) -> Dict[str, Any]:
+        try:
+            return recv_message(self._sock)
+        except (OSError, ValueError):
+            self.close()  # the stream of frames is out of step now; don't reuse it
+            raise
+
+    @property
+    def tables(self) -> Dict[str, TableInfo]:
+        """Tables the current user can read, with their schemas."""
+        reply = self._request({"op": "tables"})
+        return {name: TableInfo(name, schema) for name, schema in reply["tables"].items()}
+
+    # -- connection
+
+    @property
+    def closed(self) -> bool:
+        return self._sock is None
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self) -> "RemoteDB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
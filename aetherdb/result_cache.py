@@ -0,0 +1,86 @@
+"""
+Opt-in cache of query results for AetherDB.
+
+Entries are keyed on the tables and the normalized query (filters, projection, ...), and
+remember the table version(s) they were computed at. A lookup only hits while every table is
+still at that version, so any insert/update/delete/ALTER invalidates without extra bookkeeping.
+Eviction is least-recently-used, bounded by entry count and total cached rows. Safe to share
+between threads.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 256, max_rows: int = 100_000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        # key -> (versions, columns, rows as tuples)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, List[str], List[tuple]]]" = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, versions: Any) -> Optional[Tuple[List[str], List[Dict[str, Any]]]]:
+        """(columns, rows as fresh dicts) if the entry exists and is still at versions, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        columns = entry[1]
+        return list(columns), [dict(zip(columns, values)) for values in entry[2]]
+
+    def put(self, key: Hashable, versions: Any, columns: List[str], rows: Iterable[Dict[str, Any]]) -> None:
+        stored = [tuple(row.get(c) for c in columns) for row in rows]
+        if len(stored) > self.max_rows:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (versions, list(columns), stored)
+            self.rows += len(stored)
+            while len(self._entries) > self.max_entries or self.rows > self.max_rows:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def recording(self, key: Hashable, versions: Any, columns: List[str],
+                  rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass rows through, caching them once the consumer has read the result to the end."""
+        seen: Optional[List[Dict[str, Any]]] = []
+        for row in rows:
+            if seen is not None:
+                seen.append(row)
+                if len(seen) > self.max_rows:
+                    seen = None  # too large to cache; keep streaming
+            yield row
+        if seen is not None:
+            self.put(key, versions, columns, seen)
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Drop entries reading table (all entries if None)."""
+        with self._lock:
+            for key in [k for k in self._entries if table is None or table in k[0]]:
+                self._drop(key)
+
+    def _drop(self, key: Hashable) -> None:
+        self.rows -= len(self._entries.pop(key)[2])
+
+    def info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "rows": self.rows,
+                "max_entries": self.max_entries, "max_rows": self.max_rows}
+
+
+def filters_key(filters: Optional[Dict[str, Any]]) -> Tuple:
+    return tuple(sorted((filters or {}).items(), key=lambda kv: kv[0]))
@@ -0,0 +1,212 @@
+"""
+AetherDB network server: hosts one long-lived engine over TCP and/or a Unix socket, speaking
+the length-prefixed JSON protocol in protocol.py.
+
+The event loop only moves frames. Statements and every batch of a streamed SELECT run on a
+thread pool, in a contextvars.Context owned by the connection, so each connection has its own
+logged-in user (see AetherDB.session) and a slow query never stalls other clients. A SELECT is
+sent in batches as it is read from the table; the next batch is only produced once the previous
+one has been written out, so a slow client holds back its own scan, not the server's memory.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .db_engine import AetherDB, ResultStream
+from .protocol import DEFAULT_PORT, ProtocolError, encode, error_message, read_message
+
+DEFAULT_BATCH = 500
+
+
+class AetherServer:
+    def __init__(self, db: Optional[AetherDB] = None, host: Optional[str] = "127.0.0.1",
+                 port: int = DEFAULT_PORT, unix_path: Optional[str] = None, batch_size: int = DEFAULT_BATCH,
+                 workers: Optional[int] = None):
+        self.db = db if db is not None else AetherDB()
+        self.host = host  # None: no TCP listener
+        self.port = port  # 0 picks a free port; the bound one is stored here by start()
+        self.unix_path = unix_path
+        self.batch_size = batch_size
+        self.workers = workers or AetherDB.sql_workers
+        self._handlers: Dict[asyncio.Task, asyncio.StreamWriter] = {}  # open connections
+        self._servers: List[asyncio.AbstractServer] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="aetherdb-server")
+        if self.host is not None:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        if self.unix_path:
+            if os.path.exists(self.unix_path):
+                os.remove(self.unix_path)  # left behind by a server that did not shut down
+            self._servers.append(await asyncio.start_unix_server(self._handle, self.unix_path))
+        if not self._servers:
+            raise ValueError("Nothing to listen on: give a host/port, a Unix socket path, or both")
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await asyncio.gather(*(s.serve_forever() for s in self._servers))
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        # Hanging up makes each handler see EOF and return (after finishing a running statement)
+        for writer in list(self._handlers.values()):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.remove(self.unix_path)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # -- running in a background thread (embedding, tests)
+
+    def start_thread(self) -> "AetherServer":
+        """Run the server on its own event loop in a daemon thread; returns once it listens."""
+        started = threading.Event()
+        failure: List[BaseException] = []
+
+        def run() -> None:
+            loop = self._loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start())
+            except BaseException as e:
+                failure.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self.close())
+            loop.close()
+        self._thread = threading.Thread(target=run, name="aetherdb-server-loop", daemon=True)
+        self._thread.start()
+        started.wait()
+        if failure:
+            raise failure[0]
+        return self
+
+    def stop_thread(self) -> None:
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def connections(self) -> int:
+        return len(self._handlers)
+
+    # -- connections
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers[asyncio.current_task()] = writer
+        # Each connection starts logged out, whatever the server's own context holds
+        ctx = contextvars.copy_context()
+        ctx.run(self._logout)
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    return  # client hung up between requests
+                await self._respond(request, ctx, writer)
+        except (ConnectionError, ProtocolError, ValueError):
+            return  # broken connection or a garbled frame: drop the client
+        finally:
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+    def _logout(self) -> None:
+        self.db.current_user = None
+        self.db.session_token = None
+
+    async def _run(self, ctx: contextvars.Context, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, ctx.run, fn, *args)
+
+    async def _respond(self, request: Dict[str, Any], ctx: contextvars.Context,
+                       writer: asyncio.StreamWriter) -> None:
+        op = request.get("op")
+        try:
+            if op == "sql":
+                result = await self._run(ctx, self.db.execute_sql, request["sql"], request.get("params"), True)
+                if isinstance(result, ResultStream):
+                    await self._stream(result, ctx, writer, request.get("batch") or self.batch_size)
+                    return
+                reply = {"result": result}
+            elif op == "login":
+                reply = await self._run(ctx, self._login, request["user"], request.get("password", ""))
+            elif op == "token":
+                reply = await self._run(ctx, self._login_token, request["token"])
+            elif op == "tables":
+                reply = await self._run(ctx, self._tables)
+            elif op == "ping":
+                reply = {"ok": True}
+            else:
+                raise ValueError(f"Unknown request {op!r}")
+            frame = encode(reply)
+        except Exception as e:
+            frame = encode(error_message(e))
+        writer.write(frame)
+        await writer.drain()
+
+    async def _stream(self, result: ResultStream, ctx: contextvars.Context, writer: asyncio.StreamWriter,
+                      batch: int) -> None:
+        writer.write(encode({"columns": result.columns}))
+        columns = result.columns
+        batches = result.batches(batch)
+        count = 0
+        try:
+            while True:
+                try:
+                    rows = await self._run(ctx, next, batches, None)
+                except Exception as e:
+                    writer.write(encode(error_message(e)))
+                    break
+                if rows is None:
+                    writer.write(encode({"done": True, "count": count}))
+                    break
+                writer.write(encode({"rows": [[row.get(c) for c in columns] for row in rows]}))
+                count += len(rows)
+                await writer.drain()
+            await writer.drain()
+        finally:
+            # Ends the scan (and releases its table) if the client went away mid-stream
+            await self._run(ctx, result.close)
+
+    def _login(self, user: str, password: str) -> Dict[str, Any]:
+        ok = self.db.login(user, password)
+        return {"ok": ok, "token": self.db.session_token if ok else None}
+
+    def _login_token(self, token: str) -> Dict[str, Any]:
+        ok = self.db.login_token(token)
+        return {"ok": ok, "user": self.db.current_user if ok else None}
+
+    def _tables(self) -> Dict[str, Any]:
+        self.db.require_login()
+        user = self.db.current_user
+        # Only tables the user may read, so the catalog doesn't show what GRANTs hide
+        return {"tables": {name: dict(table.schema) for name, table in list(self.db.tables.items())
+                           if table.has_perm(user, "read")}}
+
+
+def serve(db: Optional[AetherDB] = None, host: Optional[str] = "127.0.0.1", port: int = DEFAULT_PORT,
+          unix_path: Optional[str] = None, **options) -> None:
+    """Run a server until interrupted (what `aetherdb serve` does)."""
+    server = AetherServer(db, host, port, unix_path, **options)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
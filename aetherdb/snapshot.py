@@ -0,0 +1,355 @@
+"""
+Binary snapshot format for AetherDB tables.
+
+    SNAPSHOT_MAGIC | version (u16) | column blocks ... | directory (JSON) | directory length (u64)
+
+Each table is stored as one block per column holding only its live rows: a NULL mask plus
+little-endian 'q' values for int and date (ordinals) columns, or 'i' ids into a string pool for
+str columns, each block optionally compressed with zlib or lzma. Values a typed block cannot hold
+(ints beyond 64 bits in row storage) fall back to a pickled list for that column. The directory
+comes last so tables can be written one after another without buffering the file; it lists every
+table's schema, layout, permissions, index definitions and block offsets. A partitioned table's
+entry (format version 2) holds its partitioning spec and one nested entry, with its own blocks,
+per partition.
+
+read_snapshot parses only the directory. Tables are decoded (and their indexes rebuilt) the
+first time they are looked up in the LazyTables mapping it returns.
+"""
+from array import array
+from collections.abc import MutableMapping
+from threading import RLock
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import json
+import lzma
+import pickle
+import struct
+import sys
+import zlib
+
+from .index import make_index
+from .storage import ColumnStorage, DateColumn, IntColumn, StrColumn
+
+SNAPSHOT_MAGIC = b"AETHERSNAP\n"
+FORMAT_VERSION = 2  # 2: partitioned tables
+_VERSION = struct.Struct("<H")
+_TRAILER = struct.Struct("<Q")
+_LENGTHS = "I"
+
+CODECS = {
+    None: (lambda b: b, lambda b: b),
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "lzma": (lambda b: lzma.compress(b, preset=1), lzma.decompress),
+}
+
+
+def is_snapshot(head: bytes) -> bool:
+    return head[:len(SNAPSHOT_MAGIC)] == SNAPSHOT_MAGIC
+
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(typecode: str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+# -- column blocks: (encoding, payload) from a list of values, and back
+
+def _encode_values(typ: str, values: List[Any]) -> Tuple[str, bytes]:
+    nulls = bytes(v is None for v in values)
+    try:
+        if typ == "int":
+            return "q", nulls + _le(array("q", [0 if v is None else v for v in values]))
+        if typ == "date":
+            return "q", nulls + _le(array("q", [0 if v is None else v.toordinal() for v in values]))
+        if typ == "str":
+            col = StrColumn()
+            ids = array(col.typecode, [0 if v is None else col.encode(v) for v in values])
+            return "s", nulls + _le(ids) + _encode_pool(col.pool)
+    except (OverflowError, UnicodeEncodeError):
+        pass
+    return "p", pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+
+
+def _encode_column(col) -> Tuple[str, bytes]:
+    """Blocks straight from a columnar storage column (no tombstones)."""
+    if isinstance(col, StrColumn):
+        return "s", bytes(col.nulls) + _le(col.data) + _encode_pool(col.pool)
+    return "q", bytes(col.nulls) + _le(col.data)
+
+
+def _encode_pool(pool: List[str]) -> bytes:
+    encoded = [s.encode() for s in pool]
+    return _le(array(_LENGTHS, [len(pool)] + [len(b) for b in encoded])) + b"".join(encoded)
+
+
+def _decode_pool(data, offset: int) -> List[str]:
+    size = array(_LENGTHS).itemsize
+    count = _from_le(_LENGTHS, data[offset:offset + size])[0]
+    lengths = _from_le(_LENGTHS, data[offset + size:offset + size * (count + 1)])
+    pos = offset + size * (count + 1)
+    pool = []
+    for n in lengths:
+        pool.append(bytes(data[pos:pos + n]).decode())
+        pos += n
+    return pool
+
+
+def _decode_column(typ: str, enc: str, data, rows: int):
+    """A storage column (IntColumn/DateColumn/StrColumn) from a typed block."""
+    col = {"int": IntColumn, "date": DateColumn, "str": StrColumn}[typ]()
+    col.nulls = bytearray(data[:rows])
+    end = rows + rows * array(col.typecode).itemsize
+    col.data = _from_le(col.typecode, data[rows:end])
+    if enc == "s":
+        col.pool = _decode_pool(data, end)
+        col.pool_ids = {s: i for i, s in enumerate(col.pool)}
+    return col
+
+
+def _decode_values(typ: str, enc: str, data, rows: int) -> List[Any]:
+    if enc == "p":
+        return pickle.loads(data)
+    col = _decode_column(typ, enc, data, rows)
+    nulls = col.nulls
+    if typ == "int":
+        raw = col.data.tolist()
+        return [None if nulls[i] else raw[i] for i in range(rows)] if any(nulls) else raw
+    get = col.get
+    return [get(i) for i in range(rows)]
+
+
+# -- writing
+
+def write_snapshot(out: BinaryIO, tables, meta: Optional[Dict[str, Any]] = None,
+                   compression: Optional[str] = "zlib") -> None:
+    """Write tables (a name -> Table mapping, possibly LazyTables) to the binary stream out."""
+    if compression not in CODECS:
+        raise ValueError(f"Compression {compression} not supported (use zlib, lzma or None).")
+    compress = CODECS[compression][0]
+    out.write(SNAPSHOT_MAGIC + _VERSION.pack(FORMAT_VERSION))
+    offset = 0
+    directory: Dict[str, Any] = {"version": FORMAT_VERSION, "meta": meta or {}, "tables": []}
+    for name in tables:
+        raw = tables.raw(name) if isinstance(tables, LazyTables) else None
+        if raw is not None:
+            # Never decoded since loading: copy its blocks unchanged
+            entry, offset = _copy_blocks(out, *raw, offset)
+        else:
+            entry, offset = _write_table(out, tables[name], compress, compression, offset)
+        directory["tables"].append(entry)
+    encoded = json.dumps(directory).encode()
+    out.write(encoded + _TRAILER.pack(len(encoded)))
+
+
+def _write_table(out: BinaryIO, table, compress, compression: Optional[str], offset: int) -> Tuple[Dict[str, Any], int]:
+    """(directory entry, offset after its blocks) for a table whose blocks are written at offset."""
+    entry = _table_entry(table)
+    if hasattr(table, "partitions"):
+        entry["partitioning"] = table.partitioning.spec()
+        entry["partitions"] = []
+        for part in table.partitions.values():
+            part_entry, offset = _write_table(out, part, compress, compression, offset)
+            entry["partitions"].append(part_entry)
+        return entry, offset
+    for col, (enc, payload) in _table_blocks(table):
+        data = compress(payload)
+        entry["blocks"].append({"col": col, "enc": enc, "codec": compression, "offset": offset,
+                                "length": len(data)})
+        out.write(data)
+        offset += len(data)
+    return entry, offset
+
+
+def _copy_blocks(out: BinaryIO, entry: Dict[str, Any], data, offset: int) -> Tuple[Dict[str, Any], int]:
+    """Copy of a loaded entry with its stored blocks (data: the snapshot body) rewritten at offset."""
+    copied = dict(entry, blocks=[])
+    for block in entry["blocks"]:
+        stored = data[block["offset"]:block["offset"] + block["length"]]
+        copied["blocks"].append(dict(block, offset=offset))
+        out.write(stored)
+        offset += len(stored)
+    if "partitions" in entry:
+        copied["partitions"] = []
+        for part in entry["partitions"]:
+            part_entry, offset = _copy_blocks(out, part, data, offset)
+            copied["partitions"].append(part_entry)
+    return copied, offset
+
+
+def _table_entry(table) -> Dict[str, Any]:
+    partitioned = hasattr(table, "partitions")
+    return {
+        "name": table.name,
+        "schema": list(table.schema.items()),
+        "storage": table.storage_kind if partitioned else table.storage.kind,
+        "rows": len(table),
+        "auto_inc": table.auto_inc,
+        "version": table.version,
+        "permissions": {user: sorted(perms) for user, perms in table.permissions.items()},
+        "indexes": [[name, cols, kind] for name, (cols, kind) in table.index_defs.items()] if partitioned else
+                   [[idx.name, list(idx.columns), idx.kind] for idx in table.indexes.values()],
+        "blocks": [],
+    }
+
+
+def _table_blocks(table) -> Iterator[Tuple[str, Tuple[str, bytes]]]:
+    storage = table.storage
+    if isinstance(storage, ColumnStorage) and not table.deleted_count:
+        for col in table.schema:
+            yield col, _encode_column(storage.columns[col])
+        return
+    positions = list(table._live_positions())
+    for col, typ in table.schema.items():
+        value = storage.value
+        yield col, _encode_values(typ, [value(pos, col) for pos in positions])
+
+
+# -- reading
+
+def read_snapshot(data: bytes) -> Tuple[Dict[str, Any], "LazyTables"]:
+    """(meta, tables) from a whole snapshot; tables are decoded on first access."""
+    if not is_snapshot(data):
+        raise ValueError("Not an AetherDB binary snapshot")
+    (version,) = _VERSION.unpack_from(data, len(SNAPSHOT_MAGIC))
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Snapshot format version {version} is newer than this AetherDB ({FORMAT_VERSION})")
+    (length,) = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+    end = len(data) - _TRAILER.size
+    directory = json.loads(data[end - length:end].decode())
+    start = len(SNAPSHOT_MAGIC) + _VERSION.size
+    return directory["meta"], LazyTables(memoryview(data)[start:end - length], directory["tables"])
+
+
+def _decode_table(entry: Dict[str, Any], data):
+    from .db_engine import PartitionedTable, Table
+    schema = dict(entry["schema"])
+    if "partitions" in entry:
+        table = PartitionedTable(entry["name"], schema, storage=entry["storage"], partition_by=entry["partitioning"])
+        table.partitions = {part["name"]: _decode_table(part, data) for part in entry["partitions"]}
+        table.index_defs = {name: (cols, kind) for name, cols, kind in entry["indexes"]}
+        table.auto_inc = entry["auto_inc"]
+        table.version = entry["version"]
+        table.permissions = {user: set(perms) for user, perms in entry["permissions"].items()}
+        return table
+    table = Table(entry["name"], schema, storage=entry["storage"])
+    rows = entry["rows"]
+    blocks = {}
+    for block in entry["blocks"]:
+        raw = data[block["offset"]:block["offset"] + block["length"]]
+        blocks[block["col"]] = (block["enc"], CODECS[block["codec"]][1](raw))
+    storage = table.storage
+    if isinstance(storage, ColumnStorage):
+        for col, typ in schema.items():
+            enc, payload = blocks[col]
+            if enc == "p":
+                column = storage._make_column(col, typ)
+                for v in pickle.loads(payload):
+                    column.append_raw(None if v is None else column.encode(v))
+            else:
+                column = _decode_column(typ, enc, payload, rows)
+            storage.columns[col] = column
+        storage.length = rows
+    else:
+        columns = [_decode_values(typ, *blocks[col], rows) for col, typ in schema.items()]
+        names = list(schema)
+        storage.rows = [dict(zip(names, values)) for values in zip(*columns)] if names else [{} for _ in range(rows)]
+    table.deleted = bytearray(rows)
+    table.auto_inc = entry["auto_inc"]
+    table.version = entry["version"]
+    table.permissions = {user: set(perms) for user, perms in entry["permissions"].items()}
+    for name, cols, kind in entry["indexes"]:
+        # Every stored row is live, and the index only needs its own columns
+        idx = make_index(name, cols, kind)
+        project = storage.projector(cols)
+        idx.rebuild((pos, project(pos)) for pos in range(rows))
+        table.indexes[name] = idx
+    return table
+
+
+class LazyTables(MutableMapping):
+    """
+    Table name -> Table mapping over a loaded snapshot. A table is decoded the first time it is
+    looked up; until then only its directory entry and the shared snapshot bytes are held.
+    Iteration, len() and `in` never decode.
+    """
+    def __init__(self, data, entries: List[Dict[str, Any]]):
+        self._data = data
+        self._pending: Dict[str, Dict[str, Any]] = {e["name"]: e for e in entries}
+        self._order: List[str] = [e["name"] for e in entries]
+        self._tables: Dict[str, Any] = {}
+        self._lock = RLock()
+
+    def __getitem__(self, name: str):
+        table = self._tables.get(name)
+        if table is not None:
+            return table
+        with self._lock:
+            if name in self._tables:
+                return self._tables[name]
+            entry = self._pending.get(name)
+            if entry is None:
+                raise KeyError(name)
+            table = self._tables[name] = _decode_table(entry, self._data)
+            del self._pending[name]
+            self._release()
+            return table
+
+    def __setitem__(self, name: str, table) -> None:
+        with self._lock:
+            if name not in self._tables and name not in self._pending:
+                self._order.append(name)
+            self._pending.pop(name, None)
+            self._tables[name] = table
+            self._release()
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            if name not in self._tables and name not in self._pending:
+                raise KeyError(name)
+            self._tables.pop(name, None)
+            self._pending.pop(name, None)
+            self._order.remove(name)
+            self._release()
+
+    def __contains__(self, name) -> bool:
+        return name in self._tables or name in self._pending
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._order))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _release(self) -> None:
+        if not self._pending:
+            self._data = None  # every table decoded: drop the snapshot bytes
+
+    def raw(self, name: str) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """
+        (directory entry, snapshot body its block offsets point into) of a table not decoded
+        yet, else None.
+        """
+        with self._lock:
+            entry = self._pending.get(name)
+            if entry is None:
+                return None
+            return entry, self._data
+
+    @property
+    def decoded(self) -> List[str]:
+        return list(self._tables)
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+    def __repr__(self) -> str:
+        return f"LazyTables({len(self._tables)} of {len(self._order)} decoded)"
@@ -0,0 +1,120 @@
+"""
+Pyparsing grammar for AetherDB SQL. The engine parses with the hand-written parser in
+fast_parser; this grammar is imported lazily and only used for error reporting (and as a
+fallback should the fast parser reject something the grammar accepts).
+"""
+from pyparsing import (Word, alphas, alphanums, delimitedList, Group, Keyword, Combine,
+                       Suppress, Literal, Optional, ZeroOrMore, QuotedString, nums)
+from .fast_parser import Param
+
+# Supported keywords
+CREATE, TABLE, INSERT, INTO, VALUES, SELECT, FROM, WHERE, UPDATE, SET, DELETE, ALTER, RENAME, TO, ADD, COLUMN, INDEX, ON = map(
+    Keyword, "CREATE TABLE INSERT INTO VALUES SELECT FROM WHERE UPDATE SET DELETE ALTER RENAME TO ADD COLUMN INDEX ON".split())
+USING, HASH, BTREE, BETWEEN, AND, ROW, COLUMNAR, VACUUM = map(
+    Keyword, "USING HASH BTREE BETWEEN AND ROW COLUMNAR VACUUM".split())
+INT, STR, DATE = map(Keyword, "INT STR DATE".split())
+GROUP, BY, HAVING, JOIN, INNER = map(Keyword, "GROUP BY HAVING JOIN INNER".split())
+COUNT, SUM, MIN, MAX, AVG = map(Keyword, "COUNT SUM MIN MAX AVG".split())
+PARTITION, PARTITIONS, RANGE, LESS, THAN, MAXVALUE, DROP = map(
+    Keyword, "PARTITION PARTITIONS RANGE LESS THAN MAXVALUE DROP".split())
+
+ident = Word(alphas, alphanums + "_" )
+columnName = ident
+columnRef = Combine(ident + '.' + ident, adjacent=False) | ident  # col or table.col
+columnType = INT | STR | DATE
+
+integer = Word(nums)
+string_literal = QuotedString('"') | QuotedString("'")
+date_literal = QuotedString('"') | QuotedString("'")  # expects YYYY-MM-DD in quotes
+placeholder = Combine(Literal(':') + Word(alphanums + "_")).setParseAction(lambda t: Param(t[0][1:]))  # e.g. :name
+value = placeholder | integer | string_literal | date_literal
+
+# WHERE a = 1, b >= 2 AND c BETWEEN '2024-01-01' AND '2024-12-31'
+comparison_op = Literal('<=') | Literal('>=') | Literal('<') | Literal('>') | Literal('=')
+condition = (Group(columnRef + BETWEEN + value + AND.suppress() + value) |
+             Group(columnRef + comparison_op + value))
+where_clause = WHERE + Group(condition + ZeroOrMore((Suppress(',') | AND.suppress()) + condition))('where')
+
+# PARTITION p2024 VALUES LESS THAN ('2025-01-01') | PARTITION pmax VALUES LESS THAN (MAXVALUE)
+bound_value = MAXVALUE | value
+partition_bound = Suppress('(') + bound_value + Suppress(')')
+partition_def = Group(PARTITION.suppress() + ident + VALUES.suppress() + LESS.suppress() + THAN.suppress() +
+                      partition_bound)
+# PARTITION BY RANGE (day) (PARTITION ..., ...) | PARTITION BY HASH (id) PARTITIONS 4
+partition_clause = (PARTITION + BY +
+                    ((RANGE('partition_kind') + Suppress('(') + columnName('partition_column') + Suppress(')') +
+                      Suppress('(') + Group(delimitedList(partition_def))('partitions') + Suppress(')')) |
+                     (HASH('partition_kind') + Suppress('(') + columnName('partition_column') + Suppress(')') +
+                      PARTITIONS + value('partition_count'))))
+
+# CREATE TABLE mytable (id INT, name STR, birth DATE) [USING ROW|COLUMNAR] [PARTITION BY ...]
+create_stmt = (CREATE + TABLE + ident('table') +
+               Suppress('(') +
+               Group(delimitedList(Group(columnName('col') + columnType('type'))))('columns') +
+               Suppress(')') +
+               Optional(USING + (ROW | COLUMNAR)('storage')) +
+               Optional(partition_clause))
+
+# INSERT INTO mytable (id, name) VALUES (1, "Alice"), (2, "Bob")
+insert_stmt = (INSERT + INTO + ident('table') +
+               Suppress('(') + Group(delimitedList(columnName))('columns') + Suppress(')') +
+               VALUES + Group(delimitedList(Group(Suppress('(') + delimitedList(value) + Suppress(')'))))('values'))
+
+# COUNT(*), SUM(amount), ...
+aggregate_call = Group((COUNT | SUM | MIN | MAX | AVG) + Suppress('(') + (Literal('*') | columnName) + Suppress(')'))
+select_item = aggregate_call | columnRef
+
+# GROUP BY region HAVING COUNT(*) > 1 AND SUM(amount) >= 100
+having_condition = (Group(select_item + BETWEEN + value + AND.suppress() + value) |
+                    Group(select_item + comparison_op + value))
+group_by_clause = GROUP + BY + Group(delimitedList(columnName))('group_by')
+having_clause = HAVING + Group(having_condition + ZeroOrMore((Suppress(',') | AND.suppress()) + having_condition))('having')
+
+# JOIN customers ON orders.customer = customers.id
+join_clause = (Optional(INNER) + JOIN + ident('join_table') + ON +
+               Group(columnRef + Suppress('=') + columnRef)('join_on'))
+
+# SELECT id, name FROM mytable WHERE name = 'Alice'
+# SELECT region, COUNT(*) FROM sales WHERE year = 2024 GROUP BY region HAVING COUNT(*) > 10
+# SELECT orders.id, customers.name FROM orders JOIN customers ON orders.customer = customers.id
+select_stmt = (SELECT + Group(Literal('*') | delimitedList(select_item))('columns') +
+               FROM + ident('table') +
+               Optional(join_clause) +
+               Optional(where_clause) +
+               Optional(group_by_clause) +
+               Optional(having_clause))
+
+# UPDATE mytable SET name = 'Bob' WHERE id = 2
+update_stmt = (UPDATE + ident('table') + SET +
+               Group(delimitedList(Group(columnName + Literal('=').suppress() + value)))('set') +
+               Optional(where_clause))
+
+# DELETE FROM mytable WHERE name = 'Bob'
+delete_stmt = (DELETE + FROM + ident('table') +
+               Optional(where_clause))
+
+# ALTER TABLE t RENAME TO newname
+alter_rename_stmt = (ALTER + TABLE + ident('table') +
+    RENAME + TO + ident('newname'))
+
+# ALTER TABLE t ADD COLUMN col type
+alter_addcol_stmt = (ALTER + TABLE + ident('table') +
+    ADD + COLUMN + columnName('col') + columnType('type'))
+
+# ALTER TABLE t ADD PARTITION p VALUES LESS THAN (value | MAXVALUE)
+alter_addpart_stmt = (ALTER + TABLE + ident('table') +
+    ADD + PARTITION + ident('partition') + VALUES + LESS + THAN +
+    Suppress('(') + bound_value('bound') + Suppress(')'))
+
+# ALTER TABLE t DROP PARTITION p
+alter_droppart_stmt = ALTER + TABLE + ident('table') + DROP + PARTITION + ident('partition')
+
+# CREATE INDEX idx_name ON mytable [USING HASH|BTREE] (col1, col2)
+create_index_stmt = (CREATE + INDEX + ident('name') + ON + ident('table') +
+                     Optional(USING + (HASH | BTREE)('kind')) +
+                     Suppress('(') + Group(delimitedList(columnName))('columns') + Suppress(')'))
+
+# VACUUM mytable
+vacuum_stmt = VACUUM + ident('table')
+
+sql_parser = create_stmt | create_index_stmt | vacuum_stmt | insert_stmt | select_stmt | update_stmt | delete_stmt | alter_rename_stmt | alter_addcol_stmt | alter_addpart_stmt | alter_droppart_stmt
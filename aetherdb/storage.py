@@ -0,0 +1,254 @@
+"""
+Storage layouts for AetherDB tables: a list of row dicts, or one typed array per column.
+
+Both layouts address rows by position and hand rows out as dicts, so Table logic (filters,
+indexes, permissions) does not depend on how the data is laid out.
+"""
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import datetime
+import sys
+
+
+class RowStorage:
+    """
+    Default layout: one dict per row. Rows handed out are the stored dicts themselves, so
+    changes replace a row's dict rather than mutating it: a row a reader holds never changes.
+    """
+    kind = "row"
+
+    def __init__(self, schema: Dict[str, str]):
+        self.rows: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self.rows.append(row)
+
+    def extend(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows.extend(rows)
+
+    def get(self, pos: int) -> Dict[str, Any]:
+        return self.rows[pos]
+
+    def value(self, pos: int, col: str) -> Any:
+        return self.rows[pos].get(col)
+
+    def projector(self, columns: Optional[List[str]] = None) -> Callable[[int], Dict[str, Any]]:
+        """Function building the output row for a position: the stored dict, or only columns."""
+        rows = self.rows
+        if columns is None:
+            return rows.__getitem__
+        return lambda pos: {c: rows[pos].get(c) for c in columns}
+
+    def set_values(self, pos: int, changes: Dict[str, Any]) -> None:
+        self.rows[pos] = {**self.rows[pos], **changes}
+
+    def add_column(self, col: str, typ: str) -> None:
+        self.rows = [{**row, col: None} for row in self.rows]
+
+    def keep(self, positions: Iterable[int]) -> None:
+        self.rows = [self.rows[pos] for pos in positions]
+
+    def iter_rows(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return enumerate(self.rows)
+
+    def memory_usage(self) -> int:
+        total = sys.getsizeof(self.rows)
+        for row in self.rows:
+            total += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values())
+        return total
+
+
+class _Column:
+    """
+    Typed column: a fixed-width array plus a NULL mask (one byte per row).
+    """
+    typecode = "q"
+
+    def __init__(self):
+        self.data = array(self.typecode)
+        self.nulls = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def encode(self, value: Any) -> int:
+        return value
+
+    def decode(self, raw: int) -> Any:
+        return raw
+
+    def append_raw(self, raw: Any) -> None:
+        if raw is None:
+            self.data.append(0)
+            self.nulls.append(1)
+        else:
+            self.data.append(raw)
+            self.nulls.append(0)
+
+    def get(self, pos: int) -> Any:
+        if self.nulls[pos]:
+            return None
+        return self.decode(self.data[pos])
+
+    def set(self, pos: int, value: Any) -> None:
+        self.set_raw(pos, None if value is None else self.encode(value))
+
+    def set_raw(self, pos: int, raw: Any) -> None:
+        if raw is None:
+            self.data[pos] = 0
+            self.nulls[pos] = 1
+        else:
+            self.data[pos] = raw
+            self.nulls[pos] = 0
+
+    def extend_nulls(self, n: int) -> None:
+        self.data.extend(array(self.typecode, bytes(self.data.itemsize * n)))
+        self.nulls.extend(b"\x01" * n)
+
+    def keep(self, positions: List[int]) -> None:
+        data, nulls = self.data, self.nulls
+        self.data = array(self.typecode, (data[p] for p in positions))
+        self.nulls = bytearray(nulls[p] for p in positions)
+
+    def memory_usage(self) -> int:
+        return sys.getsizeof(self.data) + sys.getsizeof(self.nulls)
+
+
+class IntColumn(_Column):
+    def encode(self, value: Any) -> int:
+        if not -2**63 <= value < 2**63:
+            raise ValueError(f"Integer {value} out of range for columnar storage")
+        return value
+
+
+class DateColumn(_Column):
+    """Dates stored as proleptic Gregorian ordinals."""
+    def encode(self, value: Any) -> int:
+        return value.toordinal()
+
+    def decode(self, raw: int) -> Any:
+        return datetime.date.fromordinal(raw)
+
+
+class StrColumn(_Column):
+    """Strings stored as ids into a per-column pool of distinct values."""
+    typecode = "i"
+
+    def __init__(self):
+        super().__init__()
+        self.pool: List[str] = []
+        self.pool_ids: Dict[str, int] = {}
+
+    def encode(self, value: Any) -> int:
+        sid = self.pool_ids.get(value)
+        if sid is None:
+            sid = self.pool_ids[value] = len(self.pool)
+            self.pool.append(value)
+        return sid
+
+    def decode(self, raw: int) -> Any:
+        return self.pool[raw]
+
+    def keep(self, positions: List[int]) -> None:
+        # Re-pool while compacting so strings no longer referenced are released
+        values = [self.get(p) for p in positions]
+        self.data, self.nulls, self.pool, self.pool_ids = array(self.typecode), bytearray(), [], {}
+        for v in values:
+            self.append_raw(None if v is None else self.encode(v))
+
+    def memory_usage(self) -> int:
+        return (super().memory_usage() + sys.getsizeof(self.pool) + sys.getsizeof(self.pool_ids) +
+                sum(sys.getsizeof(s) for s in self.pool))
+
+
+COLUMN_TYPES = {"int": IntColumn, "date": DateColumn, "str": StrColumn}
+
+
+class ColumnStorage:
+    """
+    Columnar layout: one typed array per column ('q' for int, ordinals for date, a string
+    pool for str). Rows handed out are fresh dicts built from the columns.
+    """
+    kind = "columnar"
+
+    def __init__(self, schema: Dict[str, str]):
+        self.columns: Dict[str, _Column] = {}
+        self.length = 0
+        for col, typ in schema.items():
+            self.columns[col] = self._make_column(col, typ)
+
+    @staticmethod
+    def _make_column(col: str, typ: str) -> _Column:
+        cls = COLUMN_TYPES.get(typ)
+        if cls is None:
+            raise ValueError(f"Type {typ} not supported for column {col}")
+        return cls()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, row: Dict[str, Any]) -> None:
+        # Encode everything first so a bad value cannot leave columns of unequal length
+        encoded = [(c, None if row.get(col) is None else c.encode(row[col]))
+                   for col, c in self.columns.items()]
+        for c, raw in encoded:
+            c.append_raw(raw)
+        self.length += 1
+
+    def extend(self, rows: List[Dict[str, Any]]) -> None:
+        encoded = [[None if row.get(col) is None else c.encode(row[col]) for row in rows]
+                   for col, c in self.columns.items()]
+        for c, raws in zip(self.columns.values(), encoded):
+            for raw in raws:
+                c.append_raw(raw)
+        self.length += len(rows)
+
+    def get(self, pos: int) -> Dict[str, Any]:
+        return {col: c.get(pos) for col, c in self.columns.items()}
+
+    def value(self, pos: int, col: str) -> Any:
+        c = self.columns.get(col)
+        return None if c is None else c.get(pos)
+
+    def projector(self, columns: Optional[List[str]] = None) -> Callable[[int], Dict[str, Any]]:
+        """Function building the output row for a position from only the given columns."""
+        getters = [(col, self.columns[col].get) for col in (self.columns if columns is None else columns)]
+        return lambda pos: {col: get(pos) for col, get in getters}
+
+    def set_values(self, pos: int, changes: Dict[str, Any]) -> None:
+        # Encode first (as in append) so a bad value leaves the row unchanged
+        encoded = [(self.columns[col], None if v is None else self.columns[col].encode(v))
+                   for col, v in changes.items()]
+        for c, raw in encoded:
+            c.set_raw(pos, raw)
+
+    def add_column(self, col: str, typ: str) -> None:
+        c = self._make_column(col, typ)
+        c.extend_nulls(self.length)
+        self.columns[col] = c
+
+    def keep(self, positions: Iterable[int]) -> None:
+        positions = list(positions)
+        for c in self.columns.values():
+            c.keep(positions)
+        self.length = len(positions)
+
+    def iter_rows(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for pos in range(self.length):
+            yield pos, self.get(pos)
+
+    def memory_usage(self) -> int:
+        return sum(c.memory_usage() for c in self.columns.values())
+
+
+STORAGE_KINDS = {"row": RowStorage, "columnar": ColumnStorage}
+
+
+def make_storage(kind: str, schema: Dict[str, str]):
+    cls = STORAGE_KINDS.get(kind.lower())
+    if cls is None:
+        raise ValueError(f"Storage {kind} not supported (use {', '.join(STORAGE_KINDS)}).")
+    return cls(schema)
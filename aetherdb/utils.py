@@ -1,17 +1,365 @@
+import atexit
+import datetime
+import glob
+import gzip
 import json
+import os
+import queue
+import shutil
+import threading
 import time
 from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional
 
 _LOG_FILE = "aetherdb_audit.log"
 _log_lock = Lock()
 
+DURABILITY_LEVELS = ("sync", "batched", "off")
+# Seconds a batched log() waits on a full queue before checking the writer thread is still alive
+PUT_TIMEOUT = 1.0
+
+
+class AuditWriter:
+    """
+    Appends audit entries as JSON lines through one buffered file handle.
+
+    durability:
+      - "sync": each entry is written and fsynced before audit_log returns
+      - "batched": entries go through a bounded queue to a background thread, which writes them
+        and flushes every flush_every entries or flush_interval seconds (callers block only
+        while the queue is full, and get a RuntimeError if the thread has died)
+      - "off": entries are discarded
+
+    detail may be a callable; it is called by log() itself, so the entry describes the data as
+    it was when logged, and not at all when durability is "off" or the action is listed in
+    skip_detail (those actions are logged without any detail).
+
+    The file is rotated once it reaches max_bytes or is rotate_interval seconds old (either may
+    be None): it is renamed to path.<timestamp> (gzipped if compress), a small index of its
+    users, actions and time range is written next to it, and only the newest backup_count
+    segments are kept.
+    """
+    def __init__(self, path: str = _LOG_FILE, durability: str = "batched", flush_every: int = 256,
+                 flush_interval: float = 0.2, queue_size: int = 10000, skip_detail=(),
+                 max_bytes: Optional[int] = 64 * 1024 * 1024, rotate_interval: Optional[float] = None,
+                 compress: bool = False, backup_count: Optional[int] = None):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Durability {durability} not supported (use {', '.join(DURABILITY_LEVELS)}).")
+        self.path = path
+        self.durability = durability
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.skip_detail = frozenset(skip_detail)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+        self.backup_count = backup_count
+        self._file = None
+        self._opened_at = 0.0
+        self._index: Optional[Dict[str, Any]] = None  # of the open segment; None if it predates us
+        self._queue = None
+        self._thread = None
+        self._error: Optional[BaseException] = None  # what stopped the writer thread
+        self._closed = False
+        if durability == "batched":
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, name="aetherdb-audit", daemon=True)
+            self._thread.start()
+
+    def log(self, user, action, detail=None) -> None:
+        if self.durability == "off" or self._closed:
+            return
+        if action in self.skip_detail:
+            detail = None
+        elif callable(detail):
+            try:
+                detail = detail()
+            except Exception as e:  # a bad detail must not fail the logged operation
+                detail = f"<unformattable detail: {e}>"
+        item = (time.time(), user, action, detail)
+        if self._queue is not None:
+            while True:
+                self._check_writer()
+                try:
+                    self._queue.put(item, timeout=PUT_TIMEOUT)
+                    return
+                except queue.Full:
+                    pass
+        with _log_lock:
+            f = self._write(item)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _check_writer(self) -> None:
+        if not self._thread.is_alive():
+            raise RuntimeError(f"Audit log writer stopped: {self._error!r}") from self._error
+
+    def flush(self) -> None:
+        """Block until every entry logged so far is written and flushed to the OS."""
+        if self._queue is not None and self._thread.is_alive():
+            self._queue.join()
+        with _log_lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        if self._queue is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        with _log_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", buffering=64 * 1024)
+            self._opened_at = time.time()
+            fresh = self._file.tell() == 0
+            self._index = {"first": None, "last": None, "count": 0, "users": set(), "actions": set()} if fresh else None
+        return self._file
+
+    def _write(self, item):
+        """Append one entry (caller holds _log_lock), rotating first if the segment is full or old."""
+        f = self._open()
+        if self._should_rotate(f):
+            f = self._rotate()
+        entry = self._entry(item)
+        try:
+            line = json.dumps(entry, default=str) + "\n"
+        except Exception as e:  # a bad detail must not kill the writer
+            entry["detail"] = f"<unformattable detail: {e}>"
+            line = json.dumps(entry) + "\n"
+        f.write(line)
+        index = self._index
+        if index is not None:
+            _index_add(index, entry)
+        return f
+
+    def _should_rotate(self, f) -> bool:
+        if self.max_bytes and f.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and f.tell() > 0 and time.time() - self._opened_at >= self.rotate_interval
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        segment = f"{self.path}.{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.path, segment)
+        index = self._index if self._index is not None else _build_index(segment)
+        with open(segment + ".idx", "w") as f:
+            json.dump(dict(index, users=sorted(index["users"], key=str), actions=sorted(index["actions"])), f)
+        if self.compress:
+            with open(segment, "rb") as src, gzip.open(segment + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(segment)
+        if self.backup_count is not None:
+            rotated = [p for p in audit_segments(self.path) if p != self.path]
+            for old in rotated[:max(0, len(rotated) - self.backup_count)]:
+                os.remove(old)
+                if os.path.exists(_index_path(old)):
+                    os.remove(_index_path(old))
+        return self._open()
+
+    @staticmethod
+    def _entry(item) -> Dict[str, Any]:
+        ts, user, action, detail = item
+        return {
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)),
+            "user": user,
+            "action": action,
+            "detail": detail
+        }
+
+    def _run(self) -> None:
+        try:
+            self._drain()
+        except BaseException as e:  # reported to the next log() call
+            self._error = e
+
+    def _drain(self) -> None:
+        q = self._queue
+        pending = 0
+        deadline = None  # when the oldest unflushed entry must be flushed
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = q.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                q.task_done()
+                return
+            with _log_lock:
+                f = self._open()
+                if item:
+                    f = self._write(item)
+                    pending += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                if pending and (pending >= self.flush_every or time.monotonic() >= deadline):
+                    f.flush()
+                    pending, deadline = 0, None
+            if item:
+                q.task_done()
+
+
+_writer = None
+
+
+def get_audit_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        with _log_lock:
+            if _writer is None:
+                _writer = AuditWriter()
+    return _writer
+
+
+def configure_audit(**options) -> AuditWriter:
+    """
+    Replace the process-wide audit writer, e.g. configure_audit(durability="sync") or
+    configure_audit(skip_detail={"insert", "insert_many"}). Pending entries are flushed first.
+    """
+    global _writer
+    old, _writer = _writer, AuditWriter(**options)
+    if old is not None:
+        old.close()
+    return _writer
+
+
+def flush_audit_log() -> None:
+    if _writer is not None:
+        _writer.flush()
+
+
 def audit_log(user, action, detail=None):
-    entry = {
-        "ts": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
-        "user": user,
-        "action": action,
-        "detail": detail
-    }
-    with _log_lock:
-        with open(_LOG_FILE, "a") as f:
-            f.write(json.dumps(entry) + "\n")
+    get_audit_writer().log(user, action, detail)
+
+
+# -- reading the log: segments oldest to newest, each scanned only if its index allows a match
+
+def _index_path(segment: str) -> str:
+    return (segment[:-3] if segment.endswith(".gz") else segment) + ".idx"
+
+
+def _index_add(index: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    if index["first"] is None:
+        index["first"] = entry["ts"]
+    index["last"] = entry["ts"]
+    index["count"] += 1
+    index["users"].add(entry["user"])
+    index["actions"].add(entry["action"])
+
+
+def _build_index(segment: str) -> Dict[str, Any]:
+    index = {"first": None, "last": None, "count": 0, "users": set(), "actions": set()}
+    for line in _open_segment(segment):
+        try:
+            _index_add(index, json.loads(line))
+        except ValueError:
+            continue
+    return index
+
+
+def _open_segment(segment: str):
+    return gzip.open(segment, "rb") if segment.endswith(".gz") else open(segment, "rb")
+
+
+def audit_segments(path: str = _LOG_FILE) -> List[str]:
+    """Rotated segments oldest first, then the active log file (if it exists)."""
+    rotated = sorted(p for p in glob.glob(glob.escape(path) + ".*") if not p.endswith(".idx"))
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def _reverse_lines(f, block: int = 64 * 1024) -> Iterator[bytes]:
+    """Lines of a seekable binary file, last first, reading fixed-size blocks from the end."""
+    f.seek(0, os.SEEK_END)
+    pos = f.tell()
+    tail = b""
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        lines = (f.read(step) + tail).split(b"\n")
+        tail = lines.pop(0)
+        for line in reversed(lines):
+            if line:
+                yield line
+    if tail:
+        yield tail
+
+
+class AuditFilter:
+    """Entry predicate on user, action and an inclusive [since, until] range of "YYYY-MM-DD[ HH:MM:SS]"."""
+    def __init__(self, user: Optional[str] = None, action: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None):
+        self.user = user
+        self.action = action
+        self.since = since
+        # A bare date as upper bound means the whole day
+        self.until = until + " 23:59:59" if until is not None and len(until) == 10 else until
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        if self.user is not None and entry.get("user") != self.user:
+            return False
+        if self.action is not None and entry.get("action") != self.action:
+            return False
+        ts = entry.get("ts") or ""
+        if self.since is not None and ts < self.since:
+            return False
+        return self.until is None or ts <= self.until
+
+    def may_match(self, index: Dict[str, Any]) -> bool:
+        if not index["count"]:
+            return False
+        if self.user is not None and self.user not in index["users"]:
+            return False
+        if self.action is not None and self.action not in index["actions"]:
+            return False
+        if self.since is not None and index["last"] < self.since:
+            return False
+        return self.until is None or index["first"] <= self.until
+
+
+def read_audit_log(count: Optional[int] = 10, user: Optional[str] = None, action: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   path: str = _LOG_FILE) -> List[Dict[str, Any]]:
+    """
+    The last count matching entries (all if count is None), oldest first. Files are read
+    backwards from the end and rotated segments whose index rules out a match are skipped, so
+    the cost depends on how far back the matches are rather than on the size of the log.
+    """
+    if count is not None and count < 0:
+        raise ValueError(f"Entry count must not be negative, got {count}")
+    if count == 0:
+        return []
+    flt = AuditFilter(user, action, since, until)
+    found: List[Dict[str, Any]] = []
+    for segment in reversed(audit_segments(path)):
+        if segment != path and os.path.exists(_index_path(segment)):
+            with open(_index_path(segment)) as f:
+                if not flt.may_match(json.load(f)):
+                    continue
+        with _open_segment(segment) as f:
+            lines = reversed(f.readlines()) if segment.endswith(".gz") else _reverse_lines(f)
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # partially written last line
+                if flt.matches(entry):
+                    found.append(entry)
+                    if count is not None and len(found) >= count:
+                        return found[::-1]
+    return found[::-1]
+
+
+@atexit.register
+def _close_audit_log():
+    if _writer is not None:
+        _writer.close()
@@ -0,0 +1,108 @@
+"""
+Optional NumPy scan path: evaluates WHERE predicates on int/date columns as boolean masks.
+
+Columnar tables are viewed in place (zero copy); row tables get per-column arrays derived on
+first use and cached until the table's version changes. Without NumPy installed nothing here
+is used and Table falls back to its pure-Python scan.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from .index import Range
+from .storage import ColumnStorage, StrColumn
+
+# Below this many stored rows building masks costs more than the Python loop
+VECTOR_MIN_ROWS = 2048
+
+_NUMERIC_TYPES = ("int", "date")
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _encode(typ: str, value: Any) -> int:
+    return value.toordinal() if typ == "date" else value
+
+
+def _derived_column(table, col: str) -> Tuple[Any, Any]:
+    """
+    (values, nulls) arrays for a row-storage column, cached per table version; (None, None)
+    when a value does not fit in int64 (row storage keeps arbitrary Python ints).
+    """
+    cache = table.__dict__.setdefault("_vector_cache", {})
+    hit = cache.get(col)
+    if hit is not None and hit[0] == table.version:
+        return hit[1], hit[2]
+    typ = table.schema[col]
+    raw = [row.get(col) for row in table.storage.rows]
+    nulls = np.fromiter((v is None for v in raw), dtype=bool, count=len(raw))
+    try:
+        values = np.fromiter((0 if v is None else _encode(typ, v) for v in raw), dtype=np.int64, count=len(raw))
+    except OverflowError:
+        values = nulls = None
+    cache[col] = (table.version, values, nulls)
+    return values, nulls
+
+
+def _column_mask(table, col: str, value: Any) -> Optional[Any]:
+    """Boolean mask of positions where col matches value, or None if not vectorizable."""
+    typ = table.schema.get(col)
+    storage = table.storage
+    if isinstance(storage, ColumnStorage):
+        column = storage.columns[col]
+        nulls = np.frombuffer(column.nulls, dtype=np.uint8).astype(bool)
+        if value is None:
+            return nulls
+        if isinstance(column, StrColumn):
+            if isinstance(value, Range):
+                return None
+            sid = column.pool_ids.get(value)
+            if sid is None:
+                return np.zeros(len(storage), dtype=bool)
+            return (np.frombuffer(column.data, dtype=np.int32) == sid) & ~nulls
+        values = np.frombuffer(column.data, dtype=np.int64)
+    elif typ in _NUMERIC_TYPES:
+        values, nulls = _derived_column(table, col)
+        if values is None:
+            return None
+        if value is None:
+            return nulls.copy()
+    else:
+        return None
+    if isinstance(value, Range):
+        mask = ~nulls
+        if value.low is not None:
+            low = _encode(typ, value.low)
+            mask &= (values >= low) if value.low_inclusive else (values > low)
+        if value.high is not None:
+            high = _encode(typ, value.high)
+            mask &= (values <= high) if value.high_inclusive else (values < high)
+        return mask
+    return (values == _encode(typ, value)) & ~nulls
+
+
+def match_positions(table, filters: Dict[str, Any]) -> Optional[Tuple[List[int], Dict[str, Any]]]:
+    """
+    Evaluate the vectorizable filters as one mask. Returns the matching live positions and the
+    filters still to be checked per row, or None when no filter could be vectorized.
+    """
+    if np is None or len(table.storage) < VECTOR_MIN_ROWS:
+        return None
+    mask = None
+    rest = {}
+    for col, value in filters.items():
+        m = _column_mask(table, col, value) if col in table.schema else None
+        if m is None:
+            rest[col] = value
+            continue
+        mask = m if mask is None else (mask & m)
+    if mask is None:
+        return None
+    if table.deleted_count:
+        mask &= np.frombuffer(table.deleted, dtype=np.uint8) == 0
+    return np.flatnonzero(mask).tolist(), rest
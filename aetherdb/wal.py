@@ -0,0 +1,182 @@
+"""
+Write-ahead log for AetherDB: an append-only file of encrypted (op, args) records.
+
+File layout: MAGIC, the 16-byte scrypt salt, a key check value, then records of
+    length (4 bytes) | LSN (8 bytes) | nonce || AES-GCM ciphertext
+where the ciphertext is a pickled (op, args) tuple authenticated together with its LSN, so
+records cannot be altered or reordered without the password. The key is derived once per file.
+
+Commits use group commit: a writer appends its record, then waits until the file is fsynced
+past its LSN. Whichever waiting writer gets there first runs one fsync covering every record
+written so far, and the others return without syncing themselves.
+"""
+from threading import Condition, Lock
+from typing import Any, Iterator, Optional, Tuple
+import os
+import pickle
+import struct
+import time
+
+from .encryption import NONCE_SIZE, SALT_SIZE, cached_key, decrypt_with_key, encrypt_with_key
+
+MAGIC = b"AETHERWAL1\n"
+_RECORD = struct.Struct(">IQ")
+_CHECK = b"aetherdb-wal"  # encrypted into the header so a wrong password fails up front
+_CHECK_SIZE = NONCE_SIZE + len(_CHECK) + 16  # nonce, ciphertext, GCM tag
+_HEADER_SIZE = len(MAGIC) + SALT_SIZE + _CHECK_SIZE
+
+
+class WALCorruptError(ValueError):
+    pass
+
+
+class WriteAheadLog:
+    def __init__(self, path: str, password: str, fsync: bool = True, commit_delay: float = 0.0):
+        self.path = path
+        self.fsync = fsync
+        self.commit_delay = commit_delay  # seconds a commit leader waits for more writers to join
+        self._lock = Lock()  # appends and file handle
+        self._cond = Condition(Lock())  # group commit state
+        self._syncing = False
+        self.last_lsn = 0
+        self._durable_lsn = 0
+        self.commits = 0
+        self.syncs = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                header = f.read(_HEADER_SIZE)
+            if not header.startswith(MAGIC) or len(header) < _HEADER_SIZE:
+                raise WALCorruptError(f"{path} is not an AetherDB write-ahead log")
+            self.salt = header[len(MAGIC):len(MAGIC) + SALT_SIZE]
+            self.key = cached_key(password, self.salt)
+            try:
+                decrypt_with_key(self.key, header[len(MAGIC) + SALT_SIZE:], MAGIC)
+            except Exception:
+                raise ValueError(f"Wrong password for {path}") from None
+        else:
+            self.salt = os.urandom(SALT_SIZE)
+            self.key = cached_key(password, self.salt)
+            self._write_header(path)
+        self._file = open(path, "ab")
+
+    def _write_header(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(MAGIC + self.salt + encrypt_with_key(self.key, _CHECK, MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @property
+    def size(self) -> int:
+        return self._file.tell()
+
+    def replay(self) -> Iterator[Tuple[int, str, Any]]:
+        """
+        Yield (lsn, op, args) for every record in the file. A bad record with no valid record
+        after it is a torn tail (a crash mid-append) and is cut off; a bad record followed by
+        good ones is corruption and raises WALCorruptError.
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        pos = _HEADER_SIZE
+        end = len(data)
+        while pos < end:
+            record = self._read_record(data, pos)
+            if record is None:
+                found = self._next_record(data, pos + 1)
+                if found is not None:
+                    raise WALCorruptError(f"Corrupt record at byte {pos} of {self.path} "
+                                          f"(valid records follow at byte {found})")
+                break
+            lsn, op, args, pos = record
+            self.last_lsn = self._durable_lsn = lsn
+            yield lsn, op, args
+        if pos < end:
+            with self._lock:
+                self._file.truncate(pos)
+                self._file.seek(pos)
+
+    def _read_record(self, data: bytes, pos: int) -> Optional[Tuple[int, str, Any, int]]:
+        """(lsn, op, args, end offset) of the record at pos, or None if it is cut short or does not decrypt."""
+        if pos + _RECORD.size > len(data):
+            return None
+        length, lsn = _RECORD.unpack_from(data, pos)
+        body_end = pos + _RECORD.size + length
+        if lsn <= self.last_lsn or body_end > len(data):
+            return None
+        try:
+            op, args = pickle.loads(decrypt_with_key(self.key, data[pos + _RECORD.size:body_end],
+                                                     struct.pack(">Q", lsn)))
+        except Exception:
+            return None
+        return lsn, op, args, body_end
+
+    def _next_record(self, data: bytes, start: int) -> Optional[int]:
+        """Offset of the first readable record at or after start, if any."""
+        for pos in range(start, len(data) - _RECORD.size + 1):
+            if self._read_record(data, pos) is not None:
+                return pos
+        return None
+
+    def append(self, op: str, args: Any) -> int:
+        """Write a record (not yet durable) and return its LSN."""
+        with self._lock:
+            lsn = self.last_lsn + 1
+            blob = encrypt_with_key(self.key, pickle.dumps((op, args), pickle.HIGHEST_PROTOCOL),
+                                    struct.pack(">Q", lsn))
+            self._file.write(_RECORD.pack(len(blob), lsn) + blob)
+            self.last_lsn = lsn
+            return lsn
+
+    def commit(self, lsn: int) -> None:
+        """Return once the record at lsn (and every earlier one) is on disk."""
+        with self._cond:
+            self.commits += 1
+            while self._durable_lsn < lsn:
+                if not self._syncing:
+                    self._syncing = True
+                    break
+                self._cond.wait()
+            else:
+                return
+        target = None
+        try:
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            with self._lock:
+                self._file.flush()
+                target = self.last_lsn
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.syncs += 1
+        finally:
+            with self._cond:
+                self._syncing = False
+                if target is not None:
+                    self._durable_lsn = max(self._durable_lsn, target)
+                self._cond.notify_all()
+
+    def log(self, op: str, args: Any) -> int:
+        lsn = self.append(op, args)
+        self.commit(lsn)
+        return lsn
+
+    def reset(self, lsn: Optional[int] = None) -> None:
+        """Start an empty log (after a checkpoint covering every record so far); LSNs continue."""
+        with self._lock:
+            self._file.close()
+            tmp = self.path + ".tmp"
+            self._write_header(tmp)
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "ab")
+            if lsn is not None:
+                self.last_lsn = max(self.last_lsn, lsn)
+        with self._cond:
+            self._durable_lsn = self.last_lsn
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                self._file.close()
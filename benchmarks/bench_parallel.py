@@ -0,0 +1,65 @@
+"""
+Parallel execution: the same filtered scan and aggregations on one columnar table, run
+single-threaded and then with enable_parallel() at 1, 2, 4, ... worker processes up to the
+core count. Each query is run once untimed first so exports and worker start-up are excluded.
+
+Usage: python -m benchmarks.bench_parallel [rows] [max workers]
+"""
+import datetime
+import os
+import sys
+import time
+from aetherdb.db_engine import AetherDB
+
+QUERIES = [
+    ("filtered scan", "SELECT id FROM t WHERE kind = 'kind7' AND amount BETWEEN 100 AND 200"),
+    ("sum, range", "SELECT COUNT(*), SUM(amount), MAX(day) FROM t WHERE day >= '2021-01-01'"),
+    ("group by", "SELECT kind, COUNT(*), AVG(amount), MIN(day) FROM t GROUP BY kind"),
+]
+
+
+def build(n: int) -> AetherDB:
+    db = AetherDB()
+    db.create_table("t", {"id": "int", "kind": "str", "amount": "int", "day": "date"}, "columnar")
+    start = datetime.date(2020, 1, 1)
+    step = 100_000
+    for lo in range(0, n, step):
+        db.insert_many("t", [{"id": i, "kind": f"kind{i % 50}", "amount": (i * 7919) % 1000,
+                              "day": start + datetime.timedelta(days=i % 1500)} for i in range(lo, min(n, lo + step))])
+    return db
+
+
+def timed(db: AetherDB, sql: str, repeat: int = 3) -> float:
+    db.execute_sql(sql)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        db.execute_sql(sql)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    cores = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    db = build(n)
+    print(f"{n} rows, {os.cpu_count()} cores")
+    print(f"{'query':<14} {'serial s':>9}" + "".join(f" {f'{w} proc s':>9} {'x':>5}" for w in counts))
+    results = {label: [timed(db, sql)] for label, sql in QUERIES}
+    for workers in counts:
+        db.enable_parallel(workers=workers, min_rows=0)
+        for label, sql in QUERIES:
+            results[label].append(timed(db, sql))
+        db.disable_parallel()
+    for label, _ in QUERIES:
+        serial, *parallel = results[label]
+        print(f"{label:<14} {serial:>9.3f}" + "".join(f" {t:>9.3f} {serial / t:>5.1f}" for t in parallel))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Parser microbenchmark: pyparsing grammar vs the hand-written parser vs the statement cache,
+plus the import cost of each front-end.
+
+Usage: python -m benchmarks.bench_parser [iterations]
+"""
+import subprocess
+import sys
+import time
+from aetherdb import fast_parser
+from aetherdb.query_parser import parse_sql, sql_to_engine_args
+
+STATEMENTS = [
+    'SELECT id, name FROM users WHERE id = {i}',
+    'SELECT id FROM events WHERE day BETWEEN "2024-01-01" AND "2024-01-{d:02d}", kind = "click"',
+    'INSERT INTO users (id, name, birth) VALUES ({i}, "user{i}", "1990-01-01")',
+    'UPDATE users SET name = "renamed{i}" WHERE id >= {i} AND id < 100000',
+    'DELETE FROM users WHERE name = "user{i}"',
+]
+
+
+def per_statement(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        for tpl in STATEMENTS:
+            fn(tpl.format(i=i, d=1 + i % 28))
+    return (time.perf_counter() - start) / (n * len(STATEMENTS)) * 1e6
+
+
+def import_time(module):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return float(subprocess.check_output([sys.executable, "-c", code])) * 1e3
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    print(f"{'path':<28} {'us/stmt':>8}")
+    print(f"{'pyparsing grammar':<28} {per_statement(lambda s: sql_to_engine_args(parse_sql(s)), n):>8.1f}")
+    print(f"{'hand-written parser':<28} {per_statement(lambda s: sql_to_engine_args(fast_parser.parse(s)), n):>8.1f}")
+    print(f"{'statement cache':<28} {per_statement(sql_to_engine_args, n):>8.1f}")
+    print()
+    print(f"{'import':<28} {'ms':>8}")
+    for module in ("aetherdb.sql_grammar", "aetherdb.query_parser"):
+        print(f"{module:<28} {import_time(module):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
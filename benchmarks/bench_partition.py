@@ -0,0 +1,68 @@
+"""
+Partition pruning: queries on one day or one week of an event table spanning four years, on a
+flat table and on the same rows PARTITION BY RANGE (day) with one partition per month; then
+removing the oldest month with DELETE (flat) versus ALTER TABLE ... DROP PARTITION.
+
+Usage: python -m benchmarks.bench_partition [rows] [row|columnar]
+"""
+import datetime
+import sys
+import time
+from aetherdb.db_engine import AetherDB
+
+DAYS = 4 * 365
+START = datetime.date(2020, 1, 1)
+QUERIES = [
+    ("one day", "SELECT * FROM ev WHERE day = '2022-03-15'"),
+    ("one week, count", "SELECT kind, COUNT(*) FROM ev WHERE day BETWEEN '2022-03-14' AND '2022-03-20' GROUP BY kind"),
+]
+
+
+def months():
+    first = START
+    while first < START + datetime.timedelta(days=DAYS):
+        nxt = datetime.date(first.year + first.month // 12, first.month % 12 + 1, 1)
+        yield f"p{first:%Y%m}", nxt
+        first = nxt
+
+
+def build(n: int, storage: str, partitioned: bool) -> AetherDB:
+    db = AetherDB()
+    sql = f"CREATE TABLE ev (id INT, kind STR, day DATE) USING {storage.upper()}"
+    if partitioned:
+        parts = ", ".join(f"PARTITION {name} VALUES LESS THAN ('{end}')" for name, end in months())
+        sql += f" PARTITION BY RANGE (day) ({parts})"
+    db.execute_sql(sql)
+    step = 100_000
+    for lo in range(0, n, step):
+        db.insert_many("ev", [{"id": i, "kind": f"k{i % 20}", "day": START + datetime.timedelta(days=i * DAYS // n)}
+                              for i in range(lo, min(n, lo + step))])
+    return db
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    storage = sys.argv[2] if len(sys.argv) > 2 else "row"
+    flat, parted = build(n, storage, False), build(n, storage, True)
+    print(f"{n} rows, {storage} storage, {len(parted.tables['ev'].partitions)} monthly partitions")
+    print(f"{'operation':<16} {'flat s':>8} {'partitioned s':>14}")
+    for label, sql in QUERIES:
+        times = [timed(lambda: db.execute_sql(sql)) for db in (flat, parted)]
+        print(f"{label:<16} {times[0]:>8.4f} {times[1]:>14.4f}")
+    first, end = next(months())
+    t_delete = timed(lambda: flat.execute_sql(f"DELETE FROM ev WHERE day < '{end}'"), repeat=1)
+    t_drop = timed(lambda: parted.execute_sql(f"ALTER TABLE ev DROP PARTITION {first}"), repeat=1)
+    print(f"{'drop a month':<16} {t_delete:>8.4f} {t_drop:>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Encrypted snapshot comparison: pickled tables (the previous format) against the binary
+snapshot with lazily decoded tables. Reports file size, save and full load time, and
+time-to-first-query (load, then one indexed lookup on a single table).
+
+Usage: python -m benchmarks.bench_snapshot [rows per table] [tables]
+"""
+import datetime
+import os
+import pickle
+import sys
+import tempfile
+import time
+from aetherdb.db_engine import AetherDB
+from aetherdb.encryption import EncryptedWriter
+
+PASSWORD = "bench"
+
+
+def build(n: int, tables: int) -> AetherDB:
+    db = AetherDB()
+    start = datetime.date(2020, 1, 1)
+    for k in range(tables):
+        name = f"t{k}"
+        db.create_table(name, {"id": "int", "kind": "str", "day": "date"}, "columnar" if k % 2 else "row")
+        db.insert_many(name, [{"id": i, "kind": f"kind{i % 50}", "day": start + datetime.timedelta(days=i % 1500)}
+                              for i in range(n)])
+        db.create_index(name, f"{name}_id", ["id"])
+    return db
+
+
+def save_pickle(db: AetherDB, path: str) -> None:
+    with open(path, "wb") as f, EncryptedWriter(f, PASSWORD) as enc:
+        pickle.dump(db.tables, enc, pickle.HIGHEST_PROTOCOL)
+
+
+def save_binary(compression):
+    return lambda db, path: db.save_encrypted(path, PASSWORD, compression=compression)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tables = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    db = build(n, tables)
+    print(f"{tables} tables x {n} rows")
+    print(f"{'format':<14} {'MiB':>8} {'save s':>8} {'load all s':>11} {'first query s':>14}")
+    with tempfile.TemporaryDirectory() as d:
+        for label, save in (("pickle", save_pickle), ("binary zlib", save_binary("zlib")),
+                            ("binary lzma", save_binary("lzma")), ("binary raw", save_binary(None))):
+            path = os.path.join(d, label.replace(" ", "_"))
+            t0 = time.perf_counter()
+            save(db, path)
+            t1 = time.perf_counter()
+            loaded = AetherDB.load_encrypted(path, PASSWORD)
+            for name in list(loaded.tables):
+                loaded.tables[name]  # decode every table
+            t2 = time.perf_counter()
+            loaded = AetherDB.load_encrypted(path, PASSWORD)
+            loaded.select("t0", {"id": n // 2})
+            t3 = time.perf_counter()
+            size = os.path.getsize(path)
+            print(f"{label:<14} {size / 2**20:>8.1f} {t1 - t0:>8.2f} {t2 - t1:>11.2f} {t3 - t2:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
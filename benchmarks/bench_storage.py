@@ -0,0 +1,34 @@
+"""
+Memory and scan-time comparison of the row-dict and columnar table layouts.
+
+Usage: python -m benchmarks.bench_storage [rows]
+"""
+import sys
+import time
+import datetime
+from aetherdb.db_engine import Table
+
+
+def build(storage: str, n: int) -> Table:
+    t = Table("bench", {"id": "int", "kind": "str", "day": "date"}, storage=storage)
+    start = datetime.date(2020, 1, 1)
+    for i in range(n):
+        t.insert({"id": i, "kind": f"kind{i % 50}", "day": start + datetime.timedelta(days=i % 1500)})
+    return t
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{'layout':<10} {'rows':>9} {'MiB':>8} {'B/row':>7} {'insert s':>9} {'scan s':>8}")
+    for storage in ("row", "columnar"):
+        t0 = time.perf_counter()
+        t = build(storage, n)
+        t1 = time.perf_counter()
+        t.select({"kind": "kind7"})
+        t2 = time.perf_counter()
+        mem = t.memory_usage()
+        print(f"{storage:<10} {n:>9} {mem / 2**20:>8.1f} {mem / n:>7.0f} {t1 - t0:>9.2f} {t2 - t1:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# Keep the audit log of test runs out of the working directory
+import atexit
+import os
+import shutil
+import tempfile
+
+from aetherdb.utils import configure_audit
+
+_audit_dir = tempfile.mkdtemp(prefix="aetherdb-test-audit-")
+configure_audit(path=os.path.join(_audit_dir, "aetherdb_audit.log"))
+atexit.register(shutil.rmtree, _audit_dir, True)
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import unittest
+from aetherdb.utils import AuditWriter, audit_segments, read_audit_log
+
+class TestAuditWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "audit.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _entries(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_batched_flush(self):
+        w = AuditWriter(self.path, durability="batched", flush_every=1000, flush_interval=60)
+        for i in range(50):
+            w.log("alice", "insert", f"row {i}")
+        w.flush()
+        entries = self._entries()
+        self.assertEqual(len(entries), 50)
+        self.assertEqual(entries[-1]["detail"], "row 49")
+        w.close()
+
+    def test_sync_writes_immediately(self):
+        w = AuditWriter(self.path, durability="sync")
+        w.log("alice", "login", "ok")
+        self.assertEqual(self._entries()[0]["action"], "login")
+        w.close()
+
+    def test_off_discards(self):
+        w = AuditWriter(self.path, durability="off")
+        w.log("alice", "login", "ok")
+        w.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_lazy_and_skipped_detail(self):
+        calls = []
+        w = AuditWriter(self.path, durability="sync", skip_detail={"insert"})
+        w.log("bob", "insert", lambda: calls.append("insert") or "expensive")
+        w.log("bob", "update", lambda: calls.append("update") or "cheap enough")
+        w.close()
+        self.assertEqual(calls, ["update"])
+        self.assertEqual([e["detail"] for e in self._entries()], [None, "cheap enough"])
+
+    def test_bad_detail_does_not_stop_writer(self):
+        w = AuditWriter(self.path)
+        w.log("bob", "insert", lambda: 1 / 0)
+        w.log("bob", "insert", "fine")
+        w.close()
+        entries = self._entries()
+        self.assertIn("unformattable", entries[0]["detail"])
+        self.assertEqual(entries[1]["detail"], "fine")
+
+    def test_detail_formatted_when_logged(self):
+        row = {"id": 1}
+        w = AuditWriter(self.path, flush_interval=60)
+        w.log("bob", "insert", lambda: f"row {row}")
+        row["id"] = 2  # changed before the writer thread gets to the entry
+        w.close()
+        self.assertEqual(self._entries()[0]["detail"], "row {'id': 1}")
+
+    def test_dead_writer_is_reported(self):
+        w = AuditWriter(os.path.join(self.path, "missing", "audit.log"), queue_size=1)
+        w.log("bob", "login", "ok")  # the thread dies opening the file
+        w._thread.join(5)
+        with self.assertRaises(RuntimeError):
+            w.log("bob", "login", "again")
+        w.close()
+
+    def test_size_rotation_with_index_and_gzip(self):
+        w = AuditWriter(self.path, durability="sync", max_bytes=2000, compress=True, backup_count=3)
+        for i in range(200):
+            w.log("alice" if i < 150 else "bob", "insert" if i % 2 else "select", f"row {i}")
+        w.close()
+        segments = audit_segments(self.path)
+        self.assertEqual(len(segments), 4)  # 3 kept backups plus the active file
+        self.assertTrue(all(s.endswith(".gz") for s in segments[:-1]))
+        for seg in segments[:-1]:
+            self.assertTrue(os.path.exists(seg[:-3] + ".idx"))
+        last = read_audit_log(3, path=self.path)
+        self.assertEqual([e["detail"] for e in last], ["row 197", "row 198", "row 199"])
+        alice = read_audit_log(2, user="alice", action="insert", path=self.path)
+        self.assertEqual([e["detail"] for e in alice], ["row 147", "row 149"])
+        self.assertEqual(read_audit_log(None, user="carol", path=self.path), [])
+        self.assertEqual(read_audit_log(5, since="2999-01-01", path=self.path), [])
+        self.assertEqual(read_audit_log(0, path=self.path), [])
+        with self.assertRaises(ValueError):
+            read_audit_log(-1, path=self.path)
+
+    def test_time_rotation(self):
+        w = AuditWriter(self.path, durability="sync", max_bytes=None, rotate_interval=0.01)
+        w.log("alice", "login", "1")
+        w._opened_at -= 1
+        w.log("alice", "login", "2")
+        w.close()
+        self.assertEqual(len(audit_segments(self.path)), 2)
+        self.assertEqual([e["detail"] for e in read_audit_log(None, path=self.path)], ["1", "2"])
+
+    def test_reverse_read_of_large_file(self):
+        w = AuditWriter(self.path, max_bytes=None)
+        for i in range(5000):
+            w.log("u", "insert", "x" * (i % 50))
+        w.close()
+        entries = read_audit_log(10, path=self.path)
+        self.assertEqual(len(entries), 10)
+        self.assertEqual(entries[-1]["detail"], "x" * (4999 % 50))
+
+    def test_invalid_durability(self):
+        with self.assertRaises(ValueError):
+            AuditWriter(self.path, durability="sometimes")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import base64
+import time
+import unittest
+from passlib.hash import bcrypt
+from aetherdb.auth import AuthManager
+from aetherdb.db_engine import AetherDB
+
+try:
+    bcrypt.hash("probe")
+    HAVE_BCRYPT = True
+except Exception:  # passlib cannot drive the installed bcrypt release
+    HAVE_BCRYPT = False
+
+
+class TestSessionTokens(unittest.TestCase):
+    def setUp(self):
+        self.auth = AuthManager(token_ttl=60)
+        self.auth.add_user("alice", "", password_optional=True)
+
+    def test_session_tokens(self):
+        token = self.auth.issue_token("alice")
+        self.assertEqual(self.auth.verify_token(token), "alice")
+        payload, sig = token.split(".")
+        forged = bytearray(base64.urlsafe_b64decode(sig + "=" * (-len(sig) % 4)))
+        forged[0] ^= 1
+        forged_sig = base64.urlsafe_b64encode(bytes(forged)).rstrip(b"=").decode()
+        self.assertIsNone(self.auth.verify_token(payload + "." + forged_sig))
+        self.assertIsNone(self.auth.verify_token("garbage"))
+        self.assertIsNone(AuthManager().verify_token(token))  # other secret
+        self.auth.revoke_tokens("alice")
+        self.assertIsNone(self.auth.verify_token(token))
+        self.auth.token_ttl = 0.01
+        token = self.auth.issue_token("alice")
+        time.sleep(0.02)
+        self.assertIsNone(self.auth.verify_token(token))
+
+    def test_engine_login_token(self):
+        db = AetherDB()
+        db.auth.add_user("bob", "", password_optional=True)
+        self.assertTrue(db.login("bob", ""))
+        token = db.session_token
+        db.login("aether", "")
+        self.assertEqual(db.current_user, "aether")
+        self.assertTrue(db.login_token(token))
+        self.assertEqual(db.current_user, "bob")
+        self.assertFalse(db.login_token(token + "x"))
+
+
+@unittest.skipUnless(HAVE_BCRYPT, "bcrypt backend unavailable")
+class TestPasswordHashing(unittest.TestCase):
+    def setUp(self):
+        self.auth = AuthManager(token_ttl=60)
+        self.auth.add_user("alice", "secret")
+
+    def test_password_change_revokes_tokens(self):
+        token = self.auth.issue_token("alice")
+        self.auth.change_password("alice", "new")
+        self.assertIsNone(self.auth.verify_token(token))
+        self.assertTrue(self.auth.authenticate("alice", "new"))
+
+    def test_authenticate_on_pool(self):
+        self.assertTrue(self.auth.authenticate("alice", "secret"))
+        self.assertFalse(self.auth.authenticate("alice", "wrong"))
+        self.assertFalse(self.auth.authenticate("nobody", "secret"))
+        futures = [self.auth.authenticate_async("alice", pw) for pw in ("secret", "nope", "secret")]
+        self.assertEqual([f.result() for f in futures], [True, False, True])
+
+    def test_add_users_in_bulk(self):
+        names = self.auth.add_users([("u1", "p1", "user"), ("u2", "p2", "readonly"), ("u3", "p3", "user")])
+        self.assertEqual(names, ["u1", "u2", "u3"])
+        self.assertTrue(self.auth.authenticate("u2", "p2"))
+        self.assertEqual(self.auth.get_user("u2").role, "readonly")
+        with self.assertRaises(ValueError):
+            self.auth.add_users([("u4", "p", "user"), ("alice", "p", "user")])
+        with self.assertRaises(ValueError):
+            self.auth.add_users([("u5", "p", "user"), ("u5", "q", "user")])
+        self.assertNotIn("u4", self.auth.users)
+
+
+if __name__ == "__main__":
+    unittest.main()
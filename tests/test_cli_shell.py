@@ -1,7 +1,13 @@
 import unittest
 from click.testing import CliRunner
 from aetherdb.cli.main import cli
+from aetherdb.cli import render, shell
+from aetherdb.db_engine import ResultStream
+import contextlib
+import io
+import json
 import os
+from unittest import mock
 
 def test_script_file():
     script = "test_query_script.sql"
@@ -35,5 +41,29 @@ class TestCliShell(unittest.TestCase):
         self.assertIn("Installed ext1", result.output)
     def test_script(self):
         test_script_file()
+class TestStreamRendering(unittest.TestCase):
+    ROWS = [{"id": 1, "name": "ab", "x": 1.5}, {"id": 22, "name": "a much longer name", "x": 10.25},
+            {"id": 3, "name": None, "x": None}]
+
+    def render(self, fmt, rows=None):
+        out = io.StringIO()
+        with mock.patch.object(render, "RENDER_BATCH", 1), contextlib.redirect_stdout(out):
+            shell._render_stream(ResultStream(["id", "name", "x"], self.ROWS if rows is None else rows), fmt)
+        return out.getvalue()
+
+    def test_table_widens_columns_instead_of_cutting(self):
+        self.assertEqual(self.render("table").splitlines(), [
+            "  id  name      x",
+            "----  ------  ---",
+            "   1  ab      1.5",
+            "  22  a much longer name  10.25",
+            "   3",
+        ])
+
+    def test_json_is_one_array(self):
+        self.assertEqual(json.loads(self.render("json")), self.ROWS)
+        self.assertEqual(json.loads(self.render("json", [])), [])
+        self.assertEqual([json.loads(line) for line in self.render("ndjson").splitlines()], self.ROWS)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,203 @@
+import random
+import threading
+import time
+import unittest
+from aetherdb.db_engine import AetherDB
+from aetherdb.index import Range
+from aetherdb.locks import RWLock
+
+THREADS = 8
+OPS = 150
+
+
+class TestSessions(unittest.TestCase):
+    def setUp(self):
+        self.db = AetherDB()
+        self.db.auth.add_user("bob", "", password_optional=True)
+
+    def test_user_is_per_thread(self):
+        seen = {}
+
+        def worker():
+            seen["before"] = self.db.current_user
+            with self.db.session("bob"):
+                seen["inside"] = self.db.current_user
+            seen["after"] = self.db.current_user
+        th = threading.Thread(target=worker)
+        th.start()
+        th.join()
+        self.assertEqual(seen, {"before": None, "inside": "bob", "after": None})
+        self.assertEqual(self.db.current_user, "aether")
+        with self.assertRaises(ValueError):
+            with self.db.session("nobody"):
+                pass
+
+    def test_submit_sql_runs_as_caller(self):
+        self.db.execute_sql('CREATE TABLE t (id INT)')
+        futures = [self.db.submit_sql('INSERT INTO t (id) VALUES (?)', (i,)) for i in range(50)]
+        for f in futures:
+            f.result()
+        self.assertEqual(len(self.db.submit_sql('SELECT id FROM t').result()), 50)
+        with self.db.session("bob"):
+            denied = self.db.submit_sql('SELECT id FROM t')
+        with self.assertRaises(PermissionError):
+            denied.result()
+        self.db.close()
+
+
+class TestRWLock(unittest.TestCase):
+    def test_readers_share_writers_exclude(self):
+        lock = RWLock()
+        state = {"readers": 0, "max_readers": 0, "writer": False, "bad": False}
+        guard = threading.Lock()
+        barrier = threading.Barrier(4)
+
+        def reader():
+            barrier.wait()
+            for _ in range(200):
+                with lock.read():
+                    with guard:
+                        state["readers"] += 1
+                        state["max_readers"] = max(state["max_readers"], state["readers"])
+                        state["bad"] |= state["writer"]
+                    with guard:
+                        state["readers"] -= 1
+
+        def writer():
+            barrier.wait()
+            for _ in range(200):
+                with lock.write():
+                    with guard:
+                        state["bad"] |= state["writer"] or state["readers"] > 0
+                        state["writer"] = True
+                    with guard:
+                        state["writer"] = False
+        threads = [threading.Thread(target=f) for f in (reader, reader, reader, writer)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertFalse(state["bad"])
+
+
+class TestStress(unittest.TestCase):
+    """Mixed reads and writes from many threads sharing one engine."""
+    def test_streams_only_return_matching_rows(self):
+        db = AetherDB()
+        db.execute_sql('CREATE TABLE r (id INT, flag INT)')
+        db.execute_sql('CREATE INDEX r_flag ON r (flag)')
+        db.execute_sql('CREATE TABLE c (id INT, flag INT) USING COLUMNAR')
+        for name in ("r", "c"):
+            db.insert_many(name, [{"id": i, "flag": i % 2} for i in range(3000)])
+        done = threading.Event()
+        bad = []
+
+        def writer():
+            flip = 0
+            try:
+                with db.session("aether"):
+                    while not done.is_set():
+                        for name in ("r", "c"):
+                            db.update(name, {"id": Range(flip * 500, flip * 500 + 499)}, {"flag": flip % 2})
+                        flip = (flip + 1) % 6
+            except Exception as e:
+                bad.append(repr(e))
+
+        def check(rows, col):
+            for i, row in enumerate(rows):
+                if row[col] != 1:
+                    bad.append(row)
+                if i % 200 == 0:
+                    time.sleep(0.001)  # let the writer in between batches
+
+        def reader():
+            try:
+                with db.session("aether"):
+                    for _ in range(5):
+                        for name in ("r", "c"):
+                            check(db.iter_select(name, {"flag": 1}), "flag")
+                        check(db.execute_sql('SELECT r.id, c.flag FROM r JOIN c ON r.id = c.id WHERE c.flag = 1',
+                                             stream=True), "c.flag")
+            except Exception as e:
+                bad.append(repr(e))
+
+        th = threading.Thread(target=writer)
+        th.start()
+        readers = [threading.Thread(target=reader) for _ in range(3)]
+        for r in readers:
+            r.start()
+        for r in readers:
+            r.join()
+        done.set()
+        th.join()
+        self.assertEqual(bad, [])
+
+    def test_mixed_workload(self):
+        db = AetherDB()
+        db.execute_sql('CREATE TABLE a (id INT, owner STR, n INT)')
+        db.execute_sql('CREATE TABLE b (id INT, label STR) USING COLUMNAR')
+        db.execute_sql('CREATE INDEX a_id ON a (id)')
+        db.enable_result_cache()
+        users = [f"u{k}" for k in range(THREADS)]
+        for user in users:
+            db.auth.add_user(user, "", password_optional=True)
+            db.grant("a", user, "write")
+            db.grant("a", user, "read")
+            db.grant("b", user, "write")
+            db.grant("b", user, "read")
+        db.insert_many("b", [{"id": i, "label": f"l{i % 5}"} for i in range(200)])
+        errors = []
+        expected = {}
+
+        def worker(k):
+            rnd = random.Random(k)
+            mine = []
+            try:
+                with db.session(users[k]):
+                    for i in range(OPS):
+                        rid = k * 100_000 + i
+                        db.insert("a", {"id": rid, "owner": users[k], "n": i})
+                        mine.append(rid)
+                        op = rnd.random()
+                        if op < 0.2:
+                            db.update("a", {"id": rid}, {"n": -i})
+                        elif op < 0.35:
+                            victim = mine.pop(rnd.randrange(len(mine)))
+                            self.assertEqual(db.delete("a", {"id": victim}), 1)
+                        elif op < 0.5:
+                            rows = db.select("a", {"owner": users[k]}, ["id"])
+                            self.assertEqual(sorted(r["id"] for r in rows), sorted(mine))
+                        elif op < 0.6:
+                            stream = db.iter_select("a")
+                            for _, row in zip(range(20), stream):
+                                self.assertEqual(set(row), {"id", "owner", "n"})
+                        elif op < 0.7:
+                            db.execute_sql('SELECT COUNT(*), SUM(n) FROM a WHERE owner = ?', (users[k],))
+                        elif op < 0.8:
+                            db.execute_sql('SELECT a.id, b.label FROM a JOIN b ON a.n = b.id WHERE a.owner = ?',
+                                           (users[k],))
+                        elif op < 0.85:
+                            db.insert("b", {"id": 1000 + rid, "label": "x"})
+                        self.assertEqual(db.current_user, users[k])
+                expected[users[k]] = mine
+            except Exception as e:  # surfaced below with the thread that failed
+                errors.append((users[k], repr(e)))
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(THREADS)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(errors, [])
+        table = db.tables["a"]
+        self.assertEqual(len(table), sum(len(ids) for ids in expected.values()))
+        for user, ids in expected.items():
+            got = db.select("a", {"owner": user}, ["id"])
+            self.assertEqual(sorted(r["id"] for r in got), sorted(ids))
+            for rid in ids[:10]:
+                self.assertEqual(len(db.select("a", {"id": rid})), 1)  # index agrees with the rows
+        self.assertEqual(db.select("a", {"id": -1}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
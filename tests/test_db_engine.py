@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
 from aetherdb.db_engine import AetherDB
+from aetherdb.index import Range
+from aetherdb import vectorized
 from datetime import date
 
 class TestAetherDBEngine(unittest.TestCase):
@@ -44,5 +48,295 @@ class TestAetherDBEngine(unittest.TestCase):
         self.db.execute_sql('DELETE FROM people WHERE n = "T2"')
         self.assertEqual(len(self.db.execute_sql('SELECT id, n FROM people')), 0)
 
+    def test_select_projection(self):
+        self.db.insert("users", {"id": 1, "name": "Alice", "birth": "1990-02-02"})
+        self.assertEqual(self.db.execute_sql('SELECT name FROM users WHERE id = 1'), [{"name": "Alice"}])
+        self.assertEqual(self.db.select("users", {"id": 1}, ["birth", "id"]), [{"birth": date(1990, 2, 2), "id": 1}])
+        self.assertEqual(list(self.db.execute_sql('SELECT * FROM users')[0]), ["id", "name", "birth"])
+        self.assertEqual(self.db.execute_sql('SELECT id FROM users', stream=True).columns, ["id"])
+        with self.assertRaises(ValueError):
+            self.db.execute_sql('SELECT nope FROM users')
+        # Projected rows are fresh dicts, never the stored row
+        self.db.select("users", None, ["name"])[0]["name"] = "changed"
+        self.assertEqual(self.db.select("users")[0]["name"], "Alice")
+
+    def test_aggregates(self):
+        for i in range(10):
+            self.db.insert("users", {"id": i, "name": f"u{i % 3}", "birth": f"199{i}-01-01"})
+        self.db.alter_table_add_column("users", "score", "int")
+        self.db.update("users", {"id": Range(high=3)}, {"score": 7})
+        out = self.db.execute_sql('SELECT COUNT(*), COUNT(score), SUM(id), AVG(score), MIN(birth), MAX(id) FROM users')
+        self.assertEqual(out, [{"COUNT(*)": 10, "COUNT(score)": 4, "SUM(id)": 45, "AVG(score)": 7.0,
+                                "MIN(birth)": date(1990, 1, 1), "MAX(id)": 9}])
+        out = self.db.execute_sql('SELECT name, COUNT(*) FROM users WHERE id >= 2 GROUP BY name HAVING COUNT(*) > 2')
+        self.assertEqual(sorted(r["name"] for r in out), ["u0", "u2"])
+        self.assertEqual(list(out[0]), ["name", "COUNT(*)"])
+        # HAVING may use an aggregate that is not selected
+        out = self.db.execute_sql('SELECT name FROM users GROUP BY name HAVING SUM(id) = 18')
+        self.assertEqual(out, [{"name": "u0"}])
+        self.assertEqual(self.db.execute_sql('SELECT COUNT(*), MAX(id) FROM users WHERE id > 100'),
+                         [{"COUNT(*)": 0, "MAX(id)": None}])
+        for bad in ('SELECT id, COUNT(*) FROM users GROUP BY name', 'SELECT SUM(name) FROM users',
+                    'SELECT SUM(*) FROM users', 'SELECT * FROM users GROUP BY name'):
+            with self.assertRaises(ValueError, msg=bad):
+                self.db.execute_sql(bad)
+
+    def test_count_uses_index(self):
+        for i in range(30):
+            self.db.insert("users", {"id": i, "name": f"u{i % 3}", "birth": "1990-01-01"})
+        self.db.create_index("users", "users_name", ["name"])
+        self.db.delete("users", {"id": 0})
+        t = self.db.tables["users"]
+        t.scan = None  # an index-only count must not scan rows
+        self.assertEqual(self.db.execute_sql('SELECT COUNT(*) FROM users WHERE name = "u0"'), [{"COUNT(*)": 9}])
+
+    def test_join(self):
+        self.db.execute_sql('CREATE TABLE orders (oid INT, uid INT, total INT)')
+        for i in range(6):
+            self.db.insert("users", {"id": i, "name": f"u{i}", "birth": "1990-01-01"})
+        for o in range(12):
+            self.db.insert("orders", {"oid": o, "uid": o % 4, "total": o * 10})
+        sql = 'SELECT orders.oid, users.name FROM orders JOIN users ON orders.uid = users.id WHERE total >= 60'
+        expected = [{"orders.oid": o, "users.name": f"u{o % 4}"} for o in range(6, 12)]
+        out = self.db.execute_sql(sql)
+        self.assertEqual(sorted(out, key=lambda r: r["orders.oid"]), expected)
+        # Same result when the join key is indexed on either side
+        self.db.create_index("users", "users_id", ["id"])
+        self.assertEqual(sorted(self.db.execute_sql(sql), key=lambda r: r["orders.oid"]), expected)
+        self.db.create_index("orders", "orders_uid", ["uid"], kind="btree")
+        self.db.delete("orders", {"oid": 6})
+        self.assertEqual(sorted(self.db.execute_sql(sql), key=lambda r: r["orders.oid"]), expected[1:])
+        star = self.db.execute_sql('SELECT * FROM users JOIN orders ON id = uid WHERE users.id = 1')
+        self.assertEqual(len(star), 3)
+        self.assertEqual(list(star[0]), ["users.id", "users.name", "users.birth", "orders.oid", "orders.uid", "orders.total"])
+        with self.assertRaises(ValueError):
+            self.db.execute_sql('SELECT oid FROM orders JOIN users ON uid = name')
+        with self.assertRaises(ValueError):
+            self.db.execute_sql('SELECT nope.x FROM orders JOIN users ON uid = id')
+
+    def test_join_checks_both_tables(self):
+        self.db.execute_sql('CREATE TABLE orders (oid INT, uid INT)')
+        self.db.tables["users"].permissions.clear()
+        with self.assertRaises(PermissionError):
+            self.db.execute_sql('SELECT oid FROM orders JOIN users ON uid = id')
+
+    def test_result_cache(self):
+        self.db.enable_result_cache(max_entries=2)
+        for i in range(5):
+            self.db.insert("users", {"id": i, "name": f"u{i}", "birth": "1990-01-01"})
+        first = self.db.execute_sql('SELECT id, name FROM users WHERE id >= 2')
+        self.assertEqual(self.db.execute_sql('SELECT id, name FROM users WHERE id >= 2'), first)
+        self.assertEqual(self.db.select("users", {"id": Range(low=2)}, ["id", "name"]), first)
+        info = self.db.result_cache_info()
+        self.assertEqual((info["hits"], info["misses"]), (2, 1))
+        # Hits hand out copies
+        first[0]["name"] = "mutated"
+        self.assertNotEqual(self.db.execute_sql('SELECT id, name FROM users WHERE id >= 2')[0]["name"], "mutated")
+        # Any write invalidates
+        self.db.update("users", {"id": 2}, {"name": "two"})
+        self.assertEqual(self.db.execute_sql('SELECT name FROM users WHERE id = 2'), [{"name": "two"}])
+        self.db.execute_sql('ALTER TABLE users ADD COLUMN score INT')
+        self.assertEqual(list(self.db.execute_sql('SELECT * FROM users WHERE id = 2')[0]), ["id", "name", "birth", "score"])
+        self.assertEqual(self.db.execute_sql('SELECT COUNT(*) FROM users'), [{"COUNT(*)": 5}])
+        self.db.delete("users", {"id": 0})
+        self.assertEqual(self.db.execute_sql('SELECT COUNT(*) FROM users'), [{"COUNT(*)": 4}])
+        self.assertLessEqual(self.db.result_cache_info()["entries"], 2)
+        self.assertGreater(self.db.result_cache_info()["evictions"], 0)
+        # Permissions are still checked on a hit
+        self.db.tables["users"].permissions.clear()
+        with self.assertRaises(PermissionError):
+            self.db.execute_sql('SELECT COUNT(*) FROM users')
+
+    def test_hash_index_lookup_and_maintenance(self):
+        for i in range(20):
+            self.db.insert("users", {"id": i, "name": f"u{i % 4}", "birth": "1990-01-01"})
+        self.db.execute_sql('CREATE INDEX users_name ON users (name)')
+        self.db.create_index("users", "users_id_name", ["id", "name"])
+        t = self.db.tables["users"]
+        self.assertEqual(t._pick_index({"id": 5, "name": "u1"}).name, "users_id_name")
+        self.assertEqual(len(self.db.select("users", {"name": "u1"})), 5)
+        self.db.update("users", {"id": 5}, {"name": "renamed"})
+        self.assertEqual(len(self.db.select("users", {"name": "u1"})), 4)
+        self.assertEqual(self.db.select("users", {"id": 5, "name": "renamed"})[0]["id"], 5)
+        self.db.delete("users", {"name": "u2"})
+        self.assertEqual(len(self.db.select("users", {"name": "u3"})), 5)
+        self.assertEqual(self.db.execute_sql('SELECT id FROM users WHERE name = "u3", id = 7')[0]["id"], 7)
+        self.db.alter_table_add_column("users", "email", "str")
+        self.assertEqual(len(self.db.select("users", {"name": "u3"})), 5)
+
+    def test_indexes_survive_encrypted_roundtrip(self):
+        self.db.insert("users", {"id": 1, "name": "Alice", "birth": "1990-02-02"})
+        self.db.create_index("users", "users_name", ["name"])
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.db.save_encrypted(path, "pw")
+            db2 = AetherDB.load_encrypted(path, "pw")
+        finally:
+            os.remove(path)
+        self.assertIn("users_name", db2.tables["users"].indexes)
+        self.assertEqual(db2.tables["users"].select({"name": "Alice"})[0]["id"], 1)
+
+    def test_ordered_index_range_predicates(self):
+        for i in range(1, 31):
+            self.db.insert("users", {"id": i, "name": f"u{i}", "birth": f"2024-01-{i:02d}"})
+        sql = 'SELECT id FROM users WHERE birth BETWEEN "2024-01-10" AND "2024-01-12"'
+        unindexed = self.db.execute_sql(sql)
+        self.db.execute_sql('CREATE INDEX users_birth ON users USING BTREE (birth)')
+        self.db.create_index("users", "users_id", ["id"], kind="btree")
+        self.assertEqual(self.db.execute_sql(sql), unindexed)
+        self.assertEqual([r["id"] for r in unindexed], [10, 11, 12])
+        out = self.db.execute_sql('SELECT id FROM users WHERE id > 25 AND id <= 28')
+        self.assertEqual([r["id"] for r in out], [26, 27, 28])
+        self.db.execute_sql('DELETE FROM users WHERE birth < "2024-01-05"')
+        self.assertEqual(len(self.db.execute_sql('SELECT id FROM users WHERE id < 10')), 5)
+        self.db.execute_sql('UPDATE users SET birth = "2023-12-31" WHERE id >= 29')
+        self.assertEqual(len(self.db.execute_sql('SELECT id FROM users WHERE birth < "2024-01-01"')), 2)
+
+    def test_tombstone_delete_and_vacuum(self):
+        self.db.create_index("users", "users_id", ["id"])
+        for i in range(10):
+            self.db.insert("users", {"id": i, "name": f"u{i}", "birth": "1990-01-01"})
+        t = self.db.tables["users"]
+        self.assertEqual(self.db.delete("users", {"id": 3}), 1)
+        self.assertEqual((len(t), len(t.storage)), (9, 10))
+        self.assertEqual(self.db.select("users", {"id": 3}), [])
+        self.assertEqual(self.db.update("users", {"name": "u3"}, {"name": "x"}), 0)
+        self.assertEqual(self.db.execute_sql('VACUUM users'), "Table users vacuumed: 1 rows reclaimed.")
+        self.assertEqual((len(t), len(t.storage)), (9, 9))
+        self.assertEqual(self.db.select("users", {"id": 4})[0]["name"], "u4")
+        self.assertEqual([r["id"] for r in t.rows], [0, 1, 2, 4, 5, 6, 7, 8, 9])
+
+    def test_compaction_threshold(self):
+        t = self.db.tables["users"]
+        t.compact_min = 4
+        for i in range(12):
+            self.db.insert("users", {"id": i, "name": "n", "birth": "1990-01-01"})
+        self.db.delete("users", {"id": 0})
+        self.db.delete("users", {"id": 1})
+        self.assertEqual(len(t.storage), 12)
+        self.db.delete("users", {"id": Range(2, 3)})
+        self.assertEqual((len(t), len(t.storage), t.deleted_count), (8, 8, 0))
+
+    def test_compaction_waits_for_unread_stream(self):
+        t = self.db.tables["users"]
+        t.compact_min = 4
+        self.db.insert_many("users", [{"id": i, "name": "n", "birth": "1990-01-01"} for i in range(12)])
+        self.db.create_index("users", "users_id", ["id"])
+        stream = self.db.execute_sql('SELECT id FROM users WHERE id >= 2', stream=True)
+        self.db.delete("users", {"id": Range(0, 5)})  # would compact, but the stream is open
+        self.assertEqual(len(t.storage), 12)
+        with self.assertRaises(ValueError):
+            self.db.execute_sql('VACUUM users')
+        self.assertEqual([r["id"] for r in stream], list(range(6, 12)))
+        self.assertEqual(self.db.execute_sql('VACUUM users'), "Table users vacuumed: 6 rows reclaimed.")
+        # A stream dropped unread no longer holds compaction back
+        self.db.execute_sql('SELECT id FROM users', stream=True)
+        self.db.delete("users", {"id": Range(6, 9)})
+        self.assertEqual((len(t), len(t.storage)), (2, 2))
+    def test_stream_skips_rows_updated_out_of_filter(self):
+        self.db.insert_many("users", [{"id": i, "name": "a", "birth": "1990-01-01"} for i in range(10)])
+        self.db.create_index("users", "users_name", ["name"])
+        rows = iter(self.db.iter_select("users", {"name": "a"}))
+        next(rows)
+        self.db.update("users", {"id": Range(5, 9)}, {"name": "b"})
+        self.assertEqual([r["id"] for r in rows], [1, 2, 3, 4])
+
+    def test_insert_many(self):
+        self.db.create_index("users", "users_name", ["name"])
+        n = self.db.insert_many("users", [{"id": i, "name": f"u{i % 2}", "birth": "2000-01-01"} for i in range(6)])
+        self.assertEqual(n, 6)
+        self.assertEqual(len(self.db.select("users", {"name": "u1"})), 3)
+        with self.assertRaises(ValueError):
+            self.db.insert_many("users", [{"id": 7, "name": "a", "birth": "2000-01-01"}, {"id": 8}])
+        self.assertEqual(len(self.db.select("users")), 6)
+        out = self.db.execute_sql('INSERT INTO users (id, name, birth) VALUES (10, "x", "2001-01-01"), (11, "y", "2001-01-02")')
+        self.assertEqual(out, 2)
+        self.assertEqual(self.db.select("users", {"id": 11})[0]["birth"], date(2001, 1, 2))
+
+class TestColumnarStorage(TestAetherDBEngine):
+    """Runs the engine tests against the columnar layout."""
+    def setUp(self):
+        self.db = AetherDB()
+        self.schema = {"id": "int", "name": "str", "birth": "date"}
+        self.db.create_table("users", self.schema, storage="columnar")
+
+    def test_sql_storage_clause_and_memory(self):
+        self.db.execute_sql('CREATE TABLE events (id INT, kind STR, day DATE) USING COLUMNAR')
+        self.db.execute_sql('CREATE TABLE events_rows (id INT, kind STR, day DATE)')
+        for name in ("events", "events_rows"):
+            for i in range(500):
+                self.db.insert(name, {"id": i, "kind": f"k{i % 3}", "day": "2024-05-01"})
+        col, row = self.db.tables["events"], self.db.tables["events_rows"]
+        self.assertEqual(col.storage.kind, "columnar")
+        self.assertEqual(col.select({"kind": "k1"}), row.select({"kind": "k1"}))
+        self.assertLess(col.memory_usage() * 4, row.memory_usage())
+
+    def test_failed_update_changes_nothing(self):
+        self.db.insert("users", {"id": 1, "name": "Alice", "birth": "1990-02-02"})
+        self.db.create_index("users", "users_name", ["name"])
+        with self.assertRaises(ValueError):  # name is set before id fails to encode
+            self.db.update("users", {"id": 1}, {"name": "Bob", "id": 2 ** 70})
+        self.assertEqual(self.db.select("users"), [{"id": 1, "name": "Alice", "birth": date(1990, 2, 2)}])
+        self.assertEqual(len(self.db.select("users", {"name": "Alice"})), 1)
+
+
+@unittest.skipIf(not vectorized.available(), "NumPy not installed")
+class TestVectorizedScan(unittest.TestCase):
+    def setUp(self):
+        self.db = AetherDB()
+        for storage in ("row", "columnar"):
+            self.db.create_table(storage, {"id": "int", "kind": "str", "day": "date"}, storage=storage)
+            self.db.insert_many(storage, [{"id": i, "kind": f"k{i % 7}", "day": date(2024, 1, 1 + i % 28)}
+                                          for i in range(3000)])
+            self.db.delete(storage, {"id": Range(100, 199)})
+
+    def _both_paths(self, table, filters):
+        old = vectorized.VECTOR_MIN_ROWS
+        try:
+            vectorized.VECTOR_MIN_ROWS = 10 ** 9
+            plain = self.db.select(table, filters)
+            vectorized.VECTOR_MIN_ROWS = 0
+            vec = self.db.select(table, filters)
+        finally:
+            vectorized.VECTOR_MIN_ROWS = old
+        return plain, vec
+
+    def test_masks_match_python_scan(self):
+        cases = [{"id": 2500}, {"id": Range(50, 150, True, False)}, {"day": Range(low="2024-01-20")},
+                 {"kind": "k3", "day": "2024-01-04"}, {"kind": "nope", "id": 1}, {"id": Range(10, 2990), "kind": "k1"}]
+        for storage in ("row", "columnar"):
+            for filters in cases:
+                plain, vec = self._both_paths(storage, filters)
+                self.assertEqual(plain, vec, (storage, filters))
+
+    def test_ints_beyond_int64_fall_back(self):
+        self.db.insert("row", {"id": 2 ** 64, "kind": "big", "day": "2024-02-01"})
+        self.db.insert("row", {"id": -2 ** 63 - 1, "kind": "big", "day": "2024-02-01"})
+        for filters in ({"id": 2 ** 64}, {"id": Range(low=2 ** 63)}, {"id": Range(high=0, high_inclusive=False)}):
+            plain, vec = self._both_paths("row", filters)
+            self.assertEqual(plain, vec, filters)
+            self.assertEqual(len(vec), 1)
+
+    def test_stream_rechecks_masked_rows_after_update(self):
+        old = vectorized.VECTOR_MIN_ROWS
+        vectorized.VECTOR_MIN_ROWS = 0
+        try:
+            for storage in ("row", "columnar"):
+                rows = iter(self.db.iter_select(storage, {"kind": "k3"}))
+                first = next(rows)
+                self.db.update(storage, {}, {"kind": "moved"})
+                self.assertEqual(list(rows), [], storage)
+                self.assertEqual(first["kind"], "k3")
+        finally:
+            vectorized.VECTOR_MIN_ROWS = old
+
+    def test_derived_arrays_follow_table_version(self):
+        self._both_paths("row", {"id": 5000})
+        self.db.insert("row", {"id": 5000, "kind": "new", "day": "2024-02-01"})
+        plain, vec = self._both_paths("row", {"id": 5000})
+        self.assertEqual(len(vec), 1)
+        self.assertEqual(plain, vec)
+
 if __name__ == "__main__":
     unittest.main()
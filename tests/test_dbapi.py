@@ -0,0 +1,69 @@
+import unittest
+from aetherdb import connect
+from aetherdb import dbapi
+from aetherdb.db_engine import AetherDB
+
+class TestDBAPI(unittest.TestCase):
+    def setUp(self):
+        self.conn = connect()
+        self.cur = self.conn.cursor()
+        self.cur.execute('CREATE TABLE t (id INT, name STR)')
+        self.cur.executemany('INSERT INTO t (id, name) VALUES (?, ?)', [(i, f"n{i}") for i in range(250)])
+
+    def test_executemany_rowcount(self):
+        self.assertEqual(self.cur.rowcount, 250)
+
+    def test_fetchone_and_description(self):
+        self.cur.execute('SELECT id, name FROM t WHERE id = ?', (7,))
+        self.assertEqual([d[0] for d in self.cur.description], ["id", "name"])
+        self.assertEqual(self.cur.fetchone(), (7, "n7"))
+        self.assertIsNone(self.cur.fetchone())
+
+    def test_fetchmany_batches(self):
+        self.cur.execute('SELECT id, name FROM t')
+        self.assertEqual(len(self.cur.fetchmany(100)), 100)
+        self.assertEqual(len(self.cur.fetchmany()), 100)  # arraysize
+        self.assertEqual(len(self.cur.fetchall()), 50)
+        self.assertEqual(self.cur.fetchmany(10), [])
+
+    def test_iteration(self):
+        self.cur.execute('SELECT id, name FROM t WHERE id < 5')
+        self.assertEqual([r[0] for r in self.cur], [0, 1, 2, 3, 4])
+
+    def test_scan_is_lazy(self):
+        table = self.conn.db.tables["t"]
+        seen = []
+        original = table._matches
+        table._matches = lambda pos, filters: seen.append(pos) or original(pos, filters)
+        self.cur.execute('SELECT id, name FROM t WHERE name = ?', ("n3",))
+        self.assertEqual(seen, [])
+        self.assertEqual(self.cur.fetchone(), (3, "n3"))
+        self.assertLess(len(seen), 250)
+
+    def test_delete_during_stream(self):
+        self.cur.execute('SELECT id, name FROM t')
+        first = self.cur.fetchmany(10)
+        self.conn.db.delete("t", {"id": 20})
+        rest = self.cur.fetchall()
+        self.assertEqual(len(first) + len(rest), 249)
+
+    def test_errors(self):
+        with self.assertRaises(dbapi.ProgrammingError):
+            self.cur.execute('SELEKT * FROM t')
+        with self.assertRaises(dbapi.ProgrammingError):
+            self.cur.fetchone()
+        with self.assertRaises(dbapi.NotSupportedError):
+            self.conn.rollback()
+        self.conn.close()
+        with self.assertRaises(dbapi.InterfaceError):
+            self.cur.execute('SELECT id FROM t')
+
+    def test_wraps_existing_engine(self):
+        db = AetherDB()
+        db.create_table("x", {"a": "int"})
+        db.insert("x", {"a": 1})
+        with connect(db) as conn:
+            self.assertEqual(conn.cursor().execute('SELECT a FROM x').fetchall(), [(1,)])
+
+if __name__ == "__main__":
+    unittest.main()
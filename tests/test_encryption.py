@@ -0,0 +1,141 @@
+import io
+import os
+import pickle
+import tempfile
+import time
+import unittest
+import zlib
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from aetherdb import encryption
+from aetherdb.db_engine import AetherDB
+from aetherdb.encryption import (ENVELOPE_MAGIC, STREAM_MAGIC, EncryptedReader, EncryptedWriter,
+                                 KeyCache, cached_key, encrypt, open_decrypted, read_header, rewrap)
+
+PAYLOAD = os.urandom(1000) + b"aetherdb " * 5000
+
+
+def _seal(data, **kw):
+    out = io.BytesIO()
+    with EncryptedWriter(out, "pw", chunk_size=4096, **kw) as w:
+        for i in range(0, len(data), 777):
+            w.write(data[i:i + 777])
+    return out.getvalue()
+
+
+def _frames(blob):
+    """Split a chunked file into (header, [frame bytes])."""
+    pos = read_header(io.BytesIO(blob), "pw").size
+    header, frames = blob[:pos], []
+    while pos < len(blob):
+        length = int.from_bytes(blob[pos:pos + 4], "big") & 0x7FFFFFFF
+        frames.append(blob[pos:pos + 4 + length])
+        pos += 4 + length
+    return header, frames
+
+
+class TestChunkedEncryption(unittest.TestCase):
+    def test_roundtrip(self):
+        for compress in (True, False):
+            blob = _seal(PAYLOAD, compress=compress)
+            self.assertTrue(blob.startswith(ENVELOPE_MAGIC))
+            self.assertGreater(len(_frames(blob)[1]), 10)
+            self.assertEqual(open_decrypted(io.BytesIO(blob), "pw").read(), PAYLOAD)
+        self.assertEqual(open_decrypted(io.BytesIO(_seal(b"")), "pw").read(), b"")
+
+    def test_legacy_blob_still_loads(self):
+        self.assertEqual(open_decrypted(io.BytesIO(encrypt(PAYLOAD, "pw")), "pw").read(), PAYLOAD)
+
+    def test_first_chunked_format_still_loads(self):
+        key = cached_key("pw", b"s" * 16)
+        header = STREAM_MAGIC + b"s" * 16 + b"\x01"
+        nonce = os.urandom(12)
+        ct = AESGCM(key).encrypt(nonce, zlib.compress(PAYLOAD), header + (0).to_bytes(8, "big") + b"\x01")
+        blob = header + (len(ct) + 12 | 0x80000000).to_bytes(4, "big") + nonce + ct
+        self.assertEqual(open_decrypted(io.BytesIO(blob), "pw").read(), PAYLOAD)
+
+    def test_frames_are_bound_to_position_and_end(self):
+        header, frames = _frames(_seal(PAYLOAD))
+        swapped = header + b"".join([frames[1], frames[0]] + frames[2:])
+        truncated = header + b"".join(frames[:-1])
+        with self.assertRaises(InvalidTag):
+            EncryptedReader(io.BytesIO(swapped), "pw").read()
+        with self.assertRaises(ValueError):
+            EncryptedReader(io.BytesIO(truncated), "pw").read()
+        # Marking an earlier frame final fails authentication as well
+        word = int.from_bytes(frames[0][:4], "big") | 0x80000000
+        cut = header + word.to_bytes(4, "big") + frames[0][4:]
+        with self.assertRaises(InvalidTag):
+            EncryptedReader(io.BytesIO(cut), "pw").read()
+
+    def test_wrong_password(self):
+        with self.assertRaises(InvalidTag):
+            open_decrypted(io.BytesIO(_seal(PAYLOAD)), "nope").read()
+
+    def test_save_and_load_encrypted(self):
+        db = AetherDB()
+        db.create_table("t", {"id": "int", "name": "str"})
+        db.insert_many("t", [{"id": i, "name": f"n{i}"} for i in range(5000)])
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "db.aedb")
+            db.save_encrypted(path, "pw")
+            self.assertEqual(os.listdir(d), ["db.aedb"])
+            self.assertEqual(len(AetherDB.load_encrypted(path, "pw").tables["t"]), 5000)
+            with open(path, "wb") as f:  # a file from before the chunked format
+                f.write(encrypt(pickle.dumps(db.tables), "pw"))
+            self.assertEqual(len(AetherDB.load_encrypted(path, "pw").tables["t"]), 5000)
+
+
+def _header(path, password):
+    with open(path, "rb") as f:
+        return read_header(f, password)
+
+
+class TestKeysAndEnvelopes(unittest.TestCase):
+    def test_key_cache(self):
+        cache = KeyCache(ttl=0.05, max_entries=2)
+        k = cache.get("pw", b"a" * 16)
+        self.assertEqual(cache.get("pw", b"a" * 16), k)
+        self.assertNotEqual(cache.get("other", b"a" * 16), k)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        entry = next(iter(cache._entries.values()))[0]
+        time.sleep(0.06)
+        cache.get("pw", b"b" * 16)  # expires the old entries
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(entry, bytearray(32))  # wiped
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(KeyCache(ttl=0).get("pw", b"a" * 16), k)
+
+    def test_repeated_saves_skip_kdf_and_rekey(self):
+        db = AetherDB()
+        db.create_table("t", {"id": "int"})
+        db.insert_many("t", [{"id": i} for i in range(100)])
+        cache = encryption.configure_key_cache()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "db.aedb")
+            db.save_encrypted(path, "pw")
+            first = _header(path, "pw")
+            for _ in range(3):
+                db.insert("t", {"id": 0})
+                db.save_encrypted(path, "pw")
+            self.assertEqual(cache.misses, 1)
+            again = _header(path, "pw")
+            self.assertEqual((again.salt, again.data_key), (first.salt, first.data_key))
+            self.assertNotEqual(again.aad, first.aad)  # new stream id per save
+
+            rewrap(path, "pw", "new")
+            self.assertEqual(_header(path, "new").data_key, first.data_key)
+            self.assertEqual(len(AetherDB.load_encrypted(path, "new").tables["t"]), 103)
+            with self.assertRaises(InvalidTag):
+                AetherDB.load_encrypted(path, "pw")
+            with self.assertRaises(InvalidTag):
+                rewrap(path, "pw", "x")
+            # Saving with a password that doesn't open the file starts a new envelope
+            db.save_encrypted(path, "third")
+            self.assertEqual(len(AetherDB.load_encrypted(path, "third").tables["t"]), 103)
+            self.assertEqual(os.listdir(d), ["db.aedb"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import datetime
+import random
+import unittest
+from unittest import mock
+from aetherdb import parallel
+from aetherdb.db_engine import AetherDB
+from aetherdb.index import Range
+
+QUERIES = [
+    "SELECT id FROM t WHERE kind = 'a' AND n BETWEEN 3 AND 20",
+    "SELECT * FROM t WHERE day >= '2020-06-01'",
+    "SELECT * FROM t WHERE kind = 'zzz'",
+    "SELECT kind, COUNT(*), SUM(n), MIN(day), MAX(n), AVG(n) FROM t GROUP BY kind",
+    "SELECT COUNT(*), SUM(n), MIN(n), MAX(day), COUNT(n) FROM t WHERE n > 0",
+    "SELECT day, COUNT(*) FROM t WHERE kind = 'b' GROUP BY day HAVING COUNT(*) > 3",
+    "SELECT COUNT(*) FROM t WHERE kind = 'nope'",
+    "SELECT kind, extra, COUNT(*), SUM(extra), MIN(extra) FROM t GROUP BY kind, extra",
+    "SELECT COUNT(extra), SUM(extra), MAX(extra) FROM t WHERE kind = 'a'",
+]
+
+
+def build(storage, rows=6000):
+    db = AetherDB()
+    db.create_table("t", {"id": "int", "kind": "str", "day": "date", "n": "int"}, storage)
+    rnd = random.Random(1)
+    start = datetime.date(2020, 1, 1)
+    db.insert_many("t", [{"id": i, "kind": rnd.choice("abc"), "day": start + datetime.timedelta(days=i % 400),
+                          "n": rnd.randint(-50, 50)} for i in range(rows)])
+    db.delete("t", {"kind": "c", "n": Range(0, 10)})
+    db.alter_table_add_column("t", "extra", "int")  # NULL everywhere but kind 'b'
+    db.update("t", {"kind": "b"}, {"extra": 5})
+    return db
+
+
+@unittest.skipUnless(parallel.available(), "needs multiprocessing.shared_memory")
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        # Several ranges per query even on small test tables, so worker results get merged
+        patcher = mock.patch.object(parallel, "MIN_CHUNK", 1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check_same_results(self, storage):
+        db = build(storage)
+        self.addCleanup(db.close)
+        serial = [db.execute_sql(q) for q in QUERIES]
+        db.enable_parallel(workers=2, min_rows=1000)
+        for query, expected in zip(QUERIES, serial):
+            self.assertEqual(db.execute_sql(query), expected, query)
+        info = db.parallel_info()
+        self.assertGreater(info["parallel"], 0)
+        self.assertEqual(info["exports"], 1)
+
+    def test_row_storage(self):
+        self.check_same_results("row")
+
+    def test_columnar_storage(self):
+        self.check_same_results("columnar")
+
+    def test_serial_fallbacks(self):
+        db = build("columnar", rows=3000)
+        self.addCleanup(db.close)
+        db.enable_parallel(workers=2, min_rows=5000)
+        db.execute_sql("SELECT COUNT(*) FROM t WHERE n > 0")  # below min_rows
+        self.assertEqual(db.parallel_info()["parallel"], 0)
+        db.enable_parallel(workers=2, min_rows=1000)
+        expected = sorted(r["kind"] for r in db.select("t"))
+        # MIN/MAX of strings cannot be taken over pooled string ids
+        self.assertEqual(db.execute_sql("SELECT MIN(kind), MAX(kind) FROM t"),
+                         [{"MIN(kind)": expected[0], "MAX(kind)": expected[-1]}])
+        self.assertEqual(db.parallel_info()["parallel"], 0)
+
+    def test_exports_follow_table_version(self):
+        db = build("columnar", rows=3000)
+        self.addCleanup(db.close)
+        db.enable_parallel(workers=2, min_rows=1000)
+        before = db.execute_sql("SELECT COUNT(*) FROM t WHERE n > 0")[0]["COUNT(*)"]
+        db.insert("t", {"id": -1, "kind": "a", "day": datetime.date(2021, 1, 1), "n": 7, "extra": 1})
+        after = db.execute_sql("SELECT COUNT(*) FROM t WHERE n > 0")[0]["COUNT(*)"]
+        self.assertEqual(after, before + 1)
+        info = db.parallel_info()
+        self.assertEqual((info["exports"], info["cached"]), (2, 1))
+
+    def test_disable_frees_exports(self):
+        db = build("row", rows=3000)
+        self.addCleanup(db.close)
+        db.enable_parallel(workers=2, min_rows=1000)
+        executor = db.parallel
+        db.execute_sql("SELECT COUNT(*) FROM t WHERE n > 0")
+        (_, export), = executor._exports.values()
+        db.disable_parallel()
+        self.assertIsNone(db.parallel_info())
+        self.assertTrue(export.retired)
+        self.assertEqual(executor.info()["cached"], 0)
+        with self.assertRaises(FileNotFoundError):
+            parallel.shared_memory.SharedMemory(export.layout[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
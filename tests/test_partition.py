@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from aetherdb.db_engine import AetherDB, Table
+from aetherdb.index import Range
+from aetherdb.partition import HashPartitioning, RangePartitioning, make_partitioning
+
+RANGE_SQL = ("CREATE TABLE ev (id INT, kind STR, day DATE, n INT) USING {storage} PARTITION BY RANGE (day) "
+             "(PARTITION p2020 VALUES LESS THAN ('2021-01-01'), PARTITION p2021 VALUES LESS THAN ('2022-01-01'), "
+             "PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+HASH_SQL = "CREATE TABLE ev (id INT, kind STR, day DATE, n INT) USING {storage} PARTITION BY HASH (kind) PARTITIONS 3"
+FLAT_SQL = "CREATE TABLE ev (id INT, kind STR, day DATE, n INT) USING {storage}"
+
+QUERIES = [
+    "SELECT * FROM ev WHERE day = '2021-03-04'",
+    "SELECT id, n FROM ev WHERE day >= '2021-01-01' AND day < '2022-01-01'",
+    "SELECT * FROM ev WHERE kind = 'c' AND n > 50",
+    "SELECT * FROM ev WHERE id BETWEEN 100 AND 200",
+    "SELECT kind, COUNT(*), SUM(n), MIN(day), MAX(day), AVG(extra) FROM ev GROUP BY kind",
+    "SELECT COUNT(*) FROM ev WHERE id < 1000",
+    "SELECT COUNT(*), MAX(n) FROM ev WHERE day > '2021-12-31'",
+    "SELECT * FROM ev WHERE day < '2020-01-01'",
+]
+
+
+def build(create_sql, storage="ROW", rows=3000):
+    db = AetherDB()
+    db.execute_sql(create_sql.format(storage=storage))
+    start = date(2020, 1, 1)
+    db.insert_many("ev", [{"id": i, "kind": "abcd"[i * 7 % 4], "day": start + timedelta(days=i % 900),
+                           "n": i * 13 % 100} for i in range(rows)])
+    db.execute_sql("CREATE INDEX ev_id ON ev USING BTREE (id)")
+    db.delete("ev", {"n": Range(0, 5)})
+    # Moves rows of 2020 and 2021 into pmax on a RANGE partitioned table
+    db.update("ev", {"kind": "a", "day": Range(date(2020, 6, 1), date(2021, 6, 1))}, {"day": "2022-02-02"})
+    db.execute_sql("ALTER TABLE ev ADD COLUMN extra INT")
+    db.update("ev", {"kind": "b"}, {"extra": 3})
+    return db
+
+
+def result(rows):
+    return sorted(map(repr, rows))
+
+
+class TestSchemes(unittest.TestCase):
+    def test_range_prune(self):
+        p = RangePartitioning("x", [("a", 10), ("b", 20), ("c", None)])
+        self.assertEqual(p.prune({}), ["a", "b", "c"])
+        self.assertEqual(p.prune({"x": 10}), ["b"])
+        self.assertEqual(p.prune({"x": Range(5, 15)}), ["a", "b"])
+        self.assertEqual(p.prune({"x": Range(high=20, high_inclusive=False)}), ["a", "b"])
+        self.assertEqual(p.prune({"x": Range(low=20)}), ["c"])
+        p.drop("c")
+        self.assertEqual(p.prune({"x": Range(low=25)}), [])
+        with self.assertRaises(ValueError):
+            p.route(25)
+        with self.assertRaises(ValueError):
+            p.add("d", 15)  # bounds must increase
+
+    def test_hash_is_stable(self):
+        p = HashPartitioning("k", 4)
+        self.assertEqual(p.prune({"k": "abc"}), [p.route("abc")])
+        self.assertEqual(p.prune({"k": Range("a", "b")}), p.names)
+        # crc32, not the per-process hash() of a str
+        self.assertEqual(p.route("abc"), "p2")
+        self.assertEqual(make_partitioning(p.spec()).names, p.names)
+
+
+class TestPartitionedTable(unittest.TestCase):
+    def test_same_results_as_flat_table(self):
+        for storage in ("ROW", "COLUMNAR"):
+            expected = [result(build(FLAT_SQL, storage).execute_sql(q)) for q in QUERIES]
+            for sql in (RANGE_SQL, HASH_SQL):
+                db = build(sql, storage)
+                for query, rows in zip(QUERIES, expected):
+                    self.assertEqual(result(db.execute_sql(query)), rows, (storage, sql, query))
+
+    def test_pruning_skips_partitions(self):
+        db = build(RANGE_SQL)
+        parts = db.tables["ev"].partitions
+        with mock.patch.object(Table, "scan", autospec=True, side_effect=Table.scan) as scan:
+            db.execute_sql("SELECT * FROM ev WHERE day BETWEEN '2021-02-01' AND '2021-03-01'")
+            db.execute_sql("DELETE FROM ev WHERE day = '2021-02-02'")
+        self.assertEqual({call.args[0].name for call in scan.call_args_list}, {"p2021"})
+        self.assertEqual(len(parts["p2020"]) + len(parts["p2021"]) + len(parts["pmax"]), len(db.tables["ev"]))
+
+    def test_drop_and_add_partition(self):
+        db = build(RANGE_SQL)
+        t = db.tables["ev"]
+        before = len(t)
+        in_2020 = db.execute_sql("SELECT COUNT(*) FROM ev WHERE day < '2021-01-01'")[0]["COUNT(*)"]
+        msg = db.execute_sql("ALTER TABLE ev DROP PARTITION p2020")
+        self.assertIn(f"{in_2020} rows", msg)
+        self.assertEqual(len(t), before - in_2020)
+        self.assertEqual(list(t.partitions), ["p2021", "pmax"])
+        with self.assertRaises(ValueError):
+            db.execute_sql("ALTER TABLE ev DROP PARTITION p2020")
+        with self.assertRaises(ValueError):  # pmax already reaches MAXVALUE
+            db.execute_sql("ALTER TABLE ev ADD PARTITION p2030 VALUES LESS THAN ('2031-01-01')")
+        db.execute_sql("ALTER TABLE ev DROP PARTITION pmax")
+        db.execute_sql("ALTER TABLE ev ADD PARTITION p2022 VALUES LESS THAN ('2023-01-01')")
+        db.execute_sql("INSERT INTO ev (id, kind, day, n, extra) VALUES (9999, 'z', '2022-06-01', 1, 1)")
+        self.assertEqual(len(t.partitions["p2022"]), 1)
+        self.assertEqual(t.partitions["p2022"].indexes.keys(), {"ev_id"})
+
+    def test_rows_outside_every_partition(self):
+        db = AetherDB()
+        db.execute_sql("CREATE TABLE ev (id INT, day DATE) PARTITION BY RANGE (day) "
+                       "(PARTITION p VALUES LESS THAN ('2021-01-01'))")
+        with self.assertRaises(ValueError):
+            db.execute_sql("INSERT INTO ev (id, day) VALUES (1, '2020-01-01'), (2, '2022-01-01')")
+        self.assertEqual(len(db.tables["ev"]), 0)  # the whole batch was rejected
+        db.execute_sql("INSERT INTO ev (id, day) VALUES (1, '2020-01-01')")
+        with self.assertRaises(ValueError):
+            db.execute_sql("UPDATE ev SET day = '2022-01-01' WHERE id = 1")
+        self.assertEqual(db.select("ev"), [{"id": 1, "day": date(2020, 1, 1)}])
+        with self.assertRaises(ValueError):
+            db.execute_sql("ALTER TABLE ev DROP PARTITION p2")
+        db.execute_sql("CREATE TABLE flat (id INT)")
+        with self.assertRaises(ValueError):
+            db.execute_sql("ALTER TABLE flat DROP PARTITION p")
+
+    def test_bad_definitions(self):
+        db = AetherDB()
+        with self.assertRaises(ValueError):
+            db.execute_sql("CREATE TABLE t (id INT) PARTITION BY HASH (other) PARTITIONS 2")
+        with self.assertRaises(ValueError):
+            db.execute_sql("CREATE TABLE t (id INT) PARTITION BY RANGE (id) "
+                           "(PARTITION a VALUES LESS THAN (10), PARTITION b VALUES LESS THAN (5))")
+        self.assertNotIn("t", db.tables)
+        db.execute_sql("CREATE TABLE t (id INT) PARTITION BY HASH (id) PARTITIONS 2")
+        with self.assertRaises(ValueError):  # HASH partitions are fixed
+            db.execute_sql("ALTER TABLE t DROP PARTITION p0")
+
+
+class TestPartitionPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_round_trip(self):
+        path = os.path.join(self.tmp.name, "db.aedb")
+        for sql in (RANGE_SQL, HASH_SQL):
+            db = build(sql, "COLUMNAR")
+            expected = [result(db.execute_sql(q)) for q in QUERIES]
+            db.save_encrypted(path, "pw")
+            loaded = AetherDB.load_encrypted(path, "pw")
+            loaded.save_encrypted(path, "pw")  # copies the undecoded table's blocks
+            loaded = AetherDB.load_encrypted(path, "pw")
+            t = loaded.tables["ev"]
+            self.assertEqual(list(t.partitions), list(db.tables["ev"].partitions))
+            self.assertEqual(t.index_defs, {"ev_id": (["id"], "btree")})
+            self.assertEqual([result(loaded.execute_sql(q)) for q in QUERIES], expected)
+
+    def test_wal_replay(self):
+        db = AetherDB.open(self.tmp.name, "pw", fsync=False)
+        db.execute_sql("CREATE TABLE ev (id INT, day DATE) PARTITION BY RANGE (day) "
+                       "(PARTITION a VALUES LESS THAN ('2021-01-01'))")
+        db.execute_sql("ALTER TABLE ev ADD PARTITION b VALUES LESS THAN ('2022-01-01')")
+        db.execute_sql("INSERT INTO ev (id, day) VALUES (1, '2020-05-05'), (2, '2021-05-05')")
+        db.execute_sql("ALTER TABLE ev DROP PARTITION a")
+        db.close()
+        db = AetherDB.open(self.tmp.name, "pw", fsync=False)
+        self.addCleanup(db.close)
+        self.assertEqual(list(db.tables["ev"].partitions), ["b"])
+        self.assertEqual(db.select("ev"), [{"id": 2, "day": date(2021, 5, 5)}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import threading
+import time
+import unittest
+from aetherdb.db_engine import AetherDB
+from aetherdb.pool import ConnectionPool, get_pool
+from aetherdb.server import AetherServer
+
+
+class PoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = AetherDB()
+        self.db.execute_sql('CREATE TABLE t (id INT, name STR)')
+        self.server = AetherServer(self.db, port=0).start_thread()
+
+    def tearDown(self):
+        self.server.stop_thread()
+
+    def pool(self, **options):
+        pool = ConnectionPool("127.0.0.1", self.server.port, user="aether", password="", **options)
+        self.addCleanup(pool.close)
+        return pool
+
+
+class TestConnectionPool(PoolTestCase):
+    def test_reuse_and_token_login(self):
+        pool = self.pool()
+        with pool.connection() as a, pool.connection() as b:
+            self.assertIsNot(a, b)
+            self.assertEqual(a.current_user, "aether")
+            self.assertEqual(b.current_user, "aether")
+        with pool.connection() as c:
+            self.assertIn(c, (a, b))
+        info = pool.info()
+        self.assertEqual((info["created"], info["reused"], info["idle"]), (2, 1, 2))
+        # Only the first connection paid for a password check
+        self.assertEqual((info["password_logins"], info["token_logins"]), (1, 1))
+
+    def test_max_size(self):
+        pool = self.pool(max_size=2)
+        a, b = pool.acquire(), pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.05)
+        threading.Timer(0.05, pool.release, (a,)).start()
+        self.assertIs(pool.acquire(timeout=5), a)
+        pool.release(b)
+
+    def test_idle_timeout(self):
+        pool = self.pool(idle_timeout=0.05)
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.1)
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.info()["expired"], 1)
+
+    def test_health_check_drops_dead_connections(self):
+        pool = self.pool(health_check_interval=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn._sock.close()  # as if the server had gone away
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, conn)
+        self.assertEqual(fresh.execute_sql('SELECT * FROM t'), [])
+        self.assertEqual(pool.info()["failed_checks"], 1)
+
+    def test_release_drops_broken_or_switched_connections(self):
+        self.db.auth.add_user("bob", "", password_optional=True)
+        pool = self.pool()
+        conn = pool.acquire()
+        conn.login("bob", "")
+        pool.release(conn)
+        closed = pool.acquire()
+        closed.close()
+        pool.release(closed)
+        self.assertEqual(pool.info()["idle"], 0)
+        self.assertEqual(pool.info()["open"], 0)
+
+    def test_login_through_pool(self):
+        pool = ConnectionPool("127.0.0.1", self.server.port, user="aether")
+        self.addCleanup(pool.close)
+        conn = pool.acquire()
+        self.assertIsNone(conn.current_user)
+        self.assertTrue(pool.login(conn, "aether", ""))
+        other = pool.acquire()  # logs in with the adopted session
+        self.assertEqual(other.current_user, "aether")
+
+    def test_shared_between_threads(self):
+        pool = self.pool(max_size=3)
+        errors = []
+
+        def work(k):
+            try:
+                for i in range(20):
+                    with pool.connection(timeout=10) as conn:
+                        conn.execute_sql('INSERT INTO t (id, name) VALUES (?, ?)', (k * 100 + i, "w"))
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=work, args=(k,)) for k in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.db.select("t")), 160)
+        info = pool.info()
+        self.assertLessEqual(info["created"], 3)
+        # Every acquire was counted exactly once, even with threads racing
+        self.assertEqual(info["created"] + info["reused"], 160)
+
+    def test_get_pool_is_shared(self):
+        a = get_pool("127.0.0.1", self.server.port, user="aether")
+        self.assertIs(get_pool("127.0.0.1", self.server.port, user="aether"), a)
+        a.close()
+        self.assertIsNot(get_pool("127.0.0.1", self.server.port, user="aether"), a)
+
+
+class TestPipeline(PoolTestCase):
+    def test_results_in_order(self):
+        with self.pool().connection() as conn:
+            statements = [('INSERT INTO t (id, name) VALUES (?, ?)', (i, f"n{i}")) for i in range(200)]
+            statements += ["SELECT name FROM t WHERE id = 7", "UPDATE t SET name = 'x' WHERE id < 10",
+                           "SELECT COUNT(*) FROM t"]
+            results = conn.pipeline(statements)
+            self.assertEqual(len(results), 203)
+            self.assertEqual(results[200], [{"name": "n7"}])
+            self.assertEqual(results[201], 10)
+            self.assertEqual(results[202], [{"COUNT(*)": 200}])
+
+    def test_errors_keep_the_connection_in_step(self):
+        with self.pool().connection() as conn:
+            results = conn.pipeline(["INSERT INTO t (id, name) VALUES (1, 'a')", "SELECT * FROM nope",
+                                     "SELECT id FROM t"], return_exceptions=True)
+            self.assertIsInstance(results[1], ValueError)
+            self.assertEqual(results[2], [{"id": 1}])
+            with self.assertRaises(ValueError):
+                conn.pipeline(["SELECT * FROM nope", "SELECT id FROM t"])
+            self.assertEqual(conn.execute_sql('SELECT id FROM t'), [{"id": 1}])
+
+    def test_large_pipeline(self):
+        # Far more request and reply bytes than socket buffers hold
+        self.db.insert_many("t", [{"id": i, "name": "y" * 200} for i in range(2000)])
+        with self.pool().connection() as conn:
+            results = conn.pipeline(["SELECT * FROM t WHERE name = '" + "y" * 200 + "'"] * 40)
+            self.assertTrue(all(len(r) == 2000 for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
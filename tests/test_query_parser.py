@@ -0,0 +1,146 @@
+import unittest
+from aetherdb import fast_parser
+from aetherdb.db_engine import AetherDB
+from aetherdb.index import Range
+from aetherdb.query_parser import normalize_sql, parse_sql, prepare_sql, sql_to_engine_args, statement_cache_info
+
+
+class TestStatementCache(unittest.TestCase):
+    def test_literals_share_one_template(self):
+        a = normalize_sql('SELECT id FROM t WHERE id = 7, name = "x:7"')
+        b = normalize_sql("SELECT id  FROM t WHERE id = 8, name = 'y'")
+        self.assertEqual(a[0], b[0])
+        self.assertEqual(a[1], {"_l0": "7", "_l1": "x:7"})
+
+    def test_cached_path_matches_direct_parse(self):
+        for sql in ['INSERT INTO t (a, b) VALUES (1, "x"), (2, "2024-01-01")',
+                    'UPDATE t SET b = "z" WHERE a > 1 AND a <= 10',
+                    "DELETE FROM t WHERE d BETWEEN '2024-01-01' AND '2024-02-01'",
+                    'SELECT a FROM t WHERE b = ":name"']:
+            self.assertEqual(sql_to_engine_args(sql), sql_to_engine_args(parse_sql(sql)))
+
+    def test_repeated_shapes_hit_cache(self):
+        sql_to_engine_args('SELECT a FROM cache_probe WHERE a = 1')
+        before = statement_cache_info().hits
+        sql_to_engine_args('SELECT a FROM cache_probe WHERE a = 2')
+        self.assertEqual(statement_cache_info().hits, before + 1)
+
+    def test_bind_parameters(self):
+        stmt = prepare_sql('SELECT a FROM t WHERE a > ? AND a <= :hi, b = ?')
+        action, data = stmt.bind(3, "x", hi=9)
+        self.assertEqual(data["where"], {"a": Range(3, 9, False, True), "b": "x"})
+        with self.assertRaises(ValueError):
+            stmt.bind(3)
+        with self.assertRaises(ValueError):
+            stmt.bind(3, "x")
+
+    def test_bound_values_are_not_rewritten(self):
+        _, data = sql_to_engine_args('INSERT INTO t (a, b, c) VALUES (?, ?, 007)', ["007", 'say "hi"'])
+        self.assertEqual(data["row"], {"a": "007", "b": 'say "hi"', "c": 7})
+        _, data = sql_to_engine_args('SELECT * FROM t WHERE t.a = :a AND a > "a"', {"a": "x'"})
+        self.assertEqual(data["where"], {"a": Range("x'", "x'")})
+        _, data = sql_to_engine_args('UPDATE t SET b = ? WHERE a = 1', ['"q"'])
+        self.assertEqual(data["update"], {"b": '"q"'})
+
+
+# Statements both parsers must turn into identical (action, data)
+CORPUS = [
+    'CREATE TABLE t (a INT, b STR, c DATE)',
+    'CREATE TABLE events (id INT, day DATE) USING COLUMNAR',
+    'CREATE TABLE r (id INT) USING ROW',
+    'CREATE INDEX t_a ON t (a)',
+    'CREATE INDEX t_ab ON t (a, b)',
+    'CREATE INDEX t_c ON t USING BTREE (c)',
+    'CREATE INDEX t_h ON t USING HASH (b)',
+    'VACUUM t',
+    'INSERT INTO t (a, b, c) VALUES (1, "Alice", "2024-01-01")',
+    "INSERT INTO t (a, b) VALUES (1, 'x'), (2, \"y z\"), (3, '42')",
+    'INSERT INTO t (a, b) VALUES (:a, :b)',
+    'SELECT a FROM t',
+    'SELECT * FROM t WHERE a = 1',
+    'SELECT COUNT(*) FROM t',
+    'SELECT t.a, u.b FROM t JOIN u ON t.a = u.c WHERE t.b = :b AND u.c >= 3',
+    'SELECT * FROM t INNER JOIN u ON a = u . c',
+    'SELECT t.a FROM t WHERE t.a = 1, a < 5',
+    'SELECT b, COUNT(*), SUM(a), AVG(a) FROM t WHERE c >= :lo GROUP BY b HAVING COUNT(*) > 1 AND MAX(a) <= 9',
+    'SELECT b, c, MIN(a) FROM t GROUP BY b, c',
+    'SELECT a, b, c FROM t WHERE a = 1',
+    'SELECT a FROM t WHERE a = 1, b = "x"',
+    'SELECT a FROM t WHERE a >= 3 AND a < 10',
+    'SELECT a FROM t WHERE a > 3 AND a <= 10 AND a = 5',
+    "SELECT a FROM t WHERE c BETWEEN '2024-01-01' AND '2024-12-31', b = 'q'",
+    'SELECT a FROM t WHERE b = ":not_a_param"',
+    'UPDATE t SET b = "Bob" WHERE a = 2',
+    'UPDATE t SET a = 5, b = "x"',
+    'UPDATE t SET b = :b WHERE a BETWEEN :lo AND :hi',
+    'DELETE FROM t',
+    'DELETE FROM t WHERE b = "Bob"',
+    'DELETE FROM t WHERE c < "2024-01-01"',
+    'ALTER TABLE t RENAME TO t2',
+    'ALTER TABLE t ADD COLUMN email STR',
+    "CREATE TABLE ev (id INT, day DATE) PARTITION BY RANGE (day) "
+    "(PARTITION p1 VALUES LESS THAN ('2024-01-01'), PARTITION p2 VALUES LESS THAN (MAXVALUE))",
+    'CREATE TABLE ev (id INT, day DATE) USING COLUMNAR PARTITION BY HASH (id) PARTITIONS 4',
+    "ALTER TABLE ev ADD PARTITION p3 VALUES LESS THAN ('2025-01-01')",
+    'ALTER TABLE ev ADD PARTITION pmax VALUES LESS THAN (MAXVALUE)',
+    'ALTER TABLE ev DROP PARTITION p1',
+    '  SELECT   a\n FROM t   WHERE a=1 ',
+]
+
+INVALID = [
+    'SELECT FROM t',
+    'SELECT a FROM t WHERE',
+    'SELECT a FROM t WHERE a == 1',
+    'INSERT INTO t (a) VALUES (1',
+    'INSERT INTO t (a) VALUES 1',
+    'CREATE TABLE t (a FLOAT)',
+    'DROP TABLE t',
+    'SELECT a FROM t;',
+    'SELECT *, a FROM t',
+    'SELECT COUNT( FROM t',
+    'SELECT a FROM t JOIN u ON t.a',
+    'SELECT a. FROM t',
+    'SELECT b FROM t GROUP b',
+    'select a from t',
+    'UPDATE t SET a > 1',
+    'CREATE TABLE t (a INT) PARTITION BY RANGE (a) PARTITIONS 4',
+    'CREATE TABLE t (a INT) PARTITION BY HASH (a)',
+    'ALTER TABLE t DROP PARTITION',
+]
+
+
+class TestFastParser(unittest.TestCase):
+    PARAMS = {"a": 1, "b": "x", "lo": 2, "hi": 9}
+
+    def test_matches_pyparsing_on_corpus(self):
+        for sql in CORPUS:
+            expected = sql_to_engine_args(parse_sql(sql), self.PARAMS)
+            self.assertEqual(sql_to_engine_args(fast_parser.parse(sql), self.PARAMS), expected, sql)
+
+    def test_rejects_what_pyparsing_rejects(self):
+        for sql in INVALID:
+            with self.assertRaises(ValueError, msg=sql):
+                parse_sql(sql)
+            with self.assertRaises(fast_parser.SQLSyntaxError, msg=sql):
+                fast_parser.parse(sql)
+
+    def test_errors_still_come_from_grammar(self):
+        with self.assertRaises(ValueError) as cm:
+            sql_to_engine_args('SELECT a FROM t WHERE a == 1')
+        self.assertIn("SQL Parse error", str(cm.exception))
+
+
+class TestPreparedQueries(unittest.TestCase):
+    def test_prepare_and_execute(self):
+        db = AetherDB()
+        db.execute_sql('CREATE TABLE p (id INT, n STR)')
+        ins = db.prepare('INSERT INTO p (id, n) VALUES (?, ?)')
+        for i in range(5):
+            ins.execute(i, f"n{i}")
+        sel = db.prepare('SELECT id, n FROM p WHERE id >= :lo')
+        self.assertEqual([r["id"] for r in sel.execute(lo=3)], [3, 4])
+        self.assertEqual(db.execute_sql('SELECT id FROM p WHERE n = ?', ["n1"])[0]["id"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
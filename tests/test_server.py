@@ -0,0 +1,159 @@
+import datetime
+import os
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from click.testing import CliRunner
+from aetherdb.cli.main import cli
+from aetherdb.db_engine import AetherDB
+from aetherdb.protocol import ProtocolError
+from aetherdb.remote import RemoteDB
+from aetherdb.server import AetherServer
+from passlib.hash import bcrypt
+
+try:
+    bcrypt.hash("probe")
+    HAVE_BCRYPT = True
+except Exception:  # passlib cannot drive the installed bcrypt release
+    HAVE_BCRYPT = False
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db = AetherDB()
+        self.db.execute_sql('CREATE TABLE t (id INT, name STR, day DATE)')
+        self.db.insert_many("t", [{"id": i, "name": f"n{i}", "day": datetime.date(2024, 1, 1 + i % 28)}
+                                  for i in range(1000)])
+        self.db.auth.add_user("bob", "", password_optional=True)
+        self.server = AetherServer(self.db, port=0, batch_size=64).start_thread()
+
+    def tearDown(self):
+        self.server.stop_thread()
+
+    def connect(self, user="aether", **kwargs):
+        remote = RemoteDB("127.0.0.1", self.server.port, **kwargs)
+        self.addCleanup(remote.close)
+        if user is not None:
+            self.assertTrue(remote.login(user, ""))
+        return remote
+
+
+class TestServer(ServerTestCase):
+    def test_select_streams_in_batches(self):
+        remote = self.connect()
+        rows = remote.execute_sql('SELECT id, day FROM t WHERE id < ?', (300,))
+        self.assertEqual(len(rows), 300)
+        self.assertEqual(rows[5], {"id": 5, "day": datetime.date(2024, 1, 6)})
+        stream = remote.execute_sql('SELECT * FROM t', stream=True)
+        self.assertEqual(stream.columns, ["id", "name", "day"])
+        self.assertEqual(next(iter(stream))["name"], "n0")
+        # Abandoning a stream must not desync the next reply
+        self.assertEqual(remote.execute_sql('SELECT COUNT(*) FROM t')[0]["COUNT(*)"], 1000)
+
+    def test_writes_and_errors(self):
+        remote = self.connect()
+        self.assertEqual(remote.execute_sql("UPDATE t SET name = 'x' WHERE id = 3"), 1)
+        remote.execute_sql('INSERT INTO t (id, name, day) VALUES (?, ?, ?)', (5000, "new", datetime.date(2025, 2, 3)))
+        self.assertEqual(self.db.select("t", {"id": 5000})[0]["day"], datetime.date(2025, 2, 3))
+        with self.assertRaises(ValueError):
+            remote.execute_sql('SELECT * FROM missing')
+        self.assertEqual(len(remote.execute_sql('SELECT id FROM t WHERE id = 3')), 1)
+        self.assertEqual(set(remote.tables), {"t"})
+
+    def test_connections_have_their_own_user(self):
+        anonymous = self.connect(user=None)
+        with self.assertRaises(PermissionError):
+            anonymous.execute_sql('SELECT * FROM t')
+        bob = self.connect("bob")
+        with self.assertRaises(PermissionError):
+            bob.execute_sql('SELECT * FROM t')
+        self.assertEqual(bob.tables, {})
+        admin = self.connect()
+        self.assertEqual(len(admin.execute_sql('SELECT id FROM t WHERE id = 1')), 1)
+        self.assertFalse(self.connect(user=None).login("bob", "wrong"))
+
+    def test_token_login_on_new_connection(self):
+        first = self.connect()
+        token = first.session_token
+        second = self.connect(user=None)
+        self.assertTrue(second.login_token(token))
+        self.assertEqual(second.current_user, "aether")
+        self.assertFalse(self.connect(user=None).login_token(token + "x"))
+
+    def test_concurrent_clients(self):
+        errors = []
+
+        def client(k):
+            try:
+                remote = RemoteDB("127.0.0.1", self.server.port)
+                remote.login("aether", "")
+                for i in range(20):
+                    remote.execute_sql('INSERT INTO t (id, name, day) VALUES (?, ?, ?)',
+                                       (10_000 + k * 100 + i, "c", "2024-05-01"))
+                    self.assertEqual(len(remote.execute_sql('SELECT id FROM t WHERE name = ?', ("n7",))), 1)
+                remote.close()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=client, args=(k,)) for k in range(6)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.db.select("t", {"name": "c"})), 120)
+
+    def test_garbled_frame_drops_connection(self):
+        sock = socket.create_connection(("127.0.0.1", self.server.port))
+        sock.sendall(b"\xff\xff\xff\xff")  # over the frame size limit
+        self.assertEqual(sock.recv(16), b"")
+        sock.close()
+        self.assertTrue(self.connect().execute_sql('SELECT id FROM t WHERE id = 1'))
+
+    def test_closed_connection(self):
+        remote = self.connect()
+        remote.close()
+        with self.assertRaises(ProtocolError):
+            remote.execute_sql('SELECT * FROM t')
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets not available")
+class TestUnixSocket(unittest.TestCase):
+    def test_unix_socket(self):
+        path = os.path.join(tempfile.mkdtemp(), "aetherdb.sock")
+        server = AetherServer(host=None, unix_path=path).start_thread()
+        try:
+            with RemoteDB(unix_path=path) as remote:
+                self.assertTrue(remote.login("aether", ""))
+                remote.execute_sql('CREATE TABLE u (id INT)')
+                remote.execute_sql('INSERT INTO u (id) VALUES (1)')
+                self.assertEqual(remote.execute_sql('SELECT id FROM u'), [{"id": 1}])
+        finally:
+            server.stop_thread()
+        self.assertFalse(os.path.exists(path))
+
+
+class TestServeCommand(unittest.TestCase):
+    def serve(self, *args):
+        with mock.patch("aetherdb.server.serve") as run_server:
+            result = CliRunner().invoke(cli, ["serve", "--port", "0", *args], env={"AETHERDB_ADMIN_PASSWORD": None})
+        return result, run_server
+
+    def test_refuses_passwordless_admin(self):
+        result, run_server = self.serve()
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("--admin-password", result.output)
+        run_server.assert_not_called()
+
+    @unittest.skipUnless(HAVE_BCRYPT, "bcrypt backend unavailable")
+    def test_admin_password(self):
+        result, run_server = self.serve("--admin-password", "s3cret")
+        self.assertEqual(result.exit_code, 0, result.output)
+        db = run_server.call_args.args[0]
+        self.assertTrue(db.auth.authenticate("aether", "s3cret"))
+        self.assertFalse(db.auth.authenticate("aether", ""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import date
+from aetherdb.db_engine import AetherDB
+from aetherdb.encryption import EncryptedWriter, open_decrypted
+from aetherdb.snapshot import LazyTables, is_snapshot
+
+class TestBinarySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "db.aedb")
+        db = self.db = AetherDB()
+        for storage in ("row", "columnar"):
+            name = f"t_{storage}"
+            db.create_table(name, {"id": "int", "name": "str", "day": "date"}, storage)
+            db.insert_many(name, [{"id": i, "name": f"n{i % 7}", "day": date(2020, 1, 1 + i % 28)}
+                                  for i in range(300)])
+            db.delete(name, {"id": 5})
+            db.alter_table_add_column(name, "extra", "int")
+            db.update(name, {"id": 7}, {"extra": 2**40})
+            db.create_index(name, f"{name}_name", ["name"])
+            db.create_index(name, f"{name}_id", ["id"], "btree")
+            db.grant(name, "bob", "read")
+        db.create_table("big", {"id": "int"})
+        db.insert("big", {"id": 2**70})  # does not fit a typed block
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_all_codecs(self):
+        for compression in ("zlib", "lzma", None):
+            self.db.save_encrypted(self.path, "pw", compression=compression)
+            db2 = AetherDB.load_encrypted(self.path, "pw")
+            self.assertIsInstance(db2.tables, LazyTables)
+            self.assertEqual(list(db2.tables), list(self.db.tables))
+            for name, t in self.db.tables.items():
+                t2 = db2.tables[name]
+                self.assertEqual(t2.rows, t.rows)
+                self.assertEqual(t2.schema, t.schema)
+                self.assertEqual(t2.storage.kind, t.storage.kind)
+                self.assertEqual(t2.permissions, t.permissions)
+                self.assertEqual(sorted(t2.indexes), sorted(t.indexes))
+            self.assertEqual(db2.select("t_columnar", {"name": "n3", "extra": None}, ["id"])[:2],
+                             [{"id": 3}, {"id": 10}])
+
+    def test_tables_are_decoded_on_first_access(self):
+        self.db.save_encrypted(self.path, "pw")
+        db2 = AetherDB.load_encrypted(self.path, "pw")
+        tables = db2.tables
+        self.assertIn("t_row", tables)
+        self.assertEqual(len(tables), 3)
+        self.assertEqual(tables.decoded, [])
+        self.assertEqual(len(db2.select("t_row", {"id": 7})), 1)
+        self.assertEqual(tables.decoded, ["t_row"])
+        # Saving again copies the untouched tables' blocks as they are
+        db2.insert("t_row", {"id": 1000, "name": "x", "day": "2021-01-01", "extra": 1})
+        db2.save_encrypted(self.path, "pw")
+        self.assertEqual(tables.decoded, ["t_row"])
+        db3 = AetherDB.load_encrypted(self.path, "pw")
+        self.assertEqual(len(db3.tables["t_row"]), 300)
+        self.assertEqual(db3.tables["t_columnar"].rows, self.db.tables["t_columnar"].rows)
+        self.assertEqual(db3.tables["big"].rows, [{"id": 2**70}])
+
+    def test_pickled_files_still_load(self):
+        with open(self.path, "wb") as f, EncryptedWriter(f, "pw") as enc:
+            pickle.dump(self.db.tables, enc)
+        with open(self.path, "rb") as f:
+            self.assertFalse(is_snapshot(open_decrypted(f, "pw").read()))
+        db2 = AetherDB.load_encrypted(self.path, "pw")
+        self.assertEqual(db2.tables["t_row"].rows, self.db.tables["t_row"].rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import unittest
+from aetherdb.db_engine import AetherDB, WAL_FILE
+from aetherdb.encryption import open_decrypted
+from aetherdb.wal import WALCorruptError, _HEADER_SIZE as HEADER_SIZE
+
+class TestWriteAheadLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self, **kw):
+        return AetherDB.open(self.dir, "pw", **kw)
+
+    def test_replay_after_crash(self):
+        db = self._open()
+        db.execute_sql('CREATE TABLE t (id INT, name STR)')
+        db.execute_sql('INSERT INTO t (id, name) VALUES (1, "a"), (2, "b"), (3, "c")')
+        db.execute_sql('UPDATE t SET name = "B" WHERE id = 2')
+        db.execute_sql('DELETE FROM t WHERE id = 3')
+        db.execute_sql('ALTER TABLE t ADD COLUMN n INT')
+        db.create_index("t", "t_id", ["id"])
+        # no close(): simulate a crash after the commits returned
+        db2 = self._open()
+        self.assertEqual(db2.execute_sql('SELECT id, name, n FROM t'),
+                         [{"id": 1, "name": "a", "n": None}, {"id": 2, "name": "B", "n": None}])
+        self.assertIn("t_id", db2.tables["t"].indexes)
+
+    def test_checkpoint_then_tail(self):
+        db = self._open()
+        db.execute_sql('CREATE TABLE t (id INT)')
+        db.insert_many("t", [{"id": i} for i in range(100)])
+        lsn = db.checkpoint()
+        self.assertEqual(lsn, 2)
+        db.insert("t", {"id": 100})
+        db.execute_sql('ALTER TABLE t RENAME TO u')
+        db.close()
+        db2 = self._open()
+        self.assertEqual(len(db2.tables["u"]), 101)
+        db2.insert("u", {"id": 101})
+        self.assertEqual(db2.wal.last_lsn, 5)
+        # The snapshot is a regular encrypted file readable with the password
+        with open(os.path.join(self.dir, "snapshot.aedb"), "rb") as f:
+            self.assertTrue(open_decrypted(f, "pw").read())
+
+    def test_automatic_checkpoint(self):
+        db = self._open(checkpoint_bytes=4096)
+        db.execute_sql('CREATE TABLE t (id INT, s STR)')
+        for i in range(200):
+            db.insert("t", {"id": i, "s": "x" * 20})
+        self.assertLess(db.wal.size, 4096)
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "snapshot.aedb")))
+        self.assertEqual(len(self._open().tables["t"]), 200)
+
+    def test_torn_tail_is_discarded(self):
+        db = self._open()
+        db.execute_sql('CREATE TABLE t (id INT)')
+        db.insert("t", {"id": 1})
+        db.close()
+        with open(os.path.join(self.dir, WAL_FILE), "ab") as f:
+            f.write(b"\x00\x00\x01\x00partial")
+        db2 = self._open()
+        self.assertEqual(len(db2.tables["t"]), 1)
+        db2.insert("t", {"id": 2})
+        self.assertEqual(len(self._open().tables["t"]), 2)
+
+    def test_wrong_password_and_tampering(self):
+        db = self._open()
+        db.execute_sql('CREATE TABLE t (id INT)')
+        db.insert("t", {"id": 1})
+        db.close()
+        with self.assertRaises(ValueError):
+            AetherDB.open(self.dir, "wrong")
+        path = os.path.join(self.dir, WAL_FILE)
+        with open(path, "rb") as f:
+            data = bytearray(f.read())
+        data[len(data) // 2] ^= 0xFF  # flip a bit inside the first record
+        with open(path, "wb") as f:
+            f.write(data)
+        with self.assertRaises(WALCorruptError):
+            self._open()
+
+    def test_bad_length_mid_file_is_not_a_torn_tail(self):
+        db = self._open()
+        db.execute_sql('CREATE TABLE t (id INT)')
+        db.insert("t", {"id": 1})
+        db.close()
+        path = os.path.join(self.dir, WAL_FILE)
+        with open(path, "rb") as f:
+            data = bytearray(f.read())
+        data[HEADER_SIZE:HEADER_SIZE + 4] = b"\xff\xff\xff\xff"  # length of the first record
+        with open(path, "wb") as f:
+            f.write(data)
+        with self.assertRaises(WALCorruptError):
+            self._open()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)  # nothing was cut off
+
+    def test_group_commit_shares_fsyncs(self):
+        db = self._open(commit_delay=0.002)
+        db.execute_sql('CREATE TABLE t (id INT)')
+        wal = db.wal
+        start_commits, start_syncs = wal.commits, wal.syncs
+
+        def writer(base):
+            for i in range(25):
+                wal.log("insert", ("t", {"id": base + i}))
+        threads = [threading.Thread(target=writer, args=(k * 100,)) for k in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(wal.commits - start_commits, 200)
+        self.assertLess(wal.syncs - start_syncs, 200)
+        db.close()
+        self.assertEqual(len(self._open().tables["t"]), 200)
+
+if __name__ == "__main__":
+    unittest.main()